@@ -2,7 +2,8 @@ import sys
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon
-from services.storage import Storage
+from services.ai_providers import CLIENT_POOL, MODEL_CACHE, warm_up_provider
+from services.workspaces import WorkspaceManager
 from ui.main_window import MainWindow
 
 def get_resource_path(relative_path):
@@ -25,11 +26,20 @@ def main():
     app.setWindowIcon(QIcon("resources/favicon.ico"))
     app.setWindowIcon(QIcon("resources/favicon.ico"))
 
-    storage = Storage()
+    workspaces = WorkspaceManager()
+    storage = workspaces.open_workspace(workspaces.get_last_workspace())
 
-    window = MainWindow(storage)
+    window = MainWindow(storage, workspaces)
     window.show()
 
+    # Cierra las conexiones HTTP que los proveedores de IA mantienen abiertas
+    app.aboutToQuit.connect(CLIENT_POOL.close_all)
+    app.aboutToQuit.connect(MODEL_CACHE.clear)
+
+    # Con un modelo local elegido, se carga mientras el usuario empieza a trabajar
+    provider_name = storage.get_setting('ai_provider', 'OpenAI')
+    warm_up_provider(provider_name, storage.get_setting(f'ai_config_{provider_name}', {}))
+
     sys.exit(app.exec())
 
 
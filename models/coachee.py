@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Coachee:
     id: Optional[int]
     nombre: str
@@ -32,3 +32,8 @@ class Coachee:
             email=data.get('email'),
             telefono=data['telefono']
         )
+
+    @staticmethod
+    def from_row(cursor, row):
+        """row_factory de sqlite3 para filas (id, nombre, apellido, email, telefono)"""
+        return Coachee(*row)
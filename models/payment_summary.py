@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class PaymentSummary:
+    total_sessions: int = 0
+    paid_sessions: int = 0
+    unpaid_sessions: int = 0
+    total_paid: float = 0.0
+    total_pending: float = 0.0
+
+    def to_dict(self):
+        return {
+            'total_sessions': self.total_sessions,
+            'paid_sessions': self.paid_sessions,
+            'unpaid_sessions': self.unpaid_sessions,
+            'total_paid': self.total_paid,
+            'total_pending': self.total_pending
+        }
+
+    @staticmethod
+    def from_row(cursor, row):
+        """row_factory de sqlite3 para el agregado de pagos (SUM devuelve NULL sin filas)"""
+        return PaymentSummary(row[0] or 0, row[1] or 0, row[2] or 0, row[3] or 0, row[4] or 0)
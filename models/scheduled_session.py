@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True, frozen=True)
+class ScheduledSession:
+    id: Optional[int]
+    coachee_id: int
+    scheduled_time: str
+    title: str = ''
+    notes: str = ''
+    duration: int = 60
+    notify_enabled: bool = True
+    notify_time: Optional[str] = None
+    status: str = 'scheduled'
+    notified: bool = False
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'coachee_id': self.coachee_id,
+            'scheduled_time': self.scheduled_time,
+            'title': self.title,
+            'notes': self.notes,
+            'duration': self.duration,
+            'notify_enabled': self.notify_enabled,
+            'notify_time': self.notify_time,
+            'status': self.status,
+            'notified': self.notified
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return ScheduledSession(
+            id=data.get('id'),
+            coachee_id=data['coachee_id'],
+            scheduled_time=data['scheduled_time'],
+            title=data.get('title', ''),
+            notes=data.get('notes', ''),
+            duration=data.get('duration', 60),
+            notify_enabled=data.get('notify_enabled', True),
+            notify_time=data.get('notify_time'),
+            status=data.get('status', 'scheduled'),
+            notified=data.get('notified', False)
+        )
+
+    @staticmethod
+    def from_row(cursor, row):
+        """row_factory de sqlite3 para filas con las columnas de scheduled_sessions en orden"""
+        return ScheduledSession(row[0], row[1], row[2], row[3], row[4], row[5],
+                                bool(row[6]), row[7], row[8], bool(row[9]))
@@ -1,9 +1,8 @@
 from dataclasses import dataclass
 from typing import Optional
-from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class Session:
     id: Optional[int]
     coachee_id: int
@@ -31,4 +30,9 @@ class Session:
             notas=data['notas'],
             pagado=data.get('pagado', False),
             monto=data.get('monto', 0.0)
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def from_row(cursor, row):
+        """row_factory de sqlite3 para filas (id, coachee_id, fecha, notas, pagado, monto)"""
+        return Session(row[0], row[1], row[2], row[3], bool(row[4]), row[5] or 0.0)
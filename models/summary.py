@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True, frozen=True)
+class Summary:
+    id: Optional[int]
+    coachee_id: int
+    title: str
+    summary_type: str
+    content: str
+    sessions_included: str = ''
+    date_from: str = ''
+    date_to: str = ''
+    created_at: str = ''
+    ai_provider: str = ''
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'coachee_id': self.coachee_id,
+            'title': self.title,
+            'summary_type': self.summary_type,
+            'content': self.content,
+            'sessions_included': self.sessions_included,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'created_at': self.created_at,
+            'ai_provider': self.ai_provider
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return Summary(
+            id=data.get('id'),
+            coachee_id=data['coachee_id'],
+            title=data['title'],
+            summary_type=data['summary_type'],
+            content=data['content'],
+            sessions_included=data.get('sessions_included', ''),
+            date_from=data.get('date_from', ''),
+            date_to=data.get('date_to', ''),
+            created_at=data.get('created_at', ''),
+            ai_provider=data.get('ai_provider', '')
+        )
+
+    @staticmethod
+    def from_row(cursor, row):
+        """row_factory de sqlite3 para filas con las columnas de summaries en orden"""
+        return Summary(*row)
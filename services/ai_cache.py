@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from typing import AsyncIterator, Iterator, Optional
+
+from services.ai_providers import AIProvider, SYSTEM_PROMPT
+
+
+class ResponseCache:
+    """Respuestas de IA guardadas en SQLite, por hash de la consulta completa
+
+    La clave combina proveedor, modelo, prompt de sistema, prompt y parámetros
+    de generación, así que cualquier cambio en ellos produce una consulta nueva.
+    Las entradas vencen a los ttl segundos y, cuando el total supera max_bytes,
+    se descartan las usadas hace más tiempo.
+    """
+
+    def __init__(self, db_path: str = "ai-cache.db", ttl: float = 30 * 24 * 3600,
+                 max_bytes: int = 50 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5.0)
+
+    def init_database(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER DEFAULT 0
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0)")
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def make_key(identity: dict, prompt: str, system_prompt: str = SYSTEM_PROMPT) -> str:
+        payload = json.dumps({'identity': identity, 'system': system_prompt, 'prompt': prompt},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Devuelve la respuesta guardada si existe y no venció"""
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,))
+        row = cursor.fetchone()
+        if row and now - row[1] < self.ttl:
+            cursor.execute('UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?', (now, key))
+            cursor.execute("UPDATE stats SET value = value + 1 WHERE name = 'hits'")
+            response = row[0]
+        else:
+            if row:
+                cursor.execute('DELETE FROM responses WHERE key = ?', (key,))
+            cursor.execute("UPDATE stats SET value = value + 1 WHERE name = 'misses'")
+            response = None
+
+        conn.commit()
+        conn.close()
+
+        return response
+
+    def put(self, key: str, identity: dict, response: str):
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            INSERT OR REPLACE INTO responses (key, provider, model, response, size, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (key, identity.get('provider', ''), identity.get('model'), response,
+              len(response.encode('utf-8')), now, now))
+
+        # Se conservan las más recientes mientras entren en el límite
+        cursor.execute('''
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS kept
+                    FROM responses
+                ) WHERE kept > ?
+            )
+        ''', (self.max_bytes,))
+
+        conn.commit()
+        conn.close()
+
+    def purge_expired(self) -> int:
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('DELETE FROM responses WHERE created_at < ?', (time.time() - self.ttl,))
+        deleted = cursor.rowcount
+
+        conn.commit()
+        conn.close()
+
+        return deleted
+
+    def clear(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('DELETE FROM responses')
+        cursor.execute('UPDATE stats SET value = 0')
+
+        conn.commit()
+        conn.close()
+
+    def stats(self) -> dict:
+        """Entradas, tamaño total y aciertos/fallos acumulados"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses')
+        entries, size = cursor.fetchone()
+        cursor.execute('SELECT name, value FROM stats')
+        counters = dict(cursor.fetchall())
+        conn.close()
+
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'entries': entries,
+            'size': size,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_rate': counters['hits'] / lookups if lookups else 0.0
+        }
+
+
+class CachedProvider(AIProvider):
+    """Envuelve un proveedor y responde desde la caché las consultas ya hechas
+
+    Con force_refresh la consulta siempre va al proveedor y la respuesta nueva
+    reemplaza a la guardada. Las respuestas de error no se guardan, ni las
+    que no dio el proveedor de cache_identity (ver last_response_cacheable).
+    """
+
+    def __init__(self, provider: AIProvider, cache: ResponseCache, force_refresh: bool = False):
+        self.provider = provider
+        self.cache = cache
+        self.force_refresh = force_refresh
+        # Indica si la última respuesta salió de la caché
+        self.last_hit = False
+
+    def cache_identity(self) -> dict:
+        return self.provider.cache_identity()
+
+    def _lookup(self, prompt: str):
+        key = ResponseCache.make_key(self.cache_identity(), prompt)
+        cached = None if self.force_refresh else self.cache.get(key)
+        self.last_hit = cached is not None
+        return key, cached
+
+    def last_response_cacheable(self) -> bool:
+        return self.provider.last_response_cacheable()
+
+    def _store(self, key: str, response: str):
+        if response and not response.startswith("Error") and self.provider.last_response_cacheable():
+            self.cache.put(key, self.cache_identity(), response)
+
+    def generate_response(self, prompt: str) -> str:
+        key, cached = self._lookup(prompt)
+        if cached is not None:
+            return cached
+        response = self.provider.generate_response(prompt)
+        self._store(key, response)
+        return response
+
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        key, cached = self._lookup(prompt)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        for text in self.provider.stream_response(prompt):
+            parts.append(text)
+            yield text
+        # Solo una respuesta leída completa se guarda
+        self._store(key, "".join(parts))
+
+    # En las versiones asíncronas la caché se consulta en el executor: SQLite puede
+    # esperar el bloqueo de otro escritor y detendría el bucle con todas sus consultas
+    async def agenerate_response(self, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+        key, cached = await loop.run_in_executor(None, self._lookup, prompt)
+        if cached is not None:
+            return cached
+        response = await self.provider.agenerate_response(prompt)
+        await loop.run_in_executor(None, self._store, key, response)
+        return response
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        key, cached = await loop.run_in_executor(None, self._lookup, prompt)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        async for text in self.provider.astream(prompt):
+            parts.append(text)
+            yield text
+        await loop.run_in_executor(None, self._store, key, "".join(parts))
+
+    def test_connection(self) -> tuple[bool, str]:
+        return self.provider.test_connection()
+
+    def close(self):
+        self.provider.close()
+
+    def cancel(self):
+        self.provider.cancel()
+
+
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Caché de respuestas compartida por la aplicación"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
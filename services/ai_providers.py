@@ -1,35 +1,558 @@
+import asyncio
+import email.utils
+import inspect
+import os
+import queue
+import random
+import socket
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Optional
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+from services.tokens import DEFAULT_MAX_OUTPUT_TOKENS, estimate_tokens, max_output_tokens
+
+SYSTEM_PROMPT = "Eres un asistente experto en coaching profesional."
 
 
 class AIProvider(ABC):
+    # Límite de consultas del proveedor y modelo, si lo tiene
+    rate_limiter = None
+
     @abstractmethod
     def generate_response(self, prompt: str) -> str:
         pass
 
+    @abstractmethod
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        """Genera la respuesta por fragmentos a medida que llegan
+
+        A diferencia de generate_response, los errores se propagan como
+        excepciones: parte de la respuesta puede haberse entregado ya.
+        """
+        pass
+
     @abstractmethod
     def test_connection(self) -> tuple[bool, str]:
         pass
 
+    def close(self):
+        """Libera los recursos que el proveedor tenga tomados"""
+        pass
+
+    def cancel(self):
+        """Interrumpe desde otro hilo la respuesta en curso, si el proveedor puede hacerlo"""
+        pass
+
+    def cache_identity(self) -> dict:
+        """Datos que distinguen las respuestas de este proveedor en la caché"""
+        return {'provider': type(self).__name__}
+
+    def last_response_cacheable(self) -> bool:
+        """Indica si la última respuesta corresponde a cache_identity y puede guardarse"""
+        return True
+
+    async def agenerate_response(self, prompt: str) -> str:
+        """Versión asíncrona de generate_response
+
+        Por defecto ejecuta la versión bloqueante en el executor del bucle; los
+        proveedores con cliente asíncrono la reemplazan.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.generate_response, prompt)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Versión asíncrona de stream_response
+
+        Por defecto consume stream_response en un hilo del executor y pasa los
+        fragmentos al bucle a medida que llegan.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+        stopped = threading.Event()
+
+        def produce():
+            try:
+                for text in self.stream_response(prompt):
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, text)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            await producer
+
+
+class ClientPool:
+    """Clientes de los SDK compartidos por (proveedor, api_key, base_url)
+
+    Cada cliente mantiene su propio pool de conexiones HTTP con keep-alive, así
+    que las consultas seguidas reutilizan la conexión (y el TLS) ya abiertos.
+    Un cliente que ningún proveedor usa sigue abierto hasta close_idle() o
+    close_all(), para que la próxima consulta no vuelva a pagar la conexión.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # clave -> [cliente, proveedores que lo usan]
+        self._clients = {}
+
+    def acquire(self, key: tuple, factory: Callable[[], object]):
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = self._clients[key] = [factory(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, key: tuple):
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and entry[1] > 0:
+                entry[1] -= 1
+
+    def close_idle(self):
+        """Cierra los clientes que ningún proveedor está usando"""
+        with self._lock:
+            idle = [key for key, entry in self._clients.items() if entry[1] == 0]
+            clients = [self._clients.pop(key)[0] for key in idle]
+        for client in clients:
+            client.close()
+
+    def close_all(self):
+        with self._lock:
+            clients = [entry[0] for entry in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    async def aclose_all(self):
+        """Cierra los clientes asíncronos; debe ejecutarse en el bucle que los usó"""
+        with self._lock:
+            clients = [entry[0] for entry in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            result = client.close()
+            if inspect.isawaitable(result):
+                await result
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+
+CLIENT_POOL = ClientPool()
+# Los clientes asíncronos quedan atados al bucle de eventos en que se crearon
+ASYNC_CLIENT_POOL = ClientPool()
+
+
+class TokenBucket:
+    """Cubeta que se rellena a per_minute unidades por minuto, hasta capacity"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.configure(per_minute, capacity)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def configure(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60
+        self.capacity = capacity or per_minute
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Descuenta amount y devuelve cuántos segundos esperar hasta poder usarlo
+
+        La cubeta puede quedar en negativo: las reservas siguientes esperan en
+        orden detrás de las anteriores.
+        """
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # Una consulta más grande que la cubeta espera a tenerla llena
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Consultas por minuto (rpm) y tokens por minuto (tpm) de un proveedor y modelo
+
+    Antes de cada consulta se reservan una consulta y los tokens estimados, y se
+    espera lo necesario para no superar los límites. Si el proveedor responde
+    429 igual, se respeta Retry-After (pausando a todos los que usan el mismo
+    límite) o se reintenta con esperas exponenciales con jitter. Un intento que
+    falla devuelve sus tokens a la cubeta, y las esperas terminan en cuanto se
+    activa el evento cancelled que recibe call.
+    """
+
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 1.0
+    BACKOFF_CAP = 60.0
+
+    def __init__(self, rpm: float, tpm: float):
+        self._lock = threading.Lock()
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self.stats = {'requests': 0, 'queue_wait': 0.0, 'max_wait': 0.0, 'throttled': 0, 'retries': 0}
+
+    def configure(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        with self._lock:
+            if rpm:
+                self.requests.configure(rpm)
+            if tpm:
+                self.tokens.configure(tpm)
+
+    def reserve(self, tokens: int) -> float:
+        """Reserva lugar para una consulta y devuelve los segundos a esperar"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.paused_until - now,
+                       self.requests.reserve(1, now),
+                       self.tokens.reserve(tokens, now))
+            self.stats['requests'] += 1
+            self.stats['queue_wait'] += wait
+            self.stats['max_wait'] = max(self.stats['max_wait'], wait)
+            return wait
+
+    def settle(self, estimated: int, used: Optional[int]):
+        """Devuelve a la cubeta lo que la consulta no usó de lo estimado"""
+        if used is not None and used < estimated:
+            with self._lock:
+                self.tokens.refund(estimated - used)
+
+    def settle_stream(self, estimated: int, max_output: int, text: str, used: Optional[int] = None):
+        """Liquida una respuesta por flujo, que no informa el uso al abrirse
+
+        Sin el uso informado en el último fragmento, se cuenta el prompt
+        estimado más la salida recibida y se devuelve el resto de max_output.
+        """
+        if used is None:
+            used = estimated - max_output + estimate_tokens(text)
+        self.settle(estimated, used)
+
+    def refund(self, tokens: int, request: bool = False):
+        """Devuelve los tokens de un intento fallido, y la consulta si no llegó a enviarse"""
+        with self._lock:
+            self.tokens.refund(tokens)
+            if request:
+                self.requests.refund(1)
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Segundos a esperar antes de reintentar, o None si el error no es transitorio"""
+        response = getattr(error, 'response', None)
+        status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+        name = type(error).__name__
+        if status == 429 or name in ('RateLimitError', 'ResourceExhausted'):
+            delay = self._retry_after(response)
+            with self._lock:
+                self.stats['throttled'] += 1
+                if delay is not None:
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        elif status in (500, 502, 503, 504) or name in ('APIConnectionError', 'APITimeoutError',
+                                                        'InternalServerError', 'ServiceUnavailable'):
+            delay = None
+        else:
+            return None
+
+        if delay is None:
+            # Jitter completo: los reintentos de varias consultas no coinciden
+            delay = random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2 ** attempt))
+        with self._lock:
+            self.stats['retries'] += 1
+        return delay
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        headers = getattr(response, 'headers', None)
+        if not headers:
+            return None
+        if headers.get('retry-after-ms'):
+            try:
+                return float(headers['retry-after-ms']) / 1000
+            except ValueError:
+                pass
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # También puede venir como fecha HTTP
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    def call(self, request: Callable, tokens: int, cancelled: Optional[threading.Event] = None):
+        """Ejecuta request respetando el límite y reintentando los errores transitorios
+
+        Si cancelled se activa mientras la consulta espera su turno o un
+        reintento, se abandona con RuntimeError.
+        """
+        cancelled = cancelled or threading.Event()
+        for attempt in range(self.MAX_RETRIES + 1):
+            if cancelled.wait(self.reserve(tokens)):
+                self.refund(tokens, request=True)
+                raise RuntimeError("Consulta cancelada")
+            try:
+                response = request()
+            except Exception as e:
+                self.refund(tokens)
+                delay = self.retry_delay(e, attempt)
+                if delay is None or attempt == self.MAX_RETRIES:
+                    raise
+                if cancelled.wait(delay):
+                    raise RuntimeError("Consulta cancelada")
+                continue
+            self.settle(tokens, _used_tokens(response))
+            return response
+
+    async def acall(self, request: Callable, tokens: int):
+        """Versión asíncrona de call; request devuelve una corrutina y se cancela con la tarea"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                await asyncio.sleep(self.reserve(tokens))
+            except asyncio.CancelledError:
+                self.refund(tokens, request=True)
+                raise
+            try:
+                response = await request()
+            except asyncio.CancelledError:
+                self.refund(tokens)
+                raise
+            except Exception as e:
+                self.refund(tokens)
+                delay = self.retry_delay(e, attempt)
+                if delay is None or attempt == self.MAX_RETRIES:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.settle(tokens, _used_tokens(response))
+            return response
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+def _used_tokens(response) -> Optional[int]:
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        return getattr(usage, 'total_tokens', None)
+    # Gemini informa el uso en usage_metadata
+    usage = getattr(response, 'usage_metadata', None)
+    return getattr(usage, 'total_token_count', None) or None
+
+
+# Límites por defecto de cada proveedor (consultas y tokens por minuto); la
+# configuración del proveedor puede indicar otros con 'rpm' y 'tpm'
+RATE_LIMITS = {
+    "OpenAI": {'rpm': 500, 'tpm': 30000},
+    "GroqCloud": {'rpm': 30, 'tpm': 6000},
+    "Gemini": {'rpm': 15, 'tpm': 32000},
+}
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
 
-class OpenAIProvider(AIProvider):
-    def __init__(self, api_key: str, model: str = "gpt-4"):
+
+def get_rate_limiter(provider_name: str, model: str, rpm: Optional[float] = None,
+                     tpm: Optional[float] = None) -> RateLimiter:
+    """Límite compartido por todas las consultas al mismo proveedor y modelo"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get((provider_name, model))
+        if limiter is None:
+            defaults = RATE_LIMITS.get(provider_name, {'rpm': 60, 'tpm': 60000})
+            limiter = _rate_limiters[(provider_name, model)] = RateLimiter(
+                rpm or defaults['rpm'], tpm or defaults['tpm']
+            )
+            return limiter
+    limiter.configure(rpm, tpm)
+    return limiter
+
+
+class PooledClientProvider(AIProvider):
+    """Proveedor que toma su cliente del pool compartido la primera vez que lo necesita"""
+
+    POOL_NAME = ""
+
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None,
+                 max_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, rpm: Optional[float] = None,
+                 tpm: Optional[float] = None):
         self.api_key = api_key
         self.model = model
+        self.base_url = base_url
+        self.max_tokens = max_tokens
+        self.rate_limiter = get_rate_limiter(self.POOL_NAME, model, rpm, tpm)
+        self._client = None
+        self._async_client = None
+        self._async_key = None
+        # Flujo que se está leyendo, para poder cortarlo con cancel()
+        self._stream = None
+        # Detiene también la espera de turno en rate_limiter
+        self._cancelled = threading.Event()
 
-    def generate_response(self, prompt: str) -> str:
-        try:
-            from openai import OpenAI
-            client = OpenAI(api_key=self.api_key)
+    @abstractmethod
+    def _create_client(self):
+        pass
 
-            response = client.chat.completions.create(
+    @abstractmethod
+    def _create_async_client(self):
+        pass
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = CLIENT_POOL.acquire((self.POOL_NAME, self.api_key, self.base_url),
+                                               self._create_client)
+        return self._client
+
+    def _get_async_client(self):
+        key = (self.POOL_NAME, self.api_key, self.base_url, id(asyncio.get_running_loop()))
+        if self._async_key != key:
+            if self._async_key is not None:
+                ASYNC_CLIENT_POOL.release(self._async_key)
+            self._async_client = ASYNC_CLIENT_POOL.acquire(key, self._create_async_client)
+            self._async_key = key
+        return self._async_client
+
+    def close(self):
+        if self._client is not None:
+            self._client = None
+            CLIENT_POOL.release((self.POOL_NAME, self.api_key, self.base_url))
+        if self._async_key is not None:
+            ASYNC_CLIENT_POOL.release(self._async_key)
+            self._async_client = self._async_key = None
+
+    def cache_identity(self) -> dict:
+        return {'provider': self.POOL_NAME, 'model': self.model, 'base_url': self.base_url,
+                'max_tokens': self.max_tokens}
+
+    def _messages(self, prompt: str) -> List[dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _estimated_tokens(self, prompt: str) -> int:
+        return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) + self.max_tokens
+
+    def _complete(self, prompt: str, **kwargs):
+        """chat.completions.create dentro del límite del proveedor, con reintentos"""
+        # OpenAI y Groq comparten la API de chat completions
+        return self.rate_limiter.call(
+            lambda: self._get_client().chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "Eres un asistente experto en coaching profesional."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000
-            )
+                messages=self._messages(prompt),
+                max_tokens=self.max_tokens,
+                **kwargs
+            ),
+            self._estimated_tokens(prompt),
+            self._cancelled
+        )
+
+    async def _acomplete(self, prompt: str, **kwargs):
+        client = self._get_async_client()
+        return await self.rate_limiter.acall(
+            lambda: client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(prompt),
+                max_tokens=self.max_tokens,
+                **kwargs
+            ),
+            self._estimated_tokens(prompt)
+        )
+
+    async def agenerate_response(self, prompt: str) -> str:
+        try:
+            response = await self._acomplete(prompt)
+            return response.choices[0].message.content
+        except Exception as e:
+            return f"Error al conectar con {self.POOL_NAME}: {str(e)}"
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        stream = await self._acomplete(prompt, stream=True)
+        parts = []
+        usage = None
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            self.rate_limiter.settle_stream(self._estimated_tokens(prompt), self.max_tokens,
+                                            "".join(parts), getattr(usage, 'total_tokens', None))
+
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        # Solo se reintenta la apertura del flujo: después ya se entregó texto
+        stream = self._complete(prompt, stream=True)
+        self._stream = stream
+        parts = []
+        usage = None
+        try:
+            for chunk in stream:
+                # El último fragmento puede traer solo el uso de tokens
+                usage = getattr(chunk, 'usage', None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            self._stream = None
+            stream.close()
+            self.rate_limiter.settle_stream(self._estimated_tokens(prompt), self.max_tokens,
+                                            "".join(parts), getattr(usage, 'total_tokens', None))
+
+    def cancel(self):
+        self._cancelled.set()
+        # Cerrar la respuesta desde otro hilo no destraba la lectura en curso;
+        # cortar el socket sí, y el hilo lector cierra el flujo al fallar
+        stream = self._stream
+        if stream is None:
+            return
+        network_stream = stream.response.extensions.get('network_stream')
+        sock = network_stream.get_extra_info('socket') if network_stream is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class OpenAIProvider(PooledClientProvider):
+    POOL_NAME = "OpenAI"
+
+    def __init__(self, api_key: str, model: str = "gpt-4", base_url: Optional[str] = None,
+                 max_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, rpm: Optional[float] = None,
+                 tpm: Optional[float] = None):
+        super().__init__(api_key, model, base_url, max_tokens, rpm, tpm)
+
+    def _create_client(self):
+        from openai import OpenAI
+        # Los reintentos los maneja rate_limiter, que conoce el límite compartido
+        return OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    def _create_async_client(self):
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    def generate_response(self, prompt: str) -> str:
+        try:
+            response = self._complete(prompt)
 
             return response.choices[0].message.content
         except Exception as e:
@@ -37,8 +560,7 @@ class OpenAIProvider(AIProvider):
 
     def test_connection(self) -> tuple[bool, str]:
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=self.api_key)
+            client = self._get_client()
 
             response = client.chat.completions.create(
                 model=self.model,
@@ -51,24 +573,25 @@ class OpenAIProvider(AIProvider):
             return False, f"Error: {str(e)}"
 
 
-class GroqCloudProvider(AIProvider):
-    def __init__(self, api_key: str, model: str = "llama-3.3-70b-versatile"):
-        self.api_key = api_key
-        self.model = model
+class GroqCloudProvider(PooledClientProvider):
+    POOL_NAME = "GroqCloud"
+
+    def __init__(self, api_key: str, model: str = "llama-3.3-70b-versatile", base_url: Optional[str] = None,
+                 max_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, rpm: Optional[float] = None,
+                 tpm: Optional[float] = None):
+        super().__init__(api_key, model, base_url, max_tokens, rpm, tpm)
+
+    def _create_client(self):
+        from groq import Groq
+        return Groq(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    def _create_async_client(self):
+        from groq import AsyncGroq
+        return AsyncGroq(api_key=self.api_key, base_url=self.base_url, max_retries=0)
 
     def generate_response(self, prompt: str) -> str:
         try:
-            from groq import Groq
-            client = Groq(api_key=self.api_key)
-
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Eres un asistente experto en coaching profesional."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000
-            )
+            response = self._complete(prompt)
 
             return response.choices[0].message.content
         except Exception as e:
@@ -76,8 +599,7 @@ class GroqCloudProvider(AIProvider):
 
     def test_connection(self) -> tuple[bool, str]:
         try:
-            from groq import Groq
-            client = Groq(api_key=self.api_key)
+            client = self._get_client()
 
             response = client.chat.completions.create(
                 model=self.model,
@@ -90,48 +612,250 @@ class GroqCloudProvider(AIProvider):
             return False, f"Error: {str(e)}"
 
 
+class _CachedModel:
+    def __init__(self, model, size: int):
+        self.model = model
+        self.size = size
+        # Un modelo local no admite dos generaciones a la vez
+        self.lock = threading.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+
+
+class ModelCache:
+    """Modelos locales residentes en memoria, compartidos por todo el proceso
+
+    Cada modelo se identifica por su ruta y los parámetros con que se cargó.
+    Mientras el total de los pesos cargados supere ram_budget se descargan los
+    modelos usados hace más tiempo (nunca uno en uso), y un modelo que no se
+    usa durante idle_timeout segundos se descarga solo.
+    """
+
+    def __init__(self, ram_budget: int = 8 * 1024 ** 3, idle_timeout: float = 15 * 60,
+                 loader: Optional[Callable[..., object]] = None):
+        self.ram_budget = ram_budget
+        self.idle_timeout = idle_timeout
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._models = OrderedDict()
+        # Un candado por modelo para no cargar el mismo archivo dos veces a la vez
+        self._loading = {}
+        self._idle_timer = None
+
+    def configure(self, ram_budget: Optional[int] = None, idle_timeout: Optional[float] = None):
+        if ram_budget is not None:
+            self.ram_budget = ram_budget
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+        with self._lock:
+            self._evict(0)
+
+    @staticmethod
+    def _key(model_path: str, settings: dict) -> tuple:
+        return (model_path, tuple(sorted(settings.items())))
+
+    def _load(self, model_path: str, settings: dict):
+        if self._loader is not None:
+            return self._loader(model_path, **settings)
+        from gpt4all import GPT4All
+        # Con un archivo local no hace falta consultar el catálogo en línea
+        return GPT4All(model_path, allow_download=not os.path.isfile(model_path), **settings)
+
+    def _evict(self, needed: int):
+        """Descarga modelos sin uso, del menos reciente al más reciente, hasta hacer lugar"""
+        total = sum(entry.size for entry in self._models.values())
+        for key in list(self._models):
+            if total + needed <= self.ram_budget:
+                break
+            entry = self._models[key]
+            if entry.users == 0:
+                self._unload(key)
+                total -= entry.size
+
+    def _unload(self, key: tuple):
+        entry = self._models.pop(key)
+        close = getattr(entry.model, 'close', None)
+        if close:
+            close()
+
+    def _acquire(self, model_path: str, settings: dict) -> _CachedModel:
+        key = self._key(model_path, settings)
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    entry.users += 1
+                    return entry
+
+            size = os.path.getsize(model_path) if os.path.isfile(model_path) else 0
+            with self._lock:
+                self._evict(size)
+            model = self._load(model_path, settings)
+
+            with self._lock:
+                entry = self._models[key] = _CachedModel(model, size)
+                entry.users += 1
+                return entry
+
+    def _release(self, entry: _CachedModel):
+        with self._lock:
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+        self._schedule_idle_check()
+
+    @contextmanager
+    def use(self, model_path: str, **settings):
+        """Entrega el modelo cargado (cargándolo si hace falta) para una generación"""
+        entry = self._acquire(model_path, settings)
+        try:
+            with entry.lock:
+                yield entry.model
+        finally:
+            self._release(entry)
+
+    def warm_up(self, model_path: str, **settings) -> threading.Thread:
+        """Carga el modelo en segundo plano para que la primera consulta no espere"""
+        def load():
+            try:
+                self._release(self._acquire(model_path, settings))
+            except Exception as e:
+                print(f"Error warming up local model: {e}")
+
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def unload_idle(self):
+        """Descarga los modelos que no se usaron durante idle_timeout segundos"""
+        now = time.monotonic()
+        with self._lock:
+            for key, entry in list(self._models.items()):
+                if entry.users == 0 and now - entry.last_used >= self.idle_timeout:
+                    self._unload(key)
+            pending = bool(self._models)
+        if pending:
+            self._schedule_idle_check()
+
+    def _schedule_idle_check(self):
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+            self._idle_timer = threading.Timer(self.idle_timeout, self.unload_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._models):
+                self._unload(key)
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+
+    def loaded_models(self) -> List[str]:
+        with self._lock:
+            return [key[0] for key in self._models]
+
+
+MODEL_CACHE = ModelCache()
+
+
 class GPT4AllProvider(AIProvider):
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, n_threads: Optional[int] = None, device: Optional[str] = None,
+                 n_ctx: Optional[int] = None, max_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS):
         self.model_path = model_path
+        self.max_tokens = max_tokens
+        # Parámetros de carga: forman parte de la identidad del modelo en la caché
+        self.settings = {key: value for key, value in (('n_threads', n_threads), ('device', device),
+                                                       ('n_ctx', n_ctx))
+                         if value is not None}
 
     def generate_response(self, prompt: str) -> str:
         try:
-            from gpt4all import GPT4All
-            model = GPT4All(self.model_path)
-
-            system_prompt = "Eres un asistente experto en coaching profesional."
-            full_prompt = f"{system_prompt}\n\nUsuario: {prompt}\n\nAsistente:"
+            full_prompt = self._format_prompt(prompt)
 
-            response = model.generate(full_prompt, max_tokens=1000)
+            with MODEL_CACHE.use(self.model_path, **self.settings) as model:
+                response = model.generate(full_prompt, max_tokens=self.max_tokens)
             return response
         except Exception as e:
             return f"Error al conectar con GPT4All: {str(e)}"
 
+    def cache_identity(self) -> dict:
+        return {'provider': "GPT4All", 'model': self.model_path, 'max_tokens': self.max_tokens}
+
+    @staticmethod
+    def _format_prompt(prompt: str) -> str:
+        return f"{SYSTEM_PROMPT}\n\nUsuario: {prompt}\n\nAsistente:"
+
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        # El modelo queda tomado mientras se consume el generador
+        with MODEL_CACHE.use(self.model_path, **self.settings) as model:
+            yield from model.generate(self._format_prompt(prompt), max_tokens=self.max_tokens, streaming=True)
+
     def test_connection(self) -> tuple[bool, str]:
         try:
-            from gpt4all import GPT4All
-            model = GPT4All(self.model_path)
-            response = model.generate("Test", max_tokens=10)
+            with MODEL_CACHE.use(self.model_path, **self.settings) as model:
+                response = model.generate("Test", max_tokens=10)
             return True, f"Modelo local cargado correctamente"
         except Exception as e:
             return False, f"Error: {str(e)}"
 
+    def warm_up(self) -> threading.Thread:
+        return MODEL_CACHE.warm_up(self.model_path, **self.settings)
+
 
 class MixtralProvider(AIProvider):
-    def __init__(self, api_key: str, model: str = "mixtral-8x7b-32768"):
-        self.groq_provider = GroqCloudProvider(api_key, model)
+    def __init__(self, api_key: str, model: str = "mixtral-8x7b-32768", base_url: Optional[str] = None,
+                 max_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, rpm: Optional[float] = None,
+                 tpm: Optional[float] = None):
+        self.groq_provider = GroqCloudProvider(api_key, model, base_url, max_tokens, rpm, tpm)
+        self.rate_limiter = self.groq_provider.rate_limiter
 
     def generate_response(self, prompt: str) -> str:
         return self.groq_provider.generate_response(prompt)
 
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        return self.groq_provider.stream_response(prompt)
+
+    async def agenerate_response(self, prompt: str) -> str:
+        return await self.groq_provider.agenerate_response(prompt)
+
+    def astream(self, prompt: str) -> AsyncIterator[str]:
+        return self.groq_provider.astream(prompt)
+
     def test_connection(self) -> tuple[bool, str]:
         return self.groq_provider.test_connection()
 
+    def cache_identity(self) -> dict:
+        return self.groq_provider.cache_identity()
+
+    def close(self):
+        self.groq_provider.close()
+
+    def cancel(self):
+        self.groq_provider.cancel()
+
 
 class GeminiProvider(AIProvider):
-    def __init__(self, api_key: str, model: str = "gemini-pro"):
+    def __init__(self, api_key: str, model: str = "gemini-pro", rpm: Optional[float] = None,
+                 tpm: Optional[float] = None):
         self.api_key = api_key
         self.model = model
+        self.rate_limiter = get_rate_limiter("Gemini", model, rpm, tpm)
+        self._cancelled = threading.Event()
+
+    def _estimated_tokens(self, full_prompt: str) -> int:
+        return estimate_tokens(full_prompt) + DEFAULT_MAX_OUTPUT_TOKENS
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def cache_identity(self) -> dict:
+        return {'provider': "Gemini", 'model': self.model}
 
     def generate_response(self, prompt: str) -> str:
         try:
@@ -140,14 +864,67 @@ class GeminiProvider(AIProvider):
 
             model = genai.GenerativeModel(self.model)
 
-            system_instruction = "Eres un asistente experto en coaching profesional."
-            full_prompt = f"{system_instruction}\n\n{prompt}"
+            full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
 
-            response = model.generate_content(full_prompt)
+            response = self.rate_limiter.call(lambda: model.generate_content(full_prompt),
+                                              self._estimated_tokens(full_prompt), self._cancelled)
             return response.text
         except Exception as e:
             return f"Error al conectar con Gemini: {str(e)}"
 
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+
+        model = genai.GenerativeModel(self.model)
+        full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
+        estimated = self._estimated_tokens(full_prompt)
+        response = self.rate_limiter.call(lambda: model.generate_content(full_prompt, stream=True),
+                                          estimated, self._cancelled)
+        parts = []
+        try:
+            for chunk in response:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        finally:
+            self.rate_limiter.settle_stream(estimated, DEFAULT_MAX_OUTPUT_TOKENS, "".join(parts),
+                                            _used_tokens(response))
+
+    async def agenerate_response(self, prompt: str) -> str:
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+
+            model = genai.GenerativeModel(self.model)
+            full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
+            response = await self.rate_limiter.acall(lambda: model.generate_content_async(full_prompt),
+                                                     self._estimated_tokens(full_prompt))
+            return response.text
+        except Exception as e:
+            return f"Error al conectar con Gemini: {str(e)}"
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+
+        model = genai.GenerativeModel(self.model)
+        full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
+        estimated = self._estimated_tokens(full_prompt)
+        response = await self.rate_limiter.acall(
+            lambda: model.generate_content_async(full_prompt, stream=True),
+            estimated
+        )
+        parts = []
+        try:
+            async for chunk in response:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        finally:
+            self.rate_limiter.settle_stream(estimated, DEFAULT_MAX_OUTPUT_TOKENS, "".join(parts),
+                                            _used_tokens(response))
+
     def test_connection(self) -> tuple[bool, str]:
         try:
             import google.generativeai as genai
@@ -161,31 +938,418 @@ class GeminiProvider(AIProvider):
             return False, f"Error: {str(e)}"
 
 
+class LatencyTracker:
+    """Latencias recientes y resultados de las consultas cubiertas, por proveedor"""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._window = window
+        self._samples = {}
+        self.wins = Counter()
+        self.hedges = 0
+        self.fallbacks = 0
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def p95(self, key: str, min_samples: int = 10) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def record_outcome(self, winner: str, hedged: bool, fell_back: bool):
+        with self._lock:
+            self.wins[winner] += 1
+            self.hedges += hedged
+            self.fallbacks += fell_back
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {'wins': dict(self.wins), 'hedges': self.hedges, 'fallbacks': self.fallbacks,
+                    'samples': {key: len(samples) for key, samples in self._samples.items()}}
+
+
+LATENCY_TRACKER = LatencyTracker()
+
+
+class HedgedProvider(AIProvider):
+    """Consulta una lista ordenada de proveedores, cubriendo al lento y reemplazando al que falla
+
+    Se consulta primero al primero. Si no respondió después de su p95 de
+    latencia reciente (hedge_delay mientras no haya suficientes muestras), se
+    envía la misma consulta al siguiente y gana la primera respuesta válida. Un
+    error pasa de inmediato al siguiente proveedor. El perdedor se cancela: en
+    los flujos se deja de leer y se cierra la conexión, y en la versión
+    asíncrona se cancela la tarea; una consulta bloqueante ya enviada no se
+    puede interrumpir y su respuesta se descarta. Con hedge=False solo se
+    reemplaza al que falla.
+    """
+
+    MIN_HEDGE_DELAY = 0.25
+    MAX_HEDGE_DELAY = 10.0
+    # Cada cuánto se revisa si la consulta se canceló mientras se espera
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, providers: List[Tuple[str, Callable[[], AIProvider]]], hedge: bool = True,
+                 hedge_delay: float = 3.0, tracker: LatencyTracker = LATENCY_TRACKER):
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.tracker = tracker
+        # Nombre del proveedor que dio la última respuesta
+        self.last_winner = None
+        self._cancelled = threading.Event()
+        # Intentos en curso (evento de detención y proveedor), para cancel()
+        self._attempts = []
+        self._attempts_lock = threading.Lock()
+        self._identity = None
+        self._rate_limiter = None
+
+    def _read_primary(self):
+        # La caché y el límite informado son los del proveedor principal; se leen al pedirlos
+        if self._identity is None:
+            primary = self.providers[0][1]()
+            try:
+                self._rate_limiter = primary.rate_limiter
+                self._identity = {**primary.cache_identity(),
+                                  'fallbacks': [name for name, _ in self.providers[1:]]}
+            finally:
+                primary.close()
+
+    @property
+    def rate_limiter(self):
+        self._read_primary()
+        return self._rate_limiter
+
+    def cache_identity(self) -> dict:
+        self._read_primary()
+        return self._identity
+
+    def last_response_cacheable(self) -> bool:
+        # La respuesta de un respaldo no puede quedar guardada como si fuera del principal
+        return self.last_winner == self.providers[0][0]
+
+    def _delay(self, index: int, kind: str) -> Optional[float]:
+        """Segundos hasta cubrir al proveedor index, o None si no se cubre"""
+        if not self.hedge or index + 1 >= len(self.providers):
+            return None
+        p95 = self.tracker.p95(f"{self.providers[index][0]}:{kind}")
+        delay = self.hedge_delay if p95 is None else p95
+        return min(self.MAX_HEDGE_DELAY, max(self.MIN_HEDGE_DELAY, delay))
+
+    def cancel(self):
+        """Detiene la consulta en curso desde otro hilo, incluidos sus intentos"""
+        self._cancelled.set()
+        with self._attempts_lock:
+            attempts = list(self._attempts)
+        for stop, provider in attempts:
+            stop.set()
+            provider.cancel()
+
+    def _stop_attempt(self, stop: threading.Event, attempt: dict):
+        stop.set()
+        provider = attempt.get('provider')
+        if provider is not None:
+            provider.cancel()
+
+    def _race(self, prompt: str, kind: str, attempt: Callable) -> Tuple[int, object, queue.Queue, list]:
+        """Lanza intentos en hilos hasta que uno entrega su primer resultado válido
+
+        attempt(provider, prompt, index, results, stop) corre en un hilo y pone
+        en results tuplas (index, tipo, valor): 'first' con el primer resultado,
+        'chunk' con los siguientes, 'done' al terminar y 'error'. Terminar sin
+        haber entregado nada cuenta como error. Devuelve el índice ganador, su
+        primer valor, la cola y, por intento, su evento de detención y su
+        proveedor.
+        """
+        results = queue.Queue()
+        attempts = []
+        errors = []
+        started = {}
+        hedged = False
+
+        def launch(index):
+            name, create = self.providers[index]
+            stop = threading.Event()
+            state = {}
+            attempts.append((stop, state))
+            started[index] = time.monotonic()
+
+            def run():
+                provider = None
+                try:
+                    provider = create()
+                    state['provider'] = provider
+                    entry = (stop, provider)
+                    with self._attempts_lock:
+                        self._attempts.append(entry)
+                    try:
+                        if not stop.is_set():
+                            attempt(provider, prompt, index, results, stop)
+                    finally:
+                        with self._attempts_lock:
+                            self._attempts.remove(entry)
+                except Exception as e:
+                    results.put((index, 'error', str(e)))
+                finally:
+                    if provider is not None:
+                        provider.close()
+
+            threading.Thread(target=run, name=f"hedge-{name}", daemon=True).start()
+
+        def stop_all(keep=None):
+            for other, (stop, state) in enumerate(attempts):
+                if other != keep:
+                    self._stop_attempt(stop, state)
+
+        launch(0)
+        running = {0}
+        next_index = 1
+        deadline = self._deadline(0, kind, started)
+        while True:
+            if self._cancelled.is_set():
+                stop_all()
+                raise RuntimeError("Consulta cancelada")
+
+            timeout = self.POLL_INTERVAL
+            if deadline is not None:
+                timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+            try:
+                index, tag, value = results.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    if next_index < len(self.providers):
+                        # El que corre tarda más que su p95: se cubre con el siguiente
+                        hedged = True
+                        launch(next_index)
+                        running.add(next_index)
+                        deadline = self._deadline(next_index, kind, started)
+                        next_index += 1
+                    else:
+                        deadline = None
+                continue
+
+            if index not in running:
+                continue
+
+            if tag in ('error', 'done'):
+                errors.append(f"{self.providers[index][0]}: {value if tag == 'error' else 'Respuesta vacía'}")
+                running.discard(index)
+                if next_index < len(self.providers):
+                    launch(next_index)
+                    running.add(next_index)
+                    deadline = self._deadline(next_index, kind, started)
+                    next_index += 1
+                elif not running:
+                    raise RuntimeError("; ".join(errors))
+                continue
+
+            if tag == 'first':
+                name = self.providers[index][0]
+                now = time.monotonic()
+                # Los perdedores tardaron al menos hasta ahora: sin esa muestra su p95 quedaría bajo
+                for other in running:
+                    self.tracker.record(f"{self.providers[other][0]}:{kind}", now - started[other])
+                stop_all(keep=index)
+                self.last_winner = name
+                self.tracker.record_outcome(name, hedged, bool(errors))
+                return index, value, results, attempts
+
+    def _deadline(self, index: int, kind: str, started: dict) -> Optional[float]:
+        delay = self._delay(index, kind)
+        return None if delay is None else started[index] + delay
+
+    def generate_response(self, prompt: str) -> str:
+        def attempt(provider, prompt, index, results, stop):
+            response = provider.generate_response(prompt)
+            if not response or response.startswith("Error"):
+                results.put((index, 'error', response or "Respuesta vacía"))
+            else:
+                results.put((index, 'first', response))
+
+        try:
+            _, response, _, _ = self._race(prompt, 'response', attempt)
+            return response
+        except Exception as e:
+            return f"Error al conectar con los proveedores: {str(e)}"
+
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        def attempt(provider, prompt, index, results, stop):
+            stream = provider.stream_response(prompt)
+            try:
+                tag = 'first'
+                for text in stream:
+                    if stop.is_set():
+                        return
+                    results.put((index, tag, text))
+                    tag = 'chunk'
+                results.put((index, 'done', None))
+            finally:
+                # Cerrar el generador corta la conexión del perdedor
+                stream.close()
+
+        # Se compite por el primer fragmento; después solo se lee al ganador
+        winner, first, results, attempts = self._race(prompt, 'first_chunk', attempt)
+        try:
+            yield first
+            while True:
+                try:
+                    index, tag, value = results.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    # Un ganador trabado no retiene al que llamó a cancel()
+                    if self._cancelled.is_set():
+                        return
+                    continue
+                if index != winner:
+                    continue
+                if tag == 'done':
+                    return
+                if tag == 'error':
+                    raise RuntimeError(value)
+                yield value
+        finally:
+            self._stop_attempt(*attempts[winner])
+
+    async def agenerate_response(self, prompt: str) -> str:
+        errors = []
+        tasks = {}
+        hedged = False
+
+        def launch(index):
+            provider = self.providers[index][1]()
+            task = asyncio.ensure_future(provider.agenerate_response(prompt))
+            tasks[task] = (index, provider, time.monotonic())
+
+        launch(0)
+        next_index = 1
+        try:
+            while tasks:
+                delay = self._delay(next_index - 1, 'response') if next_index < len(self.providers) else None
+                done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch(next_index)
+                    next_index += 1
+                    continue
+                for task in done:
+                    index, provider, started = tasks.pop(task)
+                    provider.close()
+                    name = self.providers[index][0]
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        response = f"Error: {str(e)}"
+                    if response and not response.startswith("Error"):
+                        now = time.monotonic()
+                        self.tracker.record(f"{name}:response", now - started)
+                        for other, _, other_started in tasks.values():
+                            self.tracker.record(f"{self.providers[other][0]}:response", now - other_started)
+                        self.last_winner = name
+                        self.tracker.record_outcome(name, hedged, bool(errors))
+                        return response
+                    errors.append(f"{name}: {response}")
+                    if next_index < len(self.providers):
+                        launch(next_index)
+                        next_index += 1
+            return f"Error al conectar con los proveedores: {'; '.join(errors)}"
+        finally:
+            # El perdedor se cancela
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for _, provider, _ in tasks.values():
+                provider.close()
+
+    def test_connection(self) -> tuple[bool, str]:
+        provider = self.providers[0][1]()
+        try:
+            return provider.test_connection()
+        finally:
+            provider.close()
+
+
 class AIProviderFactory:
+    @staticmethod
+    def create_with_fallbacks(chain: List[Tuple[str, dict]], hedge: bool = True) -> Optional[AIProvider]:
+        """Proveedor que recorre chain, una lista ordenada de (nombre, configuración)
+
+        Con un solo proveedor configurado se devuelve ese proveedor tal cual.
+        """
+        chain = [(name, config) for name, config in chain if name and config is not None]
+        if not chain:
+            return None
+        if len(chain) == 1:
+            return AIProviderFactory.create_provider(*chain[0])
+        return HedgedProvider(
+            [(name, lambda name=name, config=config: AIProviderFactory.create_provider(name, config))
+             for name, config in chain],
+            hedge=hedge
+        )
+
     @staticmethod
     def create_provider(provider_name: str, config: dict) -> Optional[AIProvider]:
         if provider_name == "OpenAI":
             return OpenAIProvider(
                 api_key=config.get('api_key', ''),
-                model=config.get('model', 'gpt-4')
+                model=config.get('model', 'gpt-4'),
+                base_url=config.get('base_url'),
+                max_tokens=max_output_tokens(provider_name, config),
+                rpm=config.get('rpm'),
+                tpm=config.get('tpm')
             )
         elif provider_name == "GroqCloud":
             return GroqCloudProvider(
                 api_key=config.get('api_key', ''),
-                model=config.get('model', 'mixtral-8x7b-32768')
+                model=config.get('model', 'mixtral-8x7b-32768'),
+                base_url=config.get('base_url'),
+                max_tokens=max_output_tokens(provider_name, config),
+                rpm=config.get('rpm'),
+                tpm=config.get('tpm')
             )
         elif provider_name == "GPT4All":
             return GPT4AllProvider(
-                model_path=config.get('model_path', '')
+                model_path=config.get('model_path', ''),
+                n_threads=config.get('n_threads'),
+                device=config.get('device'),
+                n_ctx=config.get('n_ctx'),
+                max_tokens=max_output_tokens(provider_name, config)
             )
         elif provider_name == "Mixtral":
             return MixtralProvider(
                 api_key=config.get('api_key', ''),
-                model=config.get('model', 'mixtral-8x7b-32768')
+                model=config.get('model', 'mixtral-8x7b-32768'),
+                base_url=config.get('base_url'),
+                max_tokens=max_output_tokens(provider_name, config),
+                rpm=config.get('rpm'),
+                tpm=config.get('tpm')
             )
         elif provider_name == "Gemini":
             return GeminiProvider(
                 api_key=config.get('api_key', ''),
-                model=config.get('model', 'gemini-pro')
+                model=config.get('model', 'gemini-pro'),
+                rpm=config.get('rpm'),
+                tpm=config.get('tpm')
             )
         return None
+
+
+def warm_up_provider(provider_name: str, config: dict):
+    """Precarga el modelo del proveedor elegido si es local (GPT4All)"""
+    if provider_name == "GPT4All" and config.get('model_path'):
+        provider = AIProviderFactory.create_provider(provider_name, config)
+        return provider.warm_up()
+    return None
+
+
+def provider_chain(storage, provider_name: str) -> List[Tuple[str, dict]]:
+    """Proveedor elegido y, si está configurado, el de respaldo, con sus configuraciones"""
+    chain = [(provider_name, storage.get_setting(f'ai_config_{provider_name}', {}))]
+    fallback = storage.get_setting('ai_fallback_provider')
+    if fallback and fallback != provider_name:
+        fallback_config = storage.get_setting(f'ai_config_{fallback}', {})
+        if fallback_config:
+            chain.append((fallback, fallback_config))
+    return chain
@@ -0,0 +1,205 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from services.ai_cache import CachedProvider, ResponseCache
+from services.ai_providers import AIProviderFactory
+from services.summarizer import (MapReduceSummarizer, SummaryCancelled, coachee_session_entries,
+                                 summary_title)
+from services.tokens import PromptBuilder
+
+
+# Consultas simultáneas por proveedor: los modelos locales no ganan nada con más de una
+PROVIDER_CONCURRENCY = {
+    "OpenAI": 8,
+    "GroqCloud": 4,
+    "Mixtral": 4,
+    "Gemini": 4,
+    "GPT4All": 1,
+}
+
+_provider_slots = {}
+_provider_slots_lock = threading.Lock()
+
+
+def provider_slots(provider_name: str) -> threading.BoundedSemaphore:
+    """Cupo de consultas simultáneas de un proveedor, compartido por todos los lotes"""
+    with _provider_slots_lock:
+        if provider_name not in _provider_slots:
+            _provider_slots[provider_name] = threading.BoundedSemaphore(
+                PROVIDER_CONCURRENCY.get(provider_name, 4)
+            )
+        return _provider_slots[provider_name]
+
+
+class BatchSummaryJob:
+    """Genera y guarda un resumen por coachee para un mismo período
+
+    Los coachees se procesan de a `concurrency` a la vez, sin superar el cupo del
+    proveedor aunque haya otros lotes en curso. Cada coachee usa el mismo
+    camino que GenerateSummaryDialog (resumen por bloques si hace falta y caché
+    de respuestas). Los resúmenes se guardan en tandas de save_every con
+    add_summaries. progress recibe un dict con done, failed, skipped, total,
+    elapsed, eta (segundos, o None hasta que termine el primero), queue_wait
+    (segundos que las consultas esperaron por el límite del proveedor) y
+    throttled (respuestas 429 recibidas).
+
+    fallbacks es una lista de (nombre, configuración) de proveedores que
+    reemplazan al principal cuando una consulta falla. En el lote no se cubren
+    las consultas lentas: duplicarlas consumiría el cupo y el límite de ambos
+    proveedores sin acortar el total.
+    """
+
+    def __init__(self, storage, provider_name: str, config: dict, coachee_ids: List[int],
+                 summary_type: str, date_from: str, date_to: str,
+                 concurrency: Optional[int] = None, cache: Optional[ResponseCache] = None,
+                 progress: Optional[Callable[[dict], None]] = None, save_every: int = 20,
+                 fallbacks: Optional[List[Tuple[str, dict]]] = None):
+        self.storage = storage
+        self.provider_name = provider_name
+        self.config = config
+        self.fallbacks = list(fallbacks or [])
+        self.coachee_ids = list(coachee_ids)
+        self.summary_type = summary_type
+        self.date_from = date_from
+        self.date_to = date_to
+        self.concurrency = concurrency or PROVIDER_CONCURRENCY.get(provider_name, 4)
+        self.cache = cache
+        self.progress = progress
+        self.save_every = save_every
+        self.builder = PromptBuilder.for_provider(provider_name, config)
+        # Límite de consultas del proveedor, para informar cuánto se esperó por él
+        provider = self._create_provider()
+        self.rate_limiter = provider.rate_limiter if provider else None
+        if provider:
+            provider.close()
+        self._cancelled = threading.Event()
+        self._summarizers = set()
+        self._summarizers_lock = threading.Lock()
+
+    def cancel(self):
+        """Los coachees que no empezaron se descartan; lo ya generado se guarda"""
+        self._cancelled.set()
+        with self._summarizers_lock:
+            for summarizer in self._summarizers:
+                summarizer.cancel()
+
+    def run(self) -> dict:
+        started = time.monotonic()
+        limits_before = self.rate_limiter.get_stats() if self.rate_limiter else None
+        total = len(self.coachee_ids)
+        saved = 0
+        skipped = 0
+        failed = []
+        pending = []
+
+        def report(done):
+            elapsed = time.monotonic() - started
+            eta = elapsed / done * (total - done) if done else None
+            self._report({'done': done, 'failed': len(failed), 'skipped': skipped, 'saved': saved,
+                          'total': total, 'elapsed': elapsed, 'eta': eta, **limits()})
+
+        def limits():
+            if limits_before is None:
+                return {'queue_wait': 0.0, 'throttled': 0}
+            stats = self.rate_limiter.get_stats()
+            return {'queue_wait': stats['queue_wait'] - limits_before['queue_wait'],
+                    'throttled': stats['throttled'] - limits_before['throttled']}
+
+        report(0)
+        executor = ThreadPoolExecutor(max_workers=max(1, self.concurrency))
+        try:
+            futures = {executor.submit(self._summarize, coachee_id): coachee_id
+                       for coachee_id in self.coachee_ids}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    summary = future.result()
+                except SummaryCancelled:
+                    continue
+                except Exception as e:
+                    failed.append((futures[future], str(e)))
+                else:
+                    if summary is None:
+                        skipped += 1
+                    else:
+                        pending.append(summary)
+
+                if len(pending) >= self.save_every:
+                    saved += self.storage.add_summaries(pending)
+                    pending = []
+                report(done)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Lo generado antes de un error o una cancelación no se pierde
+            if pending:
+                saved += self.storage.add_summaries(pending)
+
+        return {
+            'saved': saved,
+            'skipped': skipped,
+            'failed': failed,
+            'cancelled': self._cancelled.is_set(),
+            'elapsed': time.monotonic() - started,
+            **limits()
+        }
+
+    def _create_provider(self):
+        return AIProviderFactory.create_with_fallbacks([(self.provider_name, self.config)] + self.fallbacks,
+                                                       hedge=False)
+
+    def _summarize(self, coachee_id: int) -> Optional[dict]:
+        """Resumen listo para add_summaries, o None si el coachee no tiene sesiones"""
+        if self._cancelled.is_set():
+            raise SummaryCancelled()
+
+        sessions = self.storage.get_sessions_by_date_range(coachee_id, self.date_from,
+                                                           self.date_to + " 23:59:59")
+        if not sessions:
+            return None
+        coachee = self.storage.get_coachee(coachee_id)
+        header, entries = coachee_session_entries(coachee, sessions)
+
+        with provider_slots(self.provider_name):
+            if self._cancelled.is_set():
+                raise SummaryCancelled()
+
+            # Cada coachee ocupa un lugar: sus bloques se resumen de a uno
+            summarizer = MapReduceSummarizer(self._create_provider, self.cache, self.builder,
+                                             max_workers=1)
+            with self._summarizers_lock:
+                self._summarizers.add(summarizer)
+            try:
+                prompt = summarizer.build_prompt(self.summary_type, header, entries)
+            finally:
+                with self._summarizers_lock:
+                    self._summarizers.discard(summarizer)
+
+            provider = self._create_provider()
+            # Con respaldo se anota el proveedor que respondió
+            winner = provider
+            if self.cache is not None:
+                provider = CachedProvider(provider, self.cache)
+            try:
+                content = provider.generate_response(prompt)
+            finally:
+                provider.close()
+
+        if not content or content.startswith("Error"):
+            raise RuntimeError(content or "Respuesta vacía")
+
+        return {
+            'coachee_id': coachee_id,
+            'title': summary_title(self.summary_type, coachee, self.date_from, self.date_to),
+            'summary_type': self.summary_type,
+            'content': content,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'ai_provider': getattr(winner, 'last_winner', None) or self.provider_name
+        }
+
+    def _report(self, progress: dict):
+        if self.progress:
+            self.progress(progress)
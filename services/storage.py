@@ -1,20 +1,666 @@
 import sqlite3
+import hashlib
 import json
+import itertools
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from models.coachee import Coachee
 from models.session import Session
+from models.scheduled_session import ScheduledSession
+from models.summary import Summary
+from models.payment_summary import PaymentSummary
+
+
+SESSION_COLUMNS = "id, coachee_id, fecha, notas, pagado, monto"
+SUMMARY_COLUMNS = ("id, coachee_id, title, summary_type, content, sessions_included, "
+                   "date_from, date_to, created_at, ai_provider")
+SCHEDULED_COLUMNS = ("id, coachee_id, scheduled_time, title, notes, duration, "
+                     "notify_enabled, notify_time, status, notified")
+COACHEE_COLUMNS = "id, nombre, apellido, email, telefono"
+
+# Sentencias con nombre de las rutas frecuentes. Cada nombre corresponde a un
+# texto SQL fijo, así que sqlite3 la compila una vez por conexión y las
+# llamadas siguientes la toman de su caché de sentencias.
+STATEMENTS = {
+    'coachee_insert': '''
+        INSERT INTO coachees (nombre, apellido, email, telefono) VALUES (?, ?, ?, ?)
+    ''',
+    'coachee_get': f'SELECT {COACHEE_COLUMNS} FROM coachees WHERE id = ?',
+    'coachee_all': f'SELECT {COACHEE_COLUMNS} FROM coachees ORDER BY apellido, nombre',
+    'coachee_search': f'''
+        SELECT {COACHEE_COLUMNS} FROM coachees
+        WHERE nombre LIKE ? OR apellido LIKE ? OR email LIKE ? OR telefono LIKE ?
+        ORDER BY apellido, nombre
+    ''',
+
+    'session_insert': '''
+        INSERT INTO sessions (coachee_id, fecha, notas, pagado, monto) VALUES (?, ?, ?, ?, ?)
+    ''',
+    'session_by_coachee': f'''
+        SELECT {SESSION_COLUMNS} FROM sessions
+        WHERE coachee_id = ?
+        ORDER BY fecha DESC
+    ''',
+    'session_by_range': f'''
+        SELECT {SESSION_COLUMNS} FROM sessions
+        WHERE coachee_id = ? AND fecha BETWEEN ? AND ?
+        ORDER BY fecha DESC
+    ''',
+    'session_unpaid': f'''
+        SELECT {SESSION_COLUMNS} FROM sessions
+        WHERE coachee_id = ? AND pagado = 0
+        ORDER BY fecha DESC
+    ''',
+    'session_payment_summary': '''
+        SELECT
+            COUNT(*) as total_sessions,
+            SUM(CASE WHEN pagado = 1 THEN 1 ELSE 0 END) as paid_sessions,
+            SUM(CASE WHEN pagado = 0 THEN 1 ELSE 0 END) as unpaid_sessions,
+            SUM(CASE WHEN pagado = 1 THEN monto ELSE 0 END) as total_paid,
+            SUM(CASE WHEN pagado = 0 THEN monto ELSE 0 END) as total_pending
+        FROM sessions
+        WHERE coachee_id = ?
+    ''',
+    # Las sesiones pagadas archivadas siguen contando en los totales
+    'session_payment_summary_archived': '''
+        SELECT
+            COUNT(*) as total_sessions,
+            SUM(CASE WHEN pagado = 1 THEN 1 ELSE 0 END) as paid_sessions,
+            SUM(CASE WHEN pagado = 0 THEN 1 ELSE 0 END) as unpaid_sessions,
+            SUM(CASE WHEN pagado = 1 THEN monto ELSE 0 END) as total_paid,
+            SUM(CASE WHEN pagado = 0 THEN monto ELSE 0 END) as total_pending
+        FROM (
+            SELECT pagado, monto FROM main.sessions WHERE coachee_id = ?
+            UNION ALL
+            SELECT pagado, monto FROM archive.sessions WHERE coachee_id = ?
+        )
+    ''',
+
+    'summary_insert': '''
+        INSERT INTO summaries (
+            coachee_id, title, summary_type, content,
+            sessions_included, date_from, date_to,
+            created_at, ai_provider
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'summary_by_coachee': f'''
+        SELECT {SUMMARY_COLUMNS} FROM summaries
+        WHERE coachee_id = ?
+        ORDER BY created_at DESC
+    ''',
+    'summary_all': f'SELECT {SUMMARY_COLUMNS} FROM summaries ORDER BY created_at DESC',
+
+    'scheduled_by_date': f'''
+        SELECT {SCHEDULED_COLUMNS} FROM scheduled_sessions
+        WHERE date(scheduled_time) = ?
+        ORDER BY scheduled_time
+    ''',
+    'scheduled_all': f'SELECT {SCHEDULED_COLUMNS} FROM scheduled_sessions ORDER BY scheduled_time',
+    'scheduled_by_coachee': f'''
+        SELECT {SCHEDULED_COLUMNS} FROM scheduled_sessions
+        WHERE coachee_id = ?
+        ORDER BY scheduled_time DESC
+    ''',
+    'scheduled_upcoming': '''
+        SELECT s.id, s.coachee_id, s.scheduled_time, s.title, s.notes,
+               s.duration, s.notify_enabled, s.notify_time, s.status, s.notified,
+               c.nombre || ' ' || c.apellido
+        FROM scheduled_sessions s
+        JOIN coachees c ON c.id = s.coachee_id
+        WHERE s.status = 'scheduled' AND s.scheduled_time > ? AND s.scheduled_time <= ?
+        ORDER BY s.scheduled_time
+        LIMIT ?
+    ''',
+    'scheduled_status_by_day': '''
+        SELECT substr(scheduled_time, 1, 10) AS day,
+               SUM(status NOT IN ('completed', 'cancelled')),
+               SUM(status = 'completed'),
+               SUM(status = 'cancelled')
+        FROM scheduled_sessions
+        WHERE scheduled_time >= ? AND scheduled_time < ?
+        GROUP BY day
+    ''',
+    'scheduled_update_status': 'UPDATE scheduled_sessions SET status = ? WHERE id = ?',
+    # El "+" evita que SQLite prefiera el índice por estado frente al parcial
+    'reminder_next': '''
+        SELECT MIN(notify_at) FROM scheduled_sessions
+        WHERE notified = 0 AND notify_at IS NOT NULL AND +status = 'scheduled'
+    ''',
+    'reminder_due': f'''
+        SELECT {SCHEDULED_COLUMNS} FROM scheduled_sessions
+        WHERE notified = 0 AND notify_at IS NOT NULL AND notify_at <= ?
+          AND +status = 'scheduled'
+        ORDER BY notify_at
+    ''',
+    'reminder_mark_notified': 'UPDATE scheduled_sessions SET notified = 1 WHERE id = ?',
+
+    'setting_get': 'SELECT value FROM settings WHERE key = ?',
+    'setting_save': 'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)'
+}
+
+# Anticipación de los recordatorios, en minutos, según la etiqueta elegida por el usuario
+NOTIFY_OFFSETS = {
+    '5 minutos antes': 5,
+    '15 minutos antes': 15,
+    '30 minutos antes': 30,
+    '1 hora antes': 60,
+    '1 día antes': 1440
+}
+DEFAULT_NOTIFY_OFFSET = 30
+
+# Tablas y columnas que se registran en el change_log para sincronizar entre
+# instalaciones, en orden de dependencia. coachee_id viaja como el uid del coachee.
+SYNC_TABLES = {
+    'coachees': ('nombre', 'apellido', 'email', 'telefono'),
+    'sessions': ('coachee_id', 'fecha', 'notas', 'pagado', 'monto'),
+    'summaries': ('coachee_id', 'title', 'summary_type', 'content', 'sessions_included',
+                  'date_from', 'date_to', 'created_at', 'ai_provider'),
+    'scheduled_sessions': ('coachee_id', 'scheduled_time', 'title', 'notes', 'duration',
+                           'notify_enabled', 'notify_time', 'status', 'notify_at')
+}
+CHANGE_COLUMNS = "device_id, device_seq, table_name, row_uid, column_name, value, changed_at"
+
+
+class StorageBackend(ABC):
+    """Interfaz de almacenamiento de la que dependen las vistas"""
+
+    # Archivo de datos antiguos
+    @abstractmethod
+    def has_archive(self) -> bool:
+        pass
+
+    @abstractmethod
+    def get_archive_cutoff(self) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def archive_before(self, cutoff: str) -> dict:
+        pass
+
+    # Mantenimiento
+    @abstractmethod
+    def get_database_stats(self) -> dict:
+        pass
+
+    @abstractmethod
+    def run_maintenance(self, budget: float = 1.0, allow_vacuum: bool = False) -> dict:
+        pass
+
+    # Resúmenes
+    @abstractmethod
+    def add_summary(self, summary_data: dict) -> int:
+        pass
+
+    @abstractmethod
+    def add_summaries(self, summaries: List[dict]) -> int:
+        pass
+
+    @abstractmethod
+    def get_summaries_by_coachee(self, coachee_id: int, include_archive: bool = False) -> List[Summary]:
+        pass
+
+    @abstractmethod
+    def get_all_summaries(self, include_archive: bool = False) -> List[Summary]:
+        pass
+
+    @abstractmethod
+    def get_summaries_page(self, coachee_id: Optional[int] = None, summary_type: Optional[str] = None,
+                           limit: int = 50, offset: int = 0,
+                           include_archive: bool = False) -> List[Tuple[Summary, str]]:
+        pass
+
+    @abstractmethod
+    def count_summaries(self, coachee_id: Optional[int] = None, summary_type: Optional[str] = None,
+                        include_archive: bool = False) -> int:
+        pass
+
+    @abstractmethod
+    def delete_summary(self, summary_id: int):
+        pass
+
+    # Sesiones
+    @abstractmethod
+    def add_session(self, session: Session) -> int:
+        pass
+
+    @abstractmethod
+    def get_sessions_by_coachee(self, coachee_id: int, include_archive: bool = False) -> List[Session]:
+        pass
+
+    @abstractmethod
+    def get_sessions_by_date_range(self, coachee_id: int, date_from: str, date_to: str) -> List[Session]:
+        pass
+
+    @abstractmethod
+    def get_sessions_with_coachee_by_date_range(self, date_from: str, date_to: str) -> List[Tuple[Coachee, Session]]:
+        pass
+
+    @abstractmethod
+    def iter_sessions_with_coachee_by_date_range(self, date_from: str, date_to: str,
+                                                 batch_size: int = 200) -> Iterator[Tuple[Coachee, Session]]:
+        pass
+
+    @abstractmethod
+    def count_sessions(self, coachee_id: Optional[int] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None, paid: Optional[bool] = None,
+                       include_archive: bool = False) -> int:
+        pass
+
+    @abstractmethod
+    def has_sessions(self, coachee_id: Optional[int] = None, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None, paid: Optional[bool] = None,
+                     include_archive: bool = False) -> bool:
+        pass
+
+    @abstractmethod
+    def update_session_payment(self, session_id: int, pagado: bool, monto: float = 0):
+        pass
+
+    @abstractmethod
+    def get_unpaid_sessions_by_coachee(self, coachee_id: int) -> List[Session]:
+        pass
+
+    @abstractmethod
+    def get_payment_summary_by_coachee(self, coachee_id: int) -> PaymentSummary:
+        pass
+
+    # Sesiones programadas
+    @abstractmethod
+    def add_scheduled_session(self, session_data: dict) -> int:
+        pass
+
+    @abstractmethod
+    def get_sessions_by_date(self, date_str: str) -> List[ScheduledSession]:
+        pass
+
+    @abstractmethod
+    def get_all_scheduled_sessions(self) -> List[ScheduledSession]:
+        pass
+
+    @abstractmethod
+    def get_sessions_by_coachee_calendar(self, coachee_id: int) -> List[ScheduledSession]:
+        pass
+
+    @abstractmethod
+    def get_upcoming_scheduled_sessions(self, after: str, limit: int = 10,
+                                        until: Optional[str] = None) -> List[Tuple[ScheduledSession, str]]:
+        pass
+
+    @abstractmethod
+    def count_scheduled_sessions(self, coachee_id: Optional[int] = None, status: Optional[str] = None,
+                                 date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+        pass
+
+    @abstractmethod
+    def get_scheduled_status_by_day(self, date_from: str, date_to: str) -> Dict[str, Tuple[int, int, int]]:
+        pass
+
+    @abstractmethod
+    def get_calendar_month_status(self, year: int, month: int) -> Dict[int, Tuple[int, int, int]]:
+        pass
+
+    @abstractmethod
+    def update_session_status(self, session_id: int, status: str):
+        pass
+
+    @abstractmethod
+    def delete_scheduled_session(self, session_id: int):
+        pass
+
+    # Recordatorios
+    @abstractmethod
+    def get_next_reminder_time(self) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def get_due_reminders(self, now: str) -> List[ScheduledSession]:
+        pass
+
+    @abstractmethod
+    def mark_session_notified(self, session_id: int):
+        pass
+
+    @abstractmethod
+    def mark_sessions_notified(self, session_ids: List[int]):
+        pass
+
+    @abstractmethod
+    def record_reminder_events(self, delivered: List[Tuple[int, str]],
+                               acknowledged: List[Tuple[int, str]]):
+        pass
+
+    # Coachees
+    @abstractmethod
+    def add_coachee(self, coachee: Coachee) -> int:
+        pass
+
+    @abstractmethod
+    def get_all_coachees(self) -> List[Coachee]:
+        pass
+
+    @abstractmethod
+    def search_coachees(self, query: str) -> List[Coachee]:
+        pass
+
+    @abstractmethod
+    def get_coachee(self, coachee_id: int) -> Optional[Coachee]:
+        pass
+
+    # Configuración
+    @abstractmethod
+    def save_setting(self, key: str, value):
+        pass
+
+    @abstractmethod
+    def get_setting(self, key: str, default=None):
+        pass
 
 
-class Storage:
-    def __init__(self, db_path: str = "onto-ai.db"):
+class LockStats:
+    """Métricas de espera por bloqueos de la base de datos, por método"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.methods = {}
+
+    def record(self, method: str, waited: float, retries: int, failed: bool):
+        with self._lock:
+            stats = self.methods.setdefault(method, {
+                'calls': 0, 'retries': 0, 'failures': 0, 'total_wait': 0.0, 'max_wait': 0.0
+            })
+            stats['calls'] += 1
+            stats['retries'] += retries
+            stats['failures'] += 1 if failed else 0
+            stats['total_wait'] += waited
+            stats['max_wait'] = max(stats['max_wait'], waited)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Copia de las métricas de las llamadas que tuvieron que esperar"""
+        with self._lock:
+            return {method: dict(stats) for method, stats in self.methods.items()}
+
+    def totals(self) -> dict:
+        """Métricas agregadas de todos los métodos"""
+        totals = {'calls': 0, 'retries': 0, 'failures': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+        for stats in self.snapshot().values():
+            for key in ('calls', 'retries', 'failures', 'total_wait'):
+                totals[key] += stats[key]
+            totals['max_wait'] = max(totals['max_wait'], stats['max_wait'])
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self.methods.clear()
+
+
+class StatementStats:
+    """Ejecuciones de cada sentencia con nombre y cuántas encontraron la sentencia ya compilada"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements = {}
+
+    def record(self, name: str, hit: bool):
+        with self._lock:
+            stats = self.statements.setdefault(name, {'executions': 0, 'hits': 0, 'misses': 0})
+            stats['executions'] += 1
+            stats['hits' if hit else 'misses'] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self.statements.items()}
+
+    def totals(self) -> dict:
+        totals = {'executions': 0, 'hits': 0, 'misses': 0}
+        for stats in self.snapshot().values():
+            for key in totals:
+                totals[key] += stats[key]
+        totals['hit_rate'] = totals['hits'] / totals['executions'] if totals['executions'] else 0.0
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+
+
+class _StatementConnection(sqlite3.Connection):
+    """Conexión que replica el LRU de sentencias compiladas de sqlite3
+
+    Cada conexión compila sus propias sentencias, así que el acierto de caché
+    se cuenta en la conexión del cursor que las ejecuta.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cached_statements = kwargs.get('cached_statements', 128)
+        self._prepared = OrderedDict()
+
+    def touch(self, sql: str) -> bool:
+        """Registra el uso de una sentencia y devuelve si ya estaba en la caché"""
+        hit = sql in self._prepared
+        if hit:
+            self._prepared.move_to_end(sql)
+        else:
+            self._prepared[sql] = True
+            if len(self._prepared) > self.cached_statements:
+                self._prepared.popitem(last=False)
+        return hit
+
+
+class _PersistentConnection:
+    """Conexión de un hilo que se conserva entre llamadas a Storage
+
+    close() no cierra la conexión: al terminar la llamada más externa se
+    cierran los cursores (liberando los bloqueos de lectura) y se descarta
+    cualquier transacción que haya quedado abierta. Así sqlite3 conserva las
+    sentencias compiladas de una llamada a la siguiente.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.depth = 0
+        self.closed = False
+        self.archive_attached = False
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def cursor(self) -> sqlite3.Cursor:
+        cursor = self.conn.cursor()
+        self._cursors.append(cursor)
+        return cursor
+
+    def release(self):
+        """Deja la conexión lista para la próxima llamada"""
+        for cursor in self._cursors:
+            cursor.close()
+        self._cursors.clear()
+        if self.conn.in_transaction:
+            self.conn.rollback()
+
+    def close(self):
+        # Las llamadas anidadas comparten la conexión: solo libera la más externa
+        if self.depth == 0:
+            self.release()
+
+    def shutdown(self):
+        self.closed = True
+        self._cursors.clear()
+        self.conn.close()
+
+
+def _is_lock_error(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def retry_on_lock(method):
+    """Reintenta el método completo si la base está bloqueada por otra conexión
+
+    Cada método de Storage confirma una sola transacción, así que repetirlo
+    tras un bloqueo es seguro. Cada intento delimita además el uso de la
+    conexión persistente del hilo, que se libera al terminar (ver
+    _PersistentConnection).
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.monotonic()
+        retries = 0
+        while True:
+            attempt_started = time.monotonic()
+            conn = self._thread_connection()
+            conn.depth += 1
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception as e:
+                # Se libera antes de esperar para no retener bloqueos durante la espera
+                conn.depth -= 1
+                conn.close()
+                if not isinstance(e, sqlite3.OperationalError) or not _is_lock_error(e):
+                    raise
+                elapsed = time.monotonic() - started
+                if retries >= self.max_retries or elapsed >= self.busy_timeout:
+                    self.lock_stats.record(method.__name__, elapsed, retries, failed=True)
+                    raise
+                # Espera exponencial con jitter completo, sin pasarse del límite total
+                delay = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * (2 ** retries))
+                delay = min(random.uniform(0, delay), self.busy_timeout - elapsed)
+                time.sleep(max(0.0, delay))
+                retries += 1
+                continue
+
+            conn.depth -= 1
+            conn.close()
+            if retries:
+                self.lock_stats.record(method.__name__, attempt_started - started, retries, failed=False)
+            return result
+
+    return wrapper
+
+
+class Storage(StorageBackend):
+    """Almacenamiento en un archivo SQLite"""
+
+    # Espera interna de SQLite en cada intento antes de devolver "database is locked"
+    LOCK_POLL_TIMEOUT = 0.05
+    # Espera entre reintentos: exponencial desde la base hasta el máximo, con jitter
+    RETRY_BASE_DELAY = 0.01
+    RETRY_MAX_DELAY = 0.25
+
+    # Mantenimiento: páginas liberadas por tramo, filas analizadas por índice y
+    # tamaño máximo de una base que se convierte a incremental_vacuum con VACUUM
+    VACUUM_CHUNK_PAGES = 256
+    ANALYSIS_LIMIT = 1000
+    VACUUM_CONVERT_MAX_BYTES = 64 * 1024 * 1024
+    # Velocidad supuesta de un VACUUM completo, para ver si entra en el presupuesto
+    VACUUM_BYTES_PER_SECOND = 16 * 1024 * 1024
+
+    def __init__(self, db_path: str = "onto-ai.db", archive_path: Optional[str] = None,
+                 busy_timeout: float = 5.0, max_retries: int = 50, cached_statements: int = 128):
         self.db_path = db_path
+        # La base de archivo vive junto a la principal salvo que se indique otra ruta
+        self.archive_path = archive_path or str(Path(db_path).with_name("archive.db"))
+        # Tiempo máximo total que una llamada espera por bloqueos, y reintentos permitidos
+        self.busy_timeout = busy_timeout
+        self.max_retries = max_retries
+        self.lock_stats = LockStats()
+        # Sentencias compiladas que conserva cada conexión persistente
+        self.cached_statements = cached_statements
+        self.statement_stats = StatementStats()
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
         self.init_database()
 
+    def _open_connection(self, timeout: float) -> sqlite3.Connection:
+        """Abre una conexión que toma el bloqueo de escritura al iniciar la transacción
+
+        Con BEGIN IMMEDIATE un escritor espera en el inicio de la transacción en
+        lugar de fallar a mitad de camino al intentar pasar de lectura a escritura.
+        """
+        return sqlite3.connect(
+            self.db_path,
+            timeout=timeout,
+            isolation_level='IMMEDIATE',
+            cached_statements=self.cached_statements,
+            # Storage.close() puede cerrar las conexiones de otros hilos
+            check_same_thread=False,
+            factory=_StatementConnection
+        )
+
+    def _thread_connection(self) -> _PersistentConnection:
+        """Devuelve la conexión persistente del hilo actual, abriéndola si hace falta"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = _PersistentConnection(self._open_connection(self.LOCK_POLL_TIMEOUT))
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.add(conn)
+        return conn
+
+    def _connect(self, timeout: Optional[float] = None):
+        """Devuelve la conexión persistente del hilo, o una conexión propia si se indica timeout
+
+        La conexión propia (para generadores, que no pasan por retry_on_lock)
+        se cierra de verdad con close().
+        """
+        if timeout is not None:
+            return self._open_connection(timeout)
+        return self._thread_connection()
+
+    def _execute(self, cursor: sqlite3.Cursor, name: str, params=()) -> sqlite3.Cursor:
+        """Ejecuta una sentencia del registro STATEMENTS y cuenta si ya estaba compilada"""
+        sql = STATEMENTS[name]
+        self.statement_stats.record(name, cursor.connection.touch(sql))
+        return cursor.execute(sql, params)
+
+    def _executemany(self, cursor: sqlite3.Cursor, name: str, seq_of_params) -> sqlite3.Cursor:
+        """Como _execute, para una sentencia que se compila una vez y se aplica a cada fila"""
+        sql = STATEMENTS[name]
+        self.statement_stats.record(name, cursor.connection.touch(sql))
+        return cursor.executemany(sql, seq_of_params)
+
+    def get_statement_stats(self) -> dict:
+        """Ejecuciones y aciertos de caché de las sentencias con nombre"""
+        with self._connections_lock:
+            connections = len(self._connections)
+        return {
+            'cached_statements': self.cached_statements,
+            'connections': connections,
+            'statements': self.statement_stats.snapshot(),
+            'totals': self.statement_stats.totals()
+        }
+
+    def close(self):
+        """Cierra las conexiones persistentes; se vuelven a abrir si se sigue usando"""
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.shutdown()
+
+    @retry_on_lock
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
+        # Permite devolver páginas libres con incremental_vacuum. En una base nueva
+        # se aplica de inmediato; en una existente, en la próxima conversión (VACUUM)
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS coachees (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -87,23 +733,624 @@ class Storage:
             )
         ''')
 
+        # Momento precalculado del recordatorio para no recorrer todas las sesiones
+        cursor.execute("PRAGMA table_info(scheduled_sessions)")
+        scheduled_columns = [column[1] for column in cursor.fetchall()]
+
+        if 'notify_at' not in scheduled_columns:
+            cursor.execute('ALTER TABLE scheduled_sessions ADD COLUMN notify_at TEXT')
+            cursor.execute('''
+                SELECT id, scheduled_time, notify_enabled, notify_time
+                FROM scheduled_sessions
+                WHERE notify_enabled = 1
+            ''')
+            cursor.executemany(
+                'UPDATE scheduled_sessions SET notify_at = ? WHERE id = ?',
+                [(self.compute_notify_at(row[1], True, row[3]), row[0]) for row in cursor.fetchall()]
+            )
+
+        # Registro de entrega y confirmación de los recordatorios
+        for column in ('delivered_at', 'acknowledged_at'):
+            if column not in scheduled_columns:
+                cursor.execute(f'ALTER TABLE scheduled_sessions ADD COLUMN {column} TEXT')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_scheduled_sessions_pending_notify
+            ON scheduled_sessions (notify_at)
+            WHERE notified = 0 AND notify_at IS NOT NULL
+        ''')
+
+        self._create_change_log(cursor)
+
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_coachee_fecha ON sessions (coachee_id, fecha)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_fecha ON sessions (fecha)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_summaries_created_at ON summaries (created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_summaries_coachee_created ON summaries (coachee_id, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_summaries_type_created ON summaries (summary_type, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_scheduled_sessions_time ON scheduled_sessions (scheduled_time)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_scheduled_sessions_status_time ON scheduled_sessions (status, scheduled_time)')
+
+        conn.commit()
+        conn.close()
+
+    def _create_change_log(self, cursor):
+        """Crea el registro de cambios por fila y los triggers que lo alimentan
+
+        Cada fila sincronizable tiene un uid estable entre instalaciones. Los
+        triggers anotan cada campo insertado o modificado y cada borrado con el
+        número de secuencia siguiente de este dispositivo. Mientras
+        sync_state.capture vale '0' (al archivar o al aplicar cambios remotos)
+        no se anota nada.
+
+        El identificador del dispositivo queda ligado al equipo y la ruta del
+        archivo (sync_state.device_home). Una base copiada a otra ruta u otro
+        equipo recibe un identificador nuevo al abrirse, antes de anotar
+        cambios propios; si no, las dos copias se tomarían por el mismo
+        dispositivo y no intercambiarían nada.
+
+        sync_acknowledged guarda hasta qué secuencia de cada dispositivo tiene
+        ya el transporte de sincronización (ver compact_change_log).
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('device_id', ?)",
+                       (uuid.uuid4().hex,))
+        cursor.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('capture', '1')")
+
+        device_home = f"{socket.gethostname()}:{os.path.abspath(self.db_path)}"
+        cursor.execute("SELECT value FROM sync_state WHERE key = 'device_home'")
+        row = cursor.fetchone()
+        if row is None or row[0] != device_home:
+            # Bases de antes de device_home incluidas: pueden ser copias hechas sin él
+            if row is not None or self._has_changes(cursor):
+                cursor.execute("UPDATE sync_state SET value = ? WHERE key = 'device_id'", (uuid.uuid4().hex,))
+            cursor.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('device_home', ?)",
+                           (device_home,))
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_id TEXT NOT NULL,
+                device_seq INTEGER NOT NULL,
+                table_name TEXT NOT NULL,
+                row_uid TEXT NOT NULL,
+                column_name TEXT,
+                value,
+                changed_at TEXT NOT NULL,
+                UNIQUE (device_id, device_seq)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_change_log_field
+            ON change_log (table_name, row_uid, column_name, changed_at)
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_acknowledged (
+                device_id TEXT PRIMARY KEY,
+                device_seq INTEGER NOT NULL
+            )
+        ''')
+
+        capturing = "(SELECT value FROM sync_state WHERE key = 'capture') = '1'"
+
+        def log_statement(table, uid, column, value, condition=''):
+            return f'''
+                INSERT INTO change_log ({CHANGE_COLUMNS})
+                SELECT d.value,
+                       (SELECT COALESCE(MAX(device_seq), 0) + 1 FROM change_log WHERE device_id = d.value),
+                       '{table}', {uid}, {column}, {value},
+                       strftime('%Y-%m-%d %H:%M:%f', 'now')
+                FROM sync_state d
+                WHERE d.key = 'device_id'{condition};
+            '''
+
+        def column_value(row, column):
+            if column == 'coachee_id':
+                return f"(SELECT uid FROM coachees WHERE id = {row}.coachee_id)"
+            return f"{row}.{column}"
+
+        triggers = []
+        for table, columns in SYNC_TABLES.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            if 'uid' not in [column[1] for column in cursor.fetchall()]:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN uid TEXT')
+                # Derivado del id: dos copias de la misma base coinciden al sincronizar
+                cursor.execute(f"UPDATE {table} SET uid = '{table}-' || id")
+            cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uid ON {table} (uid)')
+
+            new_uid = f"(SELECT uid FROM {table} WHERE id = NEW.id)"
+            fill_uid = f"UPDATE {table} SET uid = lower(hex(randomblob(16))) WHERE id = NEW.id AND uid IS NULL;"
+
+            triggers.append((f'trg_{table}_uid', f'''
+                CREATE TRIGGER trg_{table}_uid AFTER INSERT ON {table}
+                WHEN NEW.uid IS NULL
+                BEGIN
+                    {fill_uid}
+                END
+            '''))
+            triggers.append((f'trg_{table}_insert', f'''
+                CREATE TRIGGER trg_{table}_insert AFTER INSERT ON {table}
+                WHEN {capturing}
+                BEGIN
+                    {fill_uid}
+                    {''.join(log_statement(table, new_uid, f"'{column}'", column_value('NEW', column))
+                             for column in columns)}
+                END
+            '''))
+            triggers.append((f'trg_{table}_update', f'''
+                CREATE TRIGGER trg_{table}_update AFTER UPDATE ON {table}
+                WHEN {capturing}
+                BEGIN
+                    {''.join(log_statement(table, 'NEW.uid', f"'{column}'", column_value('NEW', column),
+                                           f" AND OLD.{column} IS NOT NEW.{column}")
+                             for column in columns)}
+                END
+            '''))
+            triggers.append((f'trg_{table}_delete', f'''
+                CREATE TRIGGER trg_{table}_delete AFTER DELETE ON {table}
+                WHEN {capturing}
+                BEGIN
+                    {log_statement(table, 'OLD.uid', 'NULL', 'NULL')}
+                END
+            '''))
+
+        # Los triggers se recrean solo si cambió su definición (por ejemplo, SYNC_TABLES)
+        version = hashlib.sha1(''.join(sql for _, sql in triggers).encode('utf-8')).hexdigest()
+        cursor.execute("SELECT value FROM sync_state WHERE key = 'trigger_version'")
+        row = cursor.fetchone()
+        if row is None or row[0] != version:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            for (name,) in cursor.fetchall():
+                if name.startswith('trg_'):
+                    cursor.execute(f'DROP TRIGGER {name}')
+            for _, sql in triggers:
+                cursor.execute(sql)
+            cursor.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('trigger_version', ?)",
+                           (version,))
+
+    @staticmethod
+    def _has_changes(cursor) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_log'")
+        if not cursor.fetchone():
+            return False
+        cursor.execute('SELECT 1 FROM change_log LIMIT 1')
+        return cursor.fetchone() is not None
+
+    # Métodos de sincronización
+    @retry_on_lock
+    def get_device_id(self) -> str:
+        """Identificador de esta instalación en el change_log"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT value FROM sync_state WHERE key = 'device_id'")
+
+        device_id = cursor.fetchone()[0]
+        conn.close()
+
+        return device_id
+
+    @retry_on_lock
+    def get_change_vector(self) -> Dict[str, int]:
+        """Último número de secuencia conocido de cada dispositivo"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT device_id, MAX(device_seq) FROM change_log GROUP BY device_id')
+
+        vector = dict(cursor.fetchall())
+        conn.close()
+
+        return vector
+
+    @retry_on_lock
+    def get_changes(self, device_id: str, after_seq: int = 0, limit: int = -1) -> List[tuple]:
+        """Cambios de un dispositivo posteriores a una secuencia, en orden"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            SELECT {CHANGE_COLUMNS} FROM change_log
+            WHERE device_id = ? AND device_seq > ?
+            ORDER BY device_seq
+            LIMIT ?
+        ''', (device_id, after_seq, limit))
+
+        changes = cursor.fetchall()
+        conn.close()
+
+        return changes
+
+    @retry_on_lock
+    def acknowledge_changes(self, vector: Dict[str, int]):
+        """Anota que el transporte ya tiene los cambios de cada dispositivo hasta esa secuencia"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.executemany('''
+            INSERT INTO sync_acknowledged (device_id, device_seq) VALUES (?, ?)
+            ON CONFLICT (device_id) DO UPDATE SET device_seq = MAX(device_seq, excluded.device_seq)
+        ''', vector.items())
+
         conn.commit()
         conn.close()
 
+    @retry_on_lock
+    def compact_change_log(self) -> int:
+        """Descarta del change_log los valores que ya no hace falta enviar
+
+        Ver _compact_change_log. Devuelve la cantidad de cambios descartados.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            removed = self._compact_change_log(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        return removed
+
+    @staticmethod
+    def _compact_change_log(cursor) -> int:
+        """Conserva solo el último valor de cada campo entre los cambios ya publicados
+
+        Un cambio de campo se descarta cuando el transporte ya lo tiene
+        (sync_acknowledged; si la base nunca se sincronizó, todos cuentan como
+        publicados) y además otro cambio posterior lo reemplaza, la fila se
+        borró o la fila ya no está en la base principal (por ejemplo, porque se
+        archivó). Los borrados se conservan siempre, y también el último cambio
+        de cada dispositivo: de él sale la próxima secuencia y el vector.
+        """
+        missing_row = ' OR '.join(
+            f"(c.table_name = '{table}' AND NOT EXISTS (SELECT 1 FROM main.{table} WHERE uid = c.row_uid))"
+            for table in SYNC_TABLES
+        )
+        cursor.execute(f'''
+            DELETE FROM main.change_log AS c
+            WHERE c.column_name IS NOT NULL
+              AND c.device_seq < (SELECT MAX(device_seq) FROM main.change_log WHERE device_id = c.device_id)
+              AND (NOT EXISTS (SELECT 1 FROM main.sync_acknowledged)
+                   OR c.device_seq <= (SELECT device_seq FROM main.sync_acknowledged
+                                       WHERE device_id = c.device_id))
+              AND (EXISTS (SELECT 1 FROM main.change_log n
+                           WHERE n.table_name = c.table_name AND n.row_uid = c.row_uid
+                             AND (n.column_name IS NULL
+                                  OR (n.column_name = c.column_name
+                                      AND (n.changed_at > c.changed_at
+                                           OR (n.changed_at = c.changed_at
+                                               AND (n.device_id > c.device_id
+                                                    OR (n.device_id = c.device_id
+                                                        AND n.device_seq > c.device_seq)))))))
+                   OR {missing_row})
+        ''')
+        return cursor.rowcount
+
+    @retry_on_lock
+    def apply_changes(self, changes: List[tuple]) -> int:
+        """Aplica cambios de otros dispositivos, gana la escritura más reciente por campo
+
+        Los cambios ya conocidos se ignoran. Un borrado es definitivo: los
+        cambios posteriores sobre esa fila se descartan. Devuelve la cantidad
+        de campos o filas modificados.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        applied = 0
+
+        try:
+            cursor.execute("UPDATE sync_state SET value = '0' WHERE key = 'capture'")
+
+            for table, columns in SYNC_TABLES.items():
+                new_rows = {}
+                table_changes = sorted(
+                    (change for change in changes if change[2] == table and (change[4] is None or change[4] in columns)),
+                    key=lambda change: (change[6], change[0], change[1])
+                )
+
+                for change in table_changes:
+                    device_id, device_seq, _, uid, column, value, changed_at = change
+
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO change_log ({CHANGE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', change)
+                    if cursor.rowcount == 0:
+                        continue
+
+                    if column is None:
+                        cursor.execute(f'DELETE FROM {table} WHERE uid = ?', (uid,))
+                        applied += cursor.rowcount
+                        new_rows.pop(uid, None)
+                        continue
+
+                    cursor.execute('''
+                        SELECT 1 FROM change_log
+                        WHERE table_name = ? AND row_uid = ?
+                          AND (column_name IS NULL
+                               OR (column_name = ? AND (changed_at > ? OR (changed_at = ? AND device_id > ?))))
+                        LIMIT 1
+                    ''', (table, uid, column, changed_at, changed_at, device_id))
+                    if cursor.fetchone():
+                        continue
+
+                    if column == 'coachee_id':
+                        cursor.execute('SELECT id FROM coachees WHERE uid = ?', (value,))
+                        coachee = cursor.fetchone()
+                        if not coachee:
+                            continue
+                        value = coachee[0]
+
+                    cursor.execute(f'UPDATE {table} SET {column} = ? WHERE uid = ?', (value, uid))
+                    if cursor.rowcount:
+                        applied += 1
+                    else:
+                        new_rows.setdefault(uid, {})[column] = value
+
+                # Filas que no existen aquí: se crean con los campos recibidos
+                for uid, values in new_rows.items():
+                    names = ', '.join(values)
+                    placeholders = ', '.join('?' for _ in values)
+                    try:
+                        cursor.execute(
+                            f'INSERT INTO {table} (uid, {names}) VALUES (?, {placeholders})',
+                            (uid, *values.values())
+                        )
+                        applied += 1
+                    except sqlite3.IntegrityError:
+                        # Faltan columnas obligatorias: la fila se archivó o nunca llegó completa
+                        pass
+
+            cursor.execute("UPDATE sync_state SET value = '1' WHERE key = 'capture'")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        return applied
+
+    # Métodos de archivo (datos antiguos)
+    def has_archive(self) -> bool:
+        """Indica si existe una base de archivo con datos antiguos"""
+        return Path(self.archive_path).exists()
+
+    def get_archive_cutoff(self) -> Optional[str]:
+        """Devuelve la fecha de corte hasta la que se archivaron datos"""
+        return self.get_setting('archive_cutoff')
+
+    def _attach_archive(self, cursor, create: bool = False) -> bool:
+        """Adjunta la base de archivo a la conexión si existe (o la crea si se pide)"""
+        if not create and not self.has_archive():
+            return False
+
+        # La conexión persistente conserva el archivo adjunto entre llamadas
+        conn = getattr(self._local, 'conn', None)
+        persistent = conn is not None and conn.conn is cursor.connection
+        if not (persistent and conn.archive_attached):
+            cursor.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+            if persistent:
+                conn.archive_attached = True
+
+        if create:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archive.sessions (
+                    id INTEGER PRIMARY KEY,
+                    coachee_id INTEGER NOT NULL,
+                    fecha TEXT NOT NULL,
+                    notas TEXT NOT NULL,
+                    pagado INTEGER DEFAULT 0,
+                    monto REAL DEFAULT 0
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archive.summaries (
+                    id INTEGER PRIMARY KEY,
+                    coachee_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    summary_type TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    sessions_included TEXT,
+                    date_from TEXT,
+                    date_to TEXT,
+                    created_at TEXT NOT NULL,
+                    ai_provider TEXT
+                )
+            ''')
+
+            cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_sessions_coachee_fecha ON sessions (coachee_id, fecha)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_summaries_coachee ON summaries (coachee_id, created_at)')
+
+        return True
+
+    def _needs_archive(self, date_from: str) -> bool:
+        """Indica si un rango que empieza en date_from puede incluir datos archivados"""
+        cutoff = self.get_archive_cutoff()
+        return bool(cutoff) and date_from < cutoff and self.has_archive()
+
+    @retry_on_lock
+    def archive_before(self, cutoff: str) -> dict:
+        """Mueve las sesiones y resúmenes anteriores a la fecha de corte a la base de archivo"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            self._attach_archive(cursor, create=True)
+
+            # Archivar no es borrar: los traspasos no se anotan en el change_log
+            cursor.execute("UPDATE main.sync_state SET value = '0' WHERE key = 'capture'")
+
+            # Un único commit abarca ambos archivos, así que el traspaso es atómico.
+            # Las sesiones impagas se quedan en la base principal: siguen siendo cobros abiertos.
+            cursor.execute(f'''
+                INSERT INTO archive.sessions ({SESSION_COLUMNS})
+                SELECT {SESSION_COLUMNS} FROM main.sessions WHERE fecha < ? AND pagado = 1
+            ''', (cutoff,))
+            sessions_moved = cursor.rowcount
+            cursor.execute('DELETE FROM main.sessions WHERE fecha < ? AND pagado = 1', (cutoff,))
+
+            cursor.execute(f'''
+                INSERT INTO archive.summaries ({SUMMARY_COLUMNS})
+                SELECT {SUMMARY_COLUMNS} FROM main.summaries WHERE created_at < ?
+            ''', (cutoff,))
+            summaries_moved = cursor.rowcount
+            cursor.execute('DELETE FROM main.summaries WHERE created_at < ?', (cutoff,))
+
+            # Las notas archivadas no quedan copiadas en el change_log de la base principal
+            self._compact_change_log(cursor)
+
+            previous_cutoff = self.get_archive_cutoff()
+            if not previous_cutoff or cutoff > previous_cutoff:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO main.settings (key, value) VALUES ('archive_cutoff', ?)
+                ''', (cutoff,))
+
+            cursor.execute("UPDATE main.sync_state SET value = '1' WHERE key = 'capture'")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        return {
+            'sessions': sessions_moved,
+            'summaries': summaries_moved
+        }
+
+    # Métodos de mantenimiento
+    def _database_file_size(self) -> Optional[int]:
+        """Tamaño del archivo de la base, o None si no vive en disco"""
+        return Path(self.db_path).stat().st_size
+
+    @retry_on_lock
+    def get_database_stats(self) -> dict:
+        """Tamaño del archivo, páginas libres y fragmentación de la base principal"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        page_size = cursor.execute('PRAGMA page_size').fetchone()[0]
+        page_count = cursor.execute('PRAGMA page_count').fetchone()[0]
+        freelist_count = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+        auto_vacuum = cursor.execute('PRAGMA auto_vacuum').fetchone()[0]
+        conn.close()
+
+        file_size = self._database_file_size()
+        if file_size is None:
+            file_size = page_size * page_count
+
+        return {
+            'file_size': file_size,
+            'page_size': page_size,
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            # Proporción de páginas del archivo que no contienen datos
+            'fragmentation': freelist_count / page_count if page_count else 0.0,
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(auto_vacuum, str(auto_vacuum))
+        }
+
+    @retry_on_lock
+    def run_maintenance(self, budget: float = 1.0, allow_vacuum: bool = False) -> dict:
+        """Ejecuta el mantenimiento de la base dentro de un presupuesto de tiempo
+
+        Compacta el change_log (ver _compact_change_log), actualiza las
+        estadísticas del planificador (ANALYZE la primera vez,
+        PRAGMA optimize después) y devuelve las páginas libres al sistema con
+        incremental_vacuum, por tramos, hasta agotar el presupuesto. Si la base
+        todavía no admite incremental_vacuum y allow_vacuum es verdadero, la
+        convierte con un VACUUM completo cuando es lo bastante chica y el
+        VACUUM estimado entra en lo que queda del presupuesto.
+
+        Devuelve un informe con las estadísticas antes y después y los pasos
+        ejecutados.
+        """
+        started = time.monotonic()
+        before = self.get_database_stats()
+        steps = []
+
+        def remaining():
+            return budget - (time.monotonic() - started)
+
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            if before['auto_vacuum'] == 'none' and allow_vacuum \
+                    and before['file_size'] <= self.VACUUM_CONVERT_MAX_BYTES \
+                    and before['file_size'] / self.VACUUM_BYTES_PER_SECOND <= remaining():
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+                steps.append('vacuum')
+
+            if remaining() > 0:
+                compacted = self._compact_change_log(cursor)
+                conn.commit()
+                if compacted:
+                    steps.append(f'compact_change_log({compacted})')
+
+            if remaining() > 0:
+                has_stats = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+                ).fetchone()
+                # Limita las filas examinadas por índice para acotar la duración
+                cursor.execute(f'PRAGMA analysis_limit = {self.ANALYSIS_LIMIT}')
+                if has_stats:
+                    cursor.execute('PRAGMA optimize')
+                    steps.append('optimize')
+                else:
+                    cursor.execute('ANALYZE')
+                    steps.append('analyze')
+                conn.commit()
+
+            auto_vacuum = cursor.execute('PRAGMA auto_vacuum').fetchone()[0]
+            freed = 0
+            while auto_vacuum == 2 and remaining() > 0:
+                free_pages = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+                if free_pages == 0:
+                    break
+                # execute() avanza la sentencia un solo paso (una página);
+                # executescript() la ejecuta hasta el final
+                cursor.executescript(f'PRAGMA incremental_vacuum({self.VACUUM_CHUNK_PAGES})')
+                freed += min(free_pages, self.VACUUM_CHUNK_PAGES)
+            if freed:
+                steps.append(f'incremental_vacuum({freed})')
+        finally:
+            conn.close()
+
+        return {
+            'before': before,
+            'after': self.get_database_stats(),
+            'steps': steps,
+            'elapsed': time.monotonic() - started
+        }
+
     # Métodos para resúmenes
+    @retry_on_lock
     def add_summary(self, summary_data: dict) -> int:
         """Agrega un nuevo resumen"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
-        cursor.execute('''
-            INSERT INTO summaries (
-                coachee_id, title, summary_type, content, 
-                sessions_included, date_from, date_to, 
-                created_at, ai_provider
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        self._execute(cursor, 'summary_insert', self._summary_params(summary_data))
+
+        summary_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        return summary_id
+
+    @staticmethod
+    def _summary_params(summary_data: dict) -> tuple:
+        return (
             summary_data['coachee_id'],
             summary_data['title'],
             summary_data['summary_type'],
@@ -113,134 +1360,390 @@ class Storage:
             summary_data.get('date_to', ''),
             summary_data['created_at'],
             summary_data.get('ai_provider', '')
-        ))
+        )
+
+    @retry_on_lock
+    def add_summaries(self, summaries: List[dict]) -> int:
+        """Agrega varios resúmenes en una sola transacción"""
+        if not summaries:
+            return 0
+
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        self._executemany(cursor, 'summary_insert',
+                          [self._summary_params(summary_data) for summary_data in summaries])
 
-        summary_id = cursor.lastrowid
         conn.commit()
         conn.close()
 
-        return summary_id
+        return len(summaries)
 
-    def get_summaries_by_coachee(self, coachee_id: int) -> list:
+    @retry_on_lock
+    def get_summaries_by_coachee(self, coachee_id: int, include_archive: bool = False) -> List[Summary]:
         """Obtiene todos los resúmenes de un coachee"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT id, coachee_id, title, summary_type, content,
-                   sessions_included, date_from, date_to,
-                   created_at, ai_provider
-            FROM summaries
-            WHERE coachee_id = ?
-            ORDER BY created_at DESC
-        ''', (coachee_id,))
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        summaries = []
-        for row in rows:
-            summaries.append({
-                'id': row[0],
-                'coachee_id': row[1],
-                'title': row[2],
-                'summary_type': row[3],
-                'content': row[4],
-                'sessions_included': row[5],
-                'date_from': row[6],
-                'date_to': row[7],
-                'created_at': row[8],
-                'ai_provider': row[9]
-            })
+        cursor.row_factory = Summary.from_row
+
+        if include_archive and self._attach_archive(cursor):
+            cursor.execute(f'''
+                SELECT {SUMMARY_COLUMNS} FROM main.summaries WHERE coachee_id = ?
+                UNION ALL
+                SELECT {SUMMARY_COLUMNS} FROM archive.summaries WHERE coachee_id = ?
+                ORDER BY created_at DESC
+            ''', (coachee_id, coachee_id))
+        else:
+            self._execute(cursor, 'summary_by_coachee', (coachee_id,))
+
+        summaries = cursor.fetchall()
+        conn.close()
 
         return summaries
 
-    def get_all_summaries(self) -> list:
+    @retry_on_lock
+    def get_all_summaries(self, include_archive: bool = False) -> List[Summary]:
         """Obtiene todos los resúmenes"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = Summary.from_row
+
+        if include_archive and self._attach_archive(cursor):
+            cursor.execute(f'''
+                SELECT {SUMMARY_COLUMNS} FROM main.summaries
+                UNION ALL
+                SELECT {SUMMARY_COLUMNS} FROM archive.summaries
+                ORDER BY created_at DESC
+            ''')
+        else:
+            self._execute(cursor, 'summary_all')
+
+        summaries = cursor.fetchall()
+        conn.close()
 
-        cursor.execute('''
-            SELECT id, coachee_id, title, summary_type, content,
-                   sessions_included, date_from, date_to,
-                   created_at, ai_provider
-            FROM summaries
-            ORDER BY created_at DESC
-        ''')
+        return summaries
 
-        rows = cursor.fetchall()
-        conn.close()
-
-        summaries = []
-        for row in rows:
-            summaries.append({
-                'id': row[0],
-                'coachee_id': row[1],
-                'title': row[2],
-                'summary_type': row[3],
-                'content': row[4],
-                'sessions_included': row[5],
-                'date_from': row[6],
-                'date_to': row[7],
-                'created_at': row[8],
-                'ai_provider': row[9]
-            })
+    @retry_on_lock
+    def get_summaries_page(self, coachee_id: Optional[int] = None, summary_type: Optional[str] = None,
+                           limit: int = 50, offset: int = 0,
+                           include_archive: bool = False) -> List[Tuple[Summary, str]]:
+        """Obtiene una página de resúmenes filtrados junto con el nombre del coachee"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.row_factory = lambda cursor, row: (Summary.from_row(cursor, row[:10]), row[10])
+
+        if include_archive and self._attach_archive(cursor):
+            # Los filtros se aplican en cada base antes de unir
+            where, params = self._summary_filters(coachee_id, summary_type)
+            source = f'''(
+                SELECT {SUMMARY_COLUMNS} FROM main.summaries {where}
+                UNION ALL
+                SELECT {SUMMARY_COLUMNS} FROM archive.summaries {where}
+            )'''
+            params = params * 2
+            where = ""
+        else:
+            where, params = self._summary_filters(coachee_id, summary_type, prefix='s.')
+            source = 'main.summaries'
+
+        cursor.execute(f'''
+            SELECT s.id, s.coachee_id, s.title, s.summary_type, s.content,
+                   s.sessions_included, s.date_from, s.date_to,
+                   s.created_at, s.ai_provider,
+                   c.nombre || ' ' || c.apellido
+            FROM {source} s
+            JOIN main.coachees c ON c.id = s.coachee_id
+            {where}
+            ORDER BY s.created_at DESC, s.id DESC
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset])
+
+        summaries = cursor.fetchall()
+        conn.close()
 
         return summaries
 
+    @retry_on_lock
     def delete_summary(self, summary_id: int):
         """Elimina un resumen"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
-        cursor.execute('DELETE FROM summaries WHERE id = ?', (summary_id,))
+        # El resumen puede estar en la base de archivo (ATTACH debe ir antes de la transacción)
+        archived = self._attach_archive(cursor)
+
+        cursor.execute('DELETE FROM main.summaries WHERE id = ?', (summary_id,))
+        if cursor.rowcount == 0 and archived:
+            cursor.execute('DELETE FROM archive.summaries WHERE id = ?', (summary_id,))
 
         conn.commit()
         conn.close()
 
+    @retry_on_lock
     def get_sessions_by_date_range(self, coachee_id: int, date_from: str, date_to: str) -> List[Session]:
         """Obtiene sesiones de un coachee en un rango de fechas"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = Session.from_row
+
+        # El archivo solo se adjunta si el rango empieza antes de la fecha de corte
+        if self._needs_archive(date_from) and self._attach_archive(cursor):
+            cursor.execute(f'''
+                SELECT {SESSION_COLUMNS} FROM main.sessions
+                WHERE coachee_id = ? AND fecha BETWEEN ? AND ?
+                UNION ALL
+                SELECT {SESSION_COLUMNS} FROM archive.sessions
+                WHERE coachee_id = ? AND fecha BETWEEN ? AND ?
+                ORDER BY fecha DESC
+            ''', (coachee_id, date_from, date_to, coachee_id, date_from, date_to))
+        else:
+            self._execute(cursor, 'session_by_range', (coachee_id, date_from, date_to))
+
+        sessions = cursor.fetchall()
+        conn.close()
 
-        cursor.execute('''
-            SELECT id, coachee_id, fecha, notas, pagado, monto FROM sessions
-            WHERE coachee_id = ? AND fecha BETWEEN ? AND ?
-            ORDER BY fecha DESC
-        ''', (coachee_id, date_from, date_to))
+        return sessions
 
-        rows = cursor.fetchall()
+    def _execute_sessions_with_coachee(self, cursor, date_from: str, date_to: str):
+        """Ejecuta la consulta conjunta de sesiones y coachees para un rango de fechas"""
+        columns = ("c.id, c.nombre, c.apellido, c.email, c.telefono, "
+                   "s.id, s.coachee_id, s.fecha, s.notas, s.pagado, s.monto")
+
+        # Se reutiliza un único objeto Coachee por id en lugar de uno por fila
+        coachees = {}
+
+        def row_factory(cursor, row):
+            coachee = coachees.get(row[0])
+            if coachee is None:
+                coachee = coachees[row[0]] = Coachee(*row[:5])
+            return coachee, Session.from_row(cursor, row[5:])
+
+        cursor.row_factory = row_factory
+
+        if self._needs_archive(date_from) and self._attach_archive(cursor):
+            cursor.execute(f'''
+                SELECT {columns} FROM (
+                    SELECT {SESSION_COLUMNS} FROM main.sessions WHERE fecha BETWEEN ? AND ?
+                    UNION ALL
+                    SELECT {SESSION_COLUMNS} FROM archive.sessions WHERE fecha BETWEEN ? AND ?
+                ) s
+                JOIN coachees c ON c.id = s.coachee_id
+                ORDER BY c.apellido, c.nombre, c.id, s.fecha DESC
+            ''', (date_from, date_to, date_from, date_to))
+        else:
+            cursor.execute(f'''
+                SELECT {columns} FROM sessions s
+                JOIN coachees c ON c.id = s.coachee_id
+                WHERE s.fecha BETWEEN ? AND ?
+                ORDER BY c.apellido, c.nombre, c.id, s.fecha DESC
+            ''', (date_from, date_to))
+
+    @retry_on_lock
+    def get_sessions_with_coachee_by_date_range(self, date_from: str, date_to: str) -> List[Tuple[Coachee, Session]]:
+        """Obtiene pares (coachee, sesión) de todos los coachees en un rango de fechas"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        self._execute_sessions_with_coachee(cursor, date_from, date_to)
+
+        pairs = cursor.fetchall()
         conn.close()
 
-        sessions = []
-        for row in rows:
-            session = Session(id=row[0], coachee_id=row[1], fecha=row[2], notas=row[3])
-            session.pagado = bool(row[4]) if len(row) > 4 else False
-            session.monto = row[5] if len(row) > 5 else 0
-            sessions.append(session)
-        return sessions
+        return pairs
+
+    def iter_sessions_with_coachee_by_date_range(self, date_from: str, date_to: str,
+                                                 batch_size: int = 200) -> Iterator[Tuple[Coachee, Session]]:
+        """Recorre pares (coachee, sesión) por lotes sin cargar todo el rango en memoria"""
+        # Un generador no se puede reintentar: espera el bloqueo completo en SQLite
+        conn = self._connect(timeout=self.busy_timeout)
+        cursor = conn.cursor()
+
+        try:
+            self._execute_sessions_with_coachee(cursor, date_from, date_to)
+
+            while True:
+                pairs = cursor.fetchmany(batch_size)
+                if not pairs:
+                    break
+                yield from pairs
+        finally:
+            conn.close()
+
+    # Métodos de conteo y existencia (no transfieren filas ni notas)
+    def _session_filters(self, coachee_id: Optional[int], date_from: Optional[str],
+                         date_to: Optional[str], paid: Optional[bool]) -> Tuple[str, tuple]:
+        """Arma la cláusula WHERE y sus parámetros para los filtros de sesiones"""
+        conditions = []
+        params = []
+
+        if coachee_id is not None:
+            conditions.append('coachee_id = ?')
+            params.append(coachee_id)
+        if date_from is not None:
+            conditions.append('fecha >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append('fecha <= ?')
+            params.append(date_to)
+        if paid is not None:
+            conditions.append('pagado = ?')
+            params.append(1 if paid else 0)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, tuple(params)
+
+    @retry_on_lock
+    def count_sessions(self, coachee_id: Optional[int] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None, paid: Optional[bool] = None,
+                       include_archive: bool = False) -> int:
+        """Cuenta las sesiones que cumplen los filtros indicados"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        where, params = self._session_filters(coachee_id, date_from, date_to, paid)
+
+        archived = include_archive or (date_from is not None and self._needs_archive(date_from))
+        if archived and self._attach_archive(cursor):
+            cursor.execute(f'''
+                SELECT (SELECT COUNT(*) FROM main.sessions {where})
+                     + (SELECT COUNT(*) FROM archive.sessions {where})
+            ''', params + params)
+        else:
+            cursor.execute(f'SELECT COUNT(*) FROM sessions {where}', params)
+
+        count = cursor.fetchone()[0]
+        conn.close()
+
+        return count
+
+    @retry_on_lock
+    def has_sessions(self, coachee_id: Optional[int] = None, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None, paid: Optional[bool] = None,
+                     include_archive: bool = False) -> bool:
+        """Indica si existe al menos una sesión que cumpla los filtros"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        where, params = self._session_filters(coachee_id, date_from, date_to, paid)
+
+        archived = include_archive or (date_from is not None and self._needs_archive(date_from))
+        if archived and self._attach_archive(cursor):
+            cursor.execute(f'''
+                SELECT EXISTS (SELECT 1 FROM main.sessions {where})
+                    OR EXISTS (SELECT 1 FROM archive.sessions {where})
+            ''', params + params)
+        else:
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM sessions {where})', params)
+
+        exists = bool(cursor.fetchone()[0])
+        conn.close()
+
+        return exists
+
+    def _summary_filters(self, coachee_id: Optional[int], summary_type: Optional[str],
+                         prefix: str = '') -> Tuple[str, list]:
+        """Arma la cláusula WHERE y sus parámetros para los filtros de resúmenes"""
+        conditions = []
+        params = []
+        if coachee_id is not None:
+            conditions.append(f'{prefix}coachee_id = ?')
+            params.append(coachee_id)
+        if summary_type is not None:
+            conditions.append(f'{prefix}summary_type = ?')
+            params.append(summary_type)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        return where, params
+
+    @retry_on_lock
+    def count_summaries(self, coachee_id: Optional[int] = None, summary_type: Optional[str] = None,
+                        include_archive: bool = False) -> int:
+        """Cuenta los resúmenes de un coachee y/o tipo"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        where, params = self._summary_filters(coachee_id, summary_type)
+        if include_archive and self._attach_archive(cursor):
+            cursor.execute(f'''
+                SELECT (SELECT COUNT(*) FROM main.summaries {where})
+                     + (SELECT COUNT(*) FROM archive.summaries {where})
+            ''', params * 2)
+        else:
+            cursor.execute(f'SELECT COUNT(*) FROM main.summaries {where}', params)
+
+        count = cursor.fetchone()[0]
+        conn.close()
+
+        return count
+
+    @retry_on_lock
+    def count_scheduled_sessions(self, coachee_id: Optional[int] = None, status: Optional[str] = None,
+                                 date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+        """Cuenta las sesiones programadas que cumplen los filtros indicados"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        conditions = []
+        params = []
+        if coachee_id is not None:
+            conditions.append('coachee_id = ?')
+            params.append(coachee_id)
+        if status is not None:
+            conditions.append('status = ?')
+            params.append(status)
+        if date_from is not None:
+            conditions.append('scheduled_time >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append('scheduled_time <= ?')
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor.execute(f'SELECT COUNT(*) FROM scheduled_sessions {where}', params)
+
+        count = cursor.fetchone()[0]
+        conn.close()
+
+        return count
 
     # Métodos existentes...
+    @staticmethod
+    def compute_notify_at(scheduled_time: str, notify_enabled: bool, notify_time: Optional[str]) -> Optional[str]:
+        """Calcula el momento del recordatorio a partir de la hora y la anticipación elegida"""
+        if not notify_enabled:
+            return None
+
+        minutes = NOTIFY_OFFSETS.get(notify_time, DEFAULT_NOTIFY_OFFSET)
+        notify_at = datetime.strptime(scheduled_time, "%Y-%m-%d %H:%M:%S") - timedelta(minutes=minutes)
+        return notify_at.strftime("%Y-%m-%d %H:%M:%S")
+
+    @retry_on_lock
     def add_scheduled_session(self, session_data: dict) -> int:
         """Agrega una sesión programada"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
+        notify_enabled = session_data.get('notify_enabled', True)
+        notify_at = self.compute_notify_at(
+            session_data['scheduled_time'], notify_enabled, session_data.get('notify_time')
+        )
+
         cursor.execute('''
             INSERT INTO scheduled_sessions (
                 coachee_id, scheduled_time, title, notes, 
-                duration, notify_enabled, notify_time, status
+                duration, notify_enabled, notify_time, status, notify_at
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             session_data['coachee_id'],
             session_data['scheduled_time'],
             session_data.get('title', ''),
             session_data.get('notes', ''),
             session_data.get('duration', 60),
-            1 if session_data.get('notify_enabled', True) else 0,
+            1 if notify_enabled else 0,
             session_data.get('notify_time', ''),
-            session_data.get('status', 'scheduled')
+            session_data.get('status', 'scheduled'),
+            notify_at
         ))
 
         session_id = cursor.lastrowid
@@ -249,135 +1752,181 @@ class Storage:
 
         return session_id
 
-    def get_sessions_by_date(self, date_str: str) -> list:
+    @retry_on_lock
+    def get_sessions_by_date(self, date_str: str) -> List[ScheduledSession]:
         """Obtiene todas las sesiones programadas para una fecha específica"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = ScheduledSession.from_row
 
-        cursor.execute('''
-            SELECT id, coachee_id, scheduled_time, title, notes, 
-                   duration, notify_enabled, notify_time, status, notified
-            FROM scheduled_sessions
-            WHERE date(scheduled_time) = ?
-            ORDER BY scheduled_time
-        ''', (date_str,))
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        sessions = []
-        for row in rows:
-            sessions.append({
-                'id': row[0],
-                'coachee_id': row[1],
-                'scheduled_time': row[2],
-                'title': row[3],
-                'notes': row[4],
-                'duration': row[5],
-                'notify_enabled': bool(row[6]),
-                'notify_time': row[7],
-                'status': row[8],
-                'notified': bool(row[9])
-            })
+        self._execute(cursor, 'scheduled_by_date', (date_str,))
+
+        sessions = cursor.fetchall()
+        conn.close()
 
         return sessions
 
-    def get_all_scheduled_sessions(self) -> list:
+    @retry_on_lock
+    def get_all_scheduled_sessions(self) -> List[ScheduledSession]:
         """Obtiene todas las sesiones programadas"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = ScheduledSession.from_row
 
-        cursor.execute('''
-            SELECT id, coachee_id, scheduled_time, title, notes, 
-                   duration, notify_enabled, notify_time, status, notified
-            FROM scheduled_sessions
-            ORDER BY scheduled_time
-        ''')
+        self._execute(cursor, 'scheduled_all')
 
-        rows = cursor.fetchall()
-        conn.close()
-
-        sessions = []
-        for row in rows:
-            sessions.append({
-                'id': row[0],
-                'coachee_id': row[1],
-                'scheduled_time': row[2],
-                'title': row[3],
-                'notes': row[4],
-                'duration': row[5],
-                'notify_enabled': bool(row[6]),
-                'notify_time': row[7],
-                'status': row[8],
-                'notified': bool(row[9])
-            })
+        sessions = cursor.fetchall()
+        conn.close()
 
         return sessions
 
-    def get_sessions_by_coachee_calendar(self, coachee_id: int) -> list:
+    @retry_on_lock
+    def get_sessions_by_coachee_calendar(self, coachee_id: int) -> List[ScheduledSession]:
         """Obtiene todas las sesiones programadas para un coachee específico"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = ScheduledSession.from_row
 
-        cursor.execute('''
-            SELECT id, coachee_id, scheduled_time, title, notes, 
-                   duration, notify_enabled, notify_time, status, notified
-            FROM scheduled_sessions
-            WHERE coachee_id = ?
-            ORDER BY scheduled_time DESC
-        ''', (coachee_id,))
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        sessions = []
-        for row in rows:
-            sessions.append({
-                'id': row[0],
-                'coachee_id': row[1],
-                'scheduled_time': row[2],
-                'title': row[3],
-                'notes': row[4],
-                'duration': row[5],
-                'notify_enabled': bool(row[6]),
-                'notify_time': row[7],
-                'status': row[8],
-                'notified': bool(row[9])
-            })
+        self._execute(cursor, 'scheduled_by_coachee', (coachee_id,))
+
+        sessions = cursor.fetchall()
+        conn.close()
 
         return sessions
 
+    @retry_on_lock
+    def get_upcoming_scheduled_sessions(self, after: str, limit: int = 10,
+                                        until: Optional[str] = None) -> List[Tuple[ScheduledSession, str]]:
+        """Obtiene las próximas N sesiones pendientes junto con el nombre del coachee"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.row_factory = lambda cursor, row: (ScheduledSession.from_row(cursor, row[:10]), row[10])
+
+        self._execute(cursor, 'scheduled_upcoming', (after, until or '9999-12-31', limit))
+
+        upcoming = cursor.fetchall()
+        conn.close()
+
+        return upcoming
+
+    @retry_on_lock
+    def get_scheduled_status_by_day(self, date_from: str, date_to: str) -> Dict[str, Tuple[int, int, int]]:
+        """Cuenta por día las sesiones programadas, completadas y canceladas en [date_from, date_to)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        self._execute(cursor, 'scheduled_status_by_day', (date_from, date_to))
+
+        status_by_day = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+        conn.close()
+
+        return status_by_day
+
+    def get_calendar_month_status(self, year: int, month: int) -> Dict[int, Tuple[int, int, int]]:
+        """Devuelve {día: (programadas, completadas, canceladas)} para un mes"""
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        status_by_day = self.get_scheduled_status_by_day(
+            f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+        )
+
+        return {int(day[8:10]): counts for day, counts in status_by_day.items()}
+
+    @retry_on_lock
     def update_session_status(self, session_id: int, status: str):
         """Actualiza el estado de una sesión programada"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
-        cursor.execute('''
-            UPDATE scheduled_sessions
-            SET status = ?
-            WHERE id = ?
-        ''', (status, session_id))
+        self._execute(cursor, 'scheduled_update_status', (status, session_id))
 
         conn.commit()
         conn.close()
 
+    @retry_on_lock
+    def get_next_reminder_time(self) -> Optional[str]:
+        """Devuelve el momento del próximo recordatorio pendiente, si lo hay"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        self._execute(cursor, 'reminder_next')
+
+        next_time = cursor.fetchone()[0]
+        conn.close()
+
+        return next_time
+
+    @retry_on_lock
+    def get_due_reminders(self, now: str) -> List[ScheduledSession]:
+        """Obtiene las sesiones cuyo recordatorio ya venció y no fue enviado"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.row_factory = ScheduledSession.from_row
+
+        self._execute(cursor, 'reminder_due', (now,))
+
+        sessions = cursor.fetchall()
+        conn.close()
+
+        return sessions
+
+    @retry_on_lock
     def mark_session_notified(self, session_id: int):
         """Marca una sesión como notificada"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
-        cursor.execute('''
+        self._execute(cursor, 'reminder_mark_notified', (session_id,))
+
+        conn.commit()
+        conn.close()
+
+    @retry_on_lock
+    def mark_sessions_notified(self, session_ids: List[int]):
+        """Marca varias sesiones como notificadas en una sola transacción"""
+        if not session_ids:
+            return
+
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        self._executemany(cursor, 'reminder_mark_notified',
+                          [(session_id,) for session_id in session_ids])
+
+        conn.commit()
+        conn.close()
+
+    @retry_on_lock
+    def record_reminder_events(self, delivered: List[Tuple[int, str]],
+                               acknowledged: List[Tuple[int, str]]):
+        """Registra en lote la entrega y la confirmación de recordatorios
+
+        Cada lista contiene pares (id de la sesión programada, fecha y hora).
+        """
+        if not delivered and not acknowledged:
+            return
+
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.executemany('''
+            UPDATE scheduled_sessions
+            SET delivered_at = ?
+            WHERE id = ?
+        ''', [(when, session_id) for session_id, when in delivered])
+
+        cursor.executemany('''
             UPDATE scheduled_sessions
-            SET notified = 1
+            SET acknowledged_at = ?
             WHERE id = ?
-        ''', (session_id,))
+        ''', [(when, session_id) for session_id, when in acknowledged])
 
         conn.commit()
         conn.close()
 
+    @retry_on_lock
     def delete_scheduled_session(self, session_id: int):
         """Elimina una sesión programada"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         cursor.execute('DELETE FROM scheduled_sessions WHERE id = ?', (session_id,))
@@ -385,14 +1934,13 @@ class Storage:
         conn.commit()
         conn.close()
 
+    @retry_on_lock
     def add_coachee(self, coachee: Coachee) -> int:
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
-        cursor.execute('''
-            INSERT INTO coachees (nombre, apellido, email, telefono)
-            VALUES (?, ?, ?, ?)
-        ''', (coachee.nombre, coachee.apellido, coachee.email, coachee.telefono))
+        self._execute(cursor, 'coachee_insert',
+                      (coachee.nombre, coachee.apellido, coachee.email, coachee.telefono))
 
         coachee_id = cursor.lastrowid
         conn.commit()
@@ -400,53 +1948,51 @@ class Storage:
 
         return coachee_id
 
+    @retry_on_lock
     def get_all_coachees(self) -> List[Coachee]:
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = Coachee.from_row
 
-        cursor.execute('SELECT id, nombre, apellido, email, telefono FROM coachees ORDER BY apellido, nombre')
-        rows = cursor.fetchall()
+        self._execute(cursor, 'coachee_all')
+        coachees = cursor.fetchall()
         conn.close()
 
-        return [Coachee(id=row[0], nombre=row[1], apellido=row[2], email=row[3], telefono=row[4]) for row in rows]
+        return coachees
 
+    @retry_on_lock
     def search_coachees(self, query: str) -> List[Coachee]:
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = Coachee.from_row
 
         search_pattern = f"%{query}%"
-        cursor.execute('''
-            SELECT id, nombre, apellido, email, telefono FROM coachees
-            WHERE nombre LIKE ? OR apellido LIKE ? OR email LIKE ? OR telefono LIKE ?
-            ORDER BY apellido, nombre
-        ''', (search_pattern, search_pattern, search_pattern, search_pattern))
+        self._execute(cursor, 'coachee_search', (search_pattern, search_pattern, search_pattern, search_pattern))
 
-        rows = cursor.fetchall()
+        coachees = cursor.fetchall()
         conn.close()
 
-        return [Coachee(id=row[0], nombre=row[1], apellido=row[2], email=row[3], telefono=row[4]) for row in rows]
+        return coachees
 
+    @retry_on_lock
     def get_coachee(self, coachee_id: int) -> Optional[Coachee]:
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = Coachee.from_row
 
-        cursor.execute('SELECT id, nombre, apellido, email, telefono FROM coachees WHERE id = ?', (coachee_id,))
-        row = cursor.fetchone()
+        self._execute(cursor, 'coachee_get', (coachee_id,))
+        coachee = cursor.fetchone()
         conn.close()
 
-        if row:
-            return Coachee(id=row[0], nombre=row[1], apellido=row[2], email=row[3], telefono=row[4])
-        return None
+        return coachee
 
+    @retry_on_lock
     def add_session(self, session: Session) -> int:
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
-        cursor.execute('''
-            INSERT INTO sessions (coachee_id, fecha, notas, pagado, monto)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (session.coachee_id, session.fecha, session.notas, 
-              1 if session.pagado else 0, session.monto if hasattr(session, 'monto') else 0))
+        self._execute(cursor, 'session_insert', (session.coachee_id, session.fecha, session.notas,
+                                                 1 if session.pagado else 0, session.monto))
 
         session_id = cursor.lastrowid
         conn.commit()
@@ -454,107 +2000,100 @@ class Storage:
 
         return session_id
 
-    def get_sessions_by_coachee(self, coachee_id: int) -> List[Session]:
-        conn = sqlite3.connect(self.db_path)
+    @retry_on_lock
+    def get_sessions_by_coachee(self, coachee_id: int, include_archive: bool = False) -> List[Session]:
+        conn = self._connect()
         cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT id, coachee_id, fecha, notas, pagado, monto FROM sessions
-            WHERE coachee_id = ?
-            ORDER BY fecha DESC
-        ''', (coachee_id,))
-
-        rows = cursor.fetchall()
+        cursor.row_factory = Session.from_row
+
+        if include_archive and self._attach_archive(cursor):
+            cursor.execute(f'''
+                SELECT {SESSION_COLUMNS} FROM main.sessions WHERE coachee_id = ?
+                UNION ALL
+                SELECT {SESSION_COLUMNS} FROM archive.sessions WHERE coachee_id = ?
+                ORDER BY fecha DESC
+            ''', (coachee_id, coachee_id))
+        else:
+            self._execute(cursor, 'session_by_coachee', (coachee_id,))
+
+        sessions = cursor.fetchall()
         conn.close()
 
-        sessions = []
-        for row in rows:
-            session = Session(id=row[0], coachee_id=row[1], fecha=row[2], notas=row[3])
-            session.pagado = bool(row[4]) if len(row) > 4 else False
-            session.monto = row[5] if len(row) > 5 else 0
-            sessions.append(session)
         return sessions
 
+    @retry_on_lock
     def update_session_payment(self, session_id: int, pagado: bool, monto: float = 0):
         """Actualiza el estado de pago de una sesión"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
+        # La sesión puede estar en la base de archivo (ATTACH debe ir antes de la transacción)
+        archived = self._attach_archive(cursor)
+
         cursor.execute('''
-            UPDATE sessions
+            UPDATE main.sessions
             SET pagado = ?, monto = ?
             WHERE id = ?
         ''', (1 if pagado else 0, monto, session_id))
 
+        if cursor.rowcount == 0 and archived:
+            cursor.execute('''
+                UPDATE archive.sessions
+                SET pagado = ?, monto = ?
+                WHERE id = ?
+            ''', (1 if pagado else 0, monto, session_id))
+
         conn.commit()
         conn.close()
 
+    @retry_on_lock
     def get_unpaid_sessions_by_coachee(self, coachee_id: int) -> List[Session]:
         """Obtiene todas las sesiones no pagadas de un coachee"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = Session.from_row
 
-        cursor.execute('''
-            SELECT id, coachee_id, fecha, notas, pagado, monto FROM sessions
-            WHERE coachee_id = ? AND pagado = 0
-            ORDER BY fecha DESC
-        ''', (coachee_id,))
+        self._execute(cursor, 'session_unpaid', (coachee_id,))
 
-        rows = cursor.fetchall()
+        sessions = cursor.fetchall()
         conn.close()
 
-        sessions = []
-        for row in rows:
-            session = Session(id=row[0], coachee_id=row[1], fecha=row[2], notas=row[3])
-            session.pagado = bool(row[4])
-            session.monto = row[5]
-            sessions.append(session)
         return sessions
 
-    def get_payment_summary_by_coachee(self, coachee_id: int) -> dict:
+    @retry_on_lock
+    def get_payment_summary_by_coachee(self, coachee_id: int) -> PaymentSummary:
         """Obtiene un resumen de pagos por coachee"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = PaymentSummary.from_row
 
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_sessions,
-                SUM(CASE WHEN pagado = 1 THEN 1 ELSE 0 END) as paid_sessions,
-                SUM(CASE WHEN pagado = 0 THEN 1 ELSE 0 END) as unpaid_sessions,
-                SUM(CASE WHEN pagado = 1 THEN monto ELSE 0 END) as total_paid,
-                SUM(CASE WHEN pagado = 0 THEN monto ELSE 0 END) as total_pending
-            FROM sessions
-            WHERE coachee_id = ?
-        ''', (coachee_id,))
+        if self._attach_archive(cursor):
+            self._execute(cursor, 'session_payment_summary_archived', (coachee_id, coachee_id))
+        else:
+            self._execute(cursor, 'session_payment_summary', (coachee_id,))
 
-        row = cursor.fetchone()
+        summary = cursor.fetchone()
         conn.close()
 
-        return {
-            'total_sessions': row[0] or 0,
-            'paid_sessions': row[1] or 0,
-            'unpaid_sessions': row[2] or 0,
-            'total_paid': row[3] or 0,
-            'total_pending': row[4] or 0
-        }
+        return summary
 
+    @retry_on_lock
     def save_setting(self, key: str, value):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         value_str = json.dumps(value) if not isinstance(value, str) else value
-        cursor.execute('''
-            INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)
-        ''', (key, value_str))
+        self._execute(cursor, 'setting_save', (key, value_str))
 
         conn.commit()
         conn.close()
 
+    @retry_on_lock
     def get_setting(self, key: str, default=None):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
+        self._execute(cursor, 'setting_get', (key,))
         row = cursor.fetchone()
         conn.close()
 
@@ -563,4 +2102,107 @@ class Storage:
                 return json.loads(row[0])
             except json.JSONDecodeError:
                 return row[0]
-        return default
\ No newline at end of file
+        return default
+
+
+class InMemoryStorage(Storage):
+    """Almacenamiento SQLite en memoria, sin acceso a disco
+
+    Usa el mismo esquema y las mismas consultas que Storage sobre una base en
+    memoria compartida entre las conexiones de esta instancia. Los datos se
+    pierden al liberar el objeto. Pensado para pruebas y mediciones.
+    """
+
+    _counter = itertools.count()
+
+    def __init__(self, name: Optional[str] = None, **kwargs):
+        name = name or f"onto-ai-{next(self._counter)}-{id(self)}"
+        db_path = f"file:{name}?mode=memory&cache=shared"
+        archive_path = f"file:{name}-archive?mode=memory&cache=shared"
+
+        # Una base en memoria existe mientras alguna conexión la mantenga abierta
+        self._anchor = sqlite3.connect(db_path, uri=True)
+        self._archive_anchor = sqlite3.connect(archive_path, uri=True)
+
+        super().__init__(db_path, archive_path=archive_path, **kwargs)
+
+    def _open_connection(self, timeout: float) -> sqlite3.Connection:
+        return sqlite3.connect(
+            self.db_path,
+            timeout=timeout,
+            isolation_level='IMMEDIATE',
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            uri=True,
+            factory=_StatementConnection
+        )
+
+    def _database_file_size(self) -> Optional[int]:
+        # Sin archivo: get_database_stats usa las páginas ocupadas
+        return None
+
+    def has_archive(self) -> bool:
+        return bool(self.get_archive_cutoff())
+
+    def close(self):
+        """Libera la base en memoria"""
+        super().close()
+        self._anchor.close()
+        self._archive_anchor.close()
+
+
+class SnapshotStorage(InMemoryStorage):
+    """Copia de solo lectura de otra base, tomada en un instante dado
+
+    Permite que los procesos de reportes lean datos coherentes sin bloquear ni
+    ser bloqueados por la base en uso. Cualquier escritura falla con
+    sqlite3.OperationalError.
+    """
+
+    def __init__(self, source: Storage, **kwargs):
+        self.source = source
+        super().__init__(**kwargs)
+
+    def init_database(self):
+        self.refresh()
+
+    def refresh(self):
+        """Vuelve a copiar la base de origen (y su archivo, si existe)"""
+        self._archived = self.source.has_archive()
+        copies = [(self.source.db_path, self.db_path)]
+        if self._archived:
+            copies.append((self.source.archive_path, self.archive_path))
+
+        for source_path, target_path in copies:
+            source = sqlite3.connect(source_path, uri=source_path.startswith('file:'))
+            target = sqlite3.connect(target_path, uri=True)
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+
+    def _open_connection(self, timeout: float) -> sqlite3.Connection:
+        conn = super()._open_connection(timeout)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def has_archive(self) -> bool:
+        return self._archived
+
+
+class StorageFactory:
+    @staticmethod
+    def create_storage(backend_name: str, config: dict) -> Optional[StorageBackend]:
+        if backend_name == "SQLite":
+            return Storage(
+                db_path=config.get('db_path', 'onto-ai.db'),
+                archive_path=config.get('archive_path'),
+                cached_statements=config.get('cached_statements', 128)
+            )
+        elif backend_name == "Memoria":
+            return InMemoryStorage(name=config.get('name'),
+                                   cached_statements=config.get('cached_statements', 128))
+        elif backend_name == "Snapshot":
+            return SnapshotStorage(source=config['source'])
+        return None
@@ -0,0 +1,260 @@
+import itertools
+import threading
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from services.ai_cache import CachedProvider, ResponseCache
+from services.ai_providers import AIProvider
+from services.tokens import PromptBuilder
+
+
+SUMMARY_INSTRUCTIONS = {
+    "Resumen General": "Por favor, genera un resumen ejecutivo completo de las siguientes {count} sesiones de coaching. Incluye los temas principales discutidos, conclusiones importantes y el contexto general del trabajo de coaching.",
+
+    "Análisis de Progreso": "Analiza el progreso observado a través de estas {count} sesiones de coaching. Identifica mejoras, cambios positivos, hitos alcanzados y la evolución del coachee a lo largo del tiempo.",
+
+    "Patrones y Tendencias": "Identifica patrones recurrentes, tendencias y temas comunes en estas {count} sesiones de coaching. Analiza qué aspectos aparecen con frecuencia y qué pueden indicar.",
+
+    "Objetivos y Logros": "Resume los objetivos establecidos y los logros alcanzados según estas {count} sesiones de coaching. Evalúa el cumplimiento de metas y destaca los éxitos principales.",
+
+    "Áreas de Mejora": "Identifica las áreas de mejora, desafíos pendientes y oportunidades de desarrollo observadas en estas {count} sesiones de coaching. Proporciona un análisis constructivo.",
+
+    "Recomendaciones": "Basándote en estas {count} sesiones de coaching, proporciona recomendaciones específicas y accionables para las próximas sesiones. Incluye sugerencias de enfoques, temas a abordar y estrategias."
+}
+
+MAP_INSTRUCTION = (
+    "Resume de forma fiel y concisa las siguientes notas de sesiones de coaching. "
+    "Conserva las fechas, los temas tratados, los objetivos, los avances, las dificultades "
+    "y los acuerdos de cada sesión. Este resumen se combinará luego con el de otras sesiones."
+)
+
+REDUCE_INSTRUCTION = (
+    "Combina los siguientes resúmenes parciales de sesiones de coaching, que están en orden "
+    "cronológico, en un único resumen fiel y conciso. Conserva las fechas, los temas, los "
+    "objetivos, los avances, las dificultades y los acuerdos más relevantes."
+)
+
+
+def instruction_for(summary_type: str, count: int) -> str:
+    template = SUMMARY_INSTRUCTIONS.get(summary_type, SUMMARY_INSTRUCTIONS["Resumen General"])
+    return template.format(count=count)
+
+
+def coachee_session_entries(coachee, sessions) -> Tuple[str, List[str]]:
+    """Encabezado y texto de cada sesión de un coachee, como los recibe build_prompt"""
+    header = f"Sesiones de coaching de {coachee.nombre_completo}:\n\n"
+    return header, [f"{session.fecha}:\n{session.notas}\n\n" for session in sessions]
+
+
+def summary_title(summary_type: str, coachee, date_from: str, date_to: str) -> str:
+    return f"{summary_type} - {coachee.nombre_completo} ({date_from} a {date_to})"
+
+
+class SummaryCancelled(Exception):
+    pass
+
+
+class MapReduceSummarizer:
+    """Prepara el prompt de un resumen cuando las sesiones no entran en una sola consulta
+
+    Si el texto de las sesiones entra en el presupuesto de entrada de builder,
+    se resume en una sola consulta. Si no, se reparte en bloques de hasta
+    chunk_tokens que se resumen en paralelo (etapa map) y los resúmenes
+    parciales se combinan por niveles (etapa reduce) hasta que entran en una
+    consulta. El prompt final, con la instrucción del tipo de
+    resumen, lo genera quien llama, de modo que la última etapa puede mostrarse
+    a medida que llega.
+
+    Las etapas intermedias no dependen del tipo de resumen y pasan por la caché
+    de respuestas: al volver a resumir un período solo se consultan los bloques
+    cuyas sesiones cambiaron. progress recibe (etapa, hechos, total); mientras
+    las sesiones se siguen leyendo, total es la cantidad de bloques enviados.
+    """
+
+    # Niveles de combinación antes de aceptar lo que haya
+    MAX_REDUCE_LEVELS = 4
+
+    def __init__(self, create_provider: Callable[[], AIProvider], cache: Optional[ResponseCache] = None,
+                 builder: Optional[PromptBuilder] = None, chunk_tokens: int = 3000, max_workers: int = 4,
+                 progress: Optional[Callable[[str, int, int], None]] = None):
+        self.create_provider = create_provider
+        self.cache = cache
+        self.builder = builder or PromptBuilder(8192)
+        self.count = self.builder.count
+        self.chunk_tokens = chunk_tokens
+        self._chunk_budget = chunk_tokens
+        self.max_workers = max_workers
+        self.progress = progress
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Las consultas pendientes no se envían; la etapa en curso termina con SummaryCancelled"""
+        self._cancelled.set()
+
+    def build_prompt(self, summary_type: str, header: str, entries: Iterable[str]) -> str:
+        """Devuelve el prompt final para las sesiones dadas
+
+        header presenta las sesiones (por ejemplo, el nombre del coachee) y
+        entries tiene el texto de cada sesión en orden cronológico. entries
+        puede ser un iterador: se lee a medida que se arman los bloques, sin
+        cargar todas las sesiones a la vez.
+        """
+        entries = iter(entries)
+
+        # Se lee solo hasta saber si todo entra en una consulta
+        head = []
+        size = self.count(f"{instruction_for(summary_type, 0)}\n\n{header}")
+        for entry in entries:
+            head.append(entry)
+            size += self.count(entry) + 4
+            if size > self.builder.input_budget:
+                break
+        else:
+            instruction = instruction_for(summary_type, len(head))
+            prompt, included = self.builder.fit_entries(instruction, header, head)
+            if included == len(head) and self.builder.fits(prompt):
+                return prompt
+
+        # Cada bloque, con la instrucción y el encabezado, debe entrar en una consulta
+        overhead = self.count(f"{REDUCE_INSTRUCTION}\n\n{header}") + 8
+        available = max(1, self.builder.input_budget - overhead)
+        self._chunk_budget = min(self.chunk_tokens, available)
+
+        # La instrucción final lleva la cantidad de sesiones, conocida al terminar de leerlas
+        consumed = 0
+
+        def counted():
+            nonlocal consumed
+            for entry in itertools.chain(head, entries):
+                consumed += 1
+                yield entry
+
+        partials = self._run_stage(
+            "Resumiendo bloques de sesiones",
+            (f"{MAP_INSTRUCTION}\n\n{header}{''.join(chunk)}" for chunk in self._iter_chunks(counted()))
+        )
+        instruction = instruction_for(summary_type, consumed)
+
+        level = 1
+        while (len(partials) > 1 and level <= self.MAX_REDUCE_LEVELS
+               and self.count("".join(partials)) > available):
+            groups = self.split([f"{partial}\n\n" for partial in partials])
+            partials = self._run_stage(
+                f"Combinando resúmenes (nivel {level})",
+                [f"{REDUCE_INSTRUCTION}\n\n{header}{''.join(group)}" for group in groups]
+            )
+            level += 1
+
+        # Si aun así no entran, quedan afuera las partes más antiguas
+        parts = [f"Parte {i}:\n{partial}\n\n" for i, partial in enumerate(partials, 1)]
+        prompt, _ = self.builder.fit_entries(
+            f"{instruction}\n\nLas sesiones se resumieron por partes, en orden cronológico.",
+            header, parts, numbered=False
+        )
+        return prompt
+
+    def split(self, entries: Iterable[str]) -> List[List[str]]:
+        """Agrupa las entradas en bloques que entran en una consulta
+
+        Además del límite de tamaño, un bloque se cierra tras las entradas cuyo
+        contenido cumple una condición fija (pasada la mitad del límite). Así los
+        cortes dependen del texto y no de la posición: al cambiar una sesión, los
+        bloques siguientes vuelven a coincidir con los anteriores y salen de la caché.
+        """
+        return list(self._iter_chunks(entries))
+
+    def _iter_chunks(self, entries: Iterable[str]) -> Iterator[List[str]]:
+        """Versión perezosa de split: entrega cada bloque apenas se cierra"""
+        budget = self._chunk_budget
+        current = []
+        size = 0
+        for entry in entries:
+            for piece in self._split_text(entry, budget):
+                tokens = self.count(piece)
+                if current and size + tokens > budget:
+                    yield current
+                    current, size = [], 0
+                current.append(piece)
+                size += tokens
+                if size >= budget // 2 and zlib.crc32(piece.encode('utf-8')) % 4 == 0:
+                    yield current
+                    current, size = [], 0
+        if current:
+            yield current
+
+    def _split_text(self, text: str, budget: int) -> List[str]:
+        """Corta una entrada que por sí sola supera el límite"""
+        pieces = []
+        while self.count(text) > budget:
+            piece = text[:self.builder.prefix_length(text, budget)]
+            # Se prefiere cortar en un espacio
+            cut = piece.rfind(' ')
+            if cut > len(piece) // 2:
+                piece = piece[:cut]
+            if not piece:
+                piece = text[:1]
+            pieces.append(piece)
+            text = text[len(piece):]
+        pieces.append(text)
+        return pieces
+
+    def _run_stage(self, stage: str, prompts: Iterable[str]) -> List[str]:
+        """Resuelve los prompts en paralelo y devuelve las respuestas en orden
+
+        prompts se lee de a poco: nunca hay más de dos prompts por hilo
+        esperando, así que un iterador largo no se carga entero en memoria.
+        """
+        prompts = iter(prompts)
+        results = []
+        pending = {}
+        exhausted = False
+        done = 0
+        self._report(stage, 0, 0)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while True:
+                while not exhausted and len(pending) < 2 * self.max_workers:
+                    if self._cancelled.is_set():
+                        raise SummaryCancelled()
+                    prompt = next(prompts, None)
+                    if prompt is None:
+                        exhausted = True
+                        break
+                    pending[executor.submit(self._generate, prompt)] = len(results)
+                    results.append(None)
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results[pending.pop(future)] = future.result()
+                    done += 1
+                    self._report(stage, done, len(results))
+        finally:
+            # Ante un error o una cancelación no se envían las consultas pendientes
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        return results
+
+    def _generate(self, prompt: str) -> str:
+        if self._cancelled.is_set():
+            raise SummaryCancelled()
+
+        # Un proveedor por consulta: los clientes del pool se comparten igual
+        provider = self.create_provider()
+        if self.cache is not None:
+            provider = CachedProvider(provider, self.cache)
+        try:
+            response = provider.generate_response(prompt)
+        finally:
+            provider.close()
+
+        if response.startswith("Error"):
+            raise RuntimeError(response)
+        return response
+
+    def _report(self, stage: str, done: int, total: int):
+        if self.progress:
+            self.progress(stage, done, total)
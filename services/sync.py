@@ -0,0 +1,249 @@
+import gzip
+import json
+import os
+import re
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+
+def encode_changes(changes) -> bytes:
+    return gzip.compress(json.dumps(changes, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+
+def decode_changes(data: bytes):
+    return json.loads(gzip.decompress(data).decode('utf-8'))
+
+
+class SyncTransport(ABC):
+    """Lugar compartido donde cada dispositivo publica sus cambios"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @abstractmethod
+    def get_vector(self) -> Dict[str, int]:
+        """Última secuencia publicada por cada dispositivo"""
+        pass
+
+    @abstractmethod
+    def push(self, device_id: str, changes: List[list]):
+        pass
+
+    @abstractmethod
+    def pull(self, device_id: str, after_seq: int) -> List[list]:
+        pass
+
+
+class FolderTransport(SyncTransport):
+    """Cambios en una carpeta compartida: un archivo comprimido por lote y dispositivo
+
+    Estructura: <carpeta>/<device_id>/<primera>-<última>.json.gz
+    """
+
+    BATCH_NAME = re.compile(r'^(\d+)-(\d+)\.json\.gz$')
+
+    def __init__(self, folder: str):
+        super().__init__()
+        self.folder = Path(folder)
+
+    def _batches(self, device_id: str):
+        device_folder = self.folder / device_id
+        if not device_folder.is_dir():
+            return []
+        batches = []
+        for path in device_folder.iterdir():
+            match = self.BATCH_NAME.match(path.name)
+            if match:
+                batches.append((int(match.group(1)), int(match.group(2)), path))
+        return sorted(batches)
+
+    def get_vector(self) -> Dict[str, int]:
+        vector = {}
+        if self.folder.is_dir():
+            for device_folder in self.folder.iterdir():
+                batches = self._batches(device_folder.name)
+                if batches:
+                    vector[device_folder.name] = batches[-1][1]
+        return vector
+
+    def push(self, device_id: str, changes: List[list]):
+        if not changes:
+            return
+        device_folder = self.folder / device_id
+        device_folder.mkdir(parents=True, exist_ok=True)
+
+        data = encode_changes(changes)
+        name = f"{changes[0][1]:012d}-{changes[-1][1]:012d}.json.gz"
+        # Se escribe aparte y se renombra para que nadie lea un lote a medias
+        temp_path = device_folder / f".{name}.tmp"
+        temp_path.write_bytes(data)
+        os.replace(temp_path, device_folder / name)
+        self.bytes_sent += len(data)
+
+    def pull(self, device_id: str, after_seq: int) -> List[list]:
+        changes = []
+        for _, last, path in self._batches(device_id):
+            if last <= after_seq:
+                continue
+            data = path.read_bytes()
+            self.bytes_received += len(data)
+            changes.extend(change for change in decode_changes(data) if change[1] > after_seq)
+        return changes
+
+
+class HttpTransport(SyncTransport):
+    """Cliente del servidor de sincronización HTTP (ver SyncServer)"""
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        super().__init__()
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path: str, data: bytes = None) -> bytes:
+        request = urllib.request.Request(self.url + path, data=data, method='POST' if data else 'GET')
+        if data:
+            request.add_header('Content-Type', 'application/json')
+            request.add_header('Content-Encoding', 'gzip')
+            self.bytes_sent += len(data)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+        self.bytes_received += len(body)
+        return body
+
+    def get_vector(self) -> Dict[str, int]:
+        return decode_changes(self._request('/vector'))
+
+    def push(self, device_id: str, changes: List[list]):
+        if changes:
+            self._request(f'/changes/{device_id}', encode_changes(changes))
+
+    def pull(self, device_id: str, after_seq: int) -> List[list]:
+        return decode_changes(self._request(f'/changes/{device_id}?after={after_seq}'))
+
+
+class SyncServer:
+    """Servidor HTTP local de sincronización, respaldado por una carpeta
+
+    Sirve como reemplazo local de un servicio remoto: GET /vector,
+    GET /changes/<device>?after=N y POST /changes/<device>.
+    """
+
+    def __init__(self, folder: str, host: str = '127.0.0.1', port: int = 8765):
+        store = FolderTransport(folder)
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, body: bytes = b'', status: int = 200):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+                if path == '/vector':
+                    with lock:
+                        self._send(encode_changes(store.get_vector()))
+                    return
+                match = re.match(r'^/changes/(\w+)$', path)
+                if not match:
+                    self._send(status=404)
+                    return
+                after = int(dict(p.split('=', 1) for p in query.split('&') if '=' in p).get('after', 0))
+                with lock:
+                    self._send(encode_changes(store.pull(match.group(1), after)))
+
+            def do_POST(self):
+                match = re.match(r'^/changes/(\w+)$', self.path)
+                if not match:
+                    self._send(status=404)
+                    return
+                data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with lock:
+                    store.push(match.group(1), decode_changes(data))
+                self._send(status=204)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self):
+        """Atiende en un hilo aparte"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SyncEngine:
+    """Intercambia solo los cambios nuevos entre un Storage y un transporte"""
+
+    # Cambios por lote publicado
+    BATCH_SIZE = 5000
+
+    def __init__(self, storage, transport: SyncTransport):
+        self.storage = storage
+        self.transport = transport
+
+    def sync(self) -> dict:
+        device_id = self.storage.get_device_id()
+        remote_vector = self.transport.get_vector()
+        local_vector = self.storage.get_change_vector()
+
+        # Publicar lo que el transporte todavía no tiene. Además de lo propio,
+        # incluye lo anotado con un identificador anterior de esta base (por
+        # ejemplo, antes de moverla de carpeta) que nunca se llegó a publicar
+        pushed = 0
+        acknowledged = dict(remote_vector)
+        for local_device, last_seq in local_vector.items():
+            published = remote_vector.get(local_device, 0)
+            while published < last_seq:
+                changes = self.storage.get_changes(local_device, published, self.BATCH_SIZE)
+                if not changes:
+                    break
+                self.transport.push(local_device, [list(change) for change in changes])
+                pushed += len(changes)
+                published = changes[-1][1]
+                acknowledged[local_device] = published
+
+        # Traer lo de los demás dispositivos posterior a lo que ya conocemos
+        pulled = applied = 0
+        for remote_device, last_seq in remote_vector.items():
+            known = local_vector.get(remote_device, 0)
+            if remote_device == device_id or last_seq <= known:
+                continue
+            changes = self.transport.pull(remote_device, known)
+            pulled += len(changes)
+            applied += self.storage.apply_changes([tuple(change) for change in changes])
+
+        # Lo que ya está en el transporte no hace falta guardarlo completo aquí
+        self.storage.acknowledge_changes(acknowledged)
+        compacted = self.storage.compact_change_log()
+
+        return {
+            'pushed': pushed,
+            'pulled': pulled,
+            'applied': applied,
+            'compacted': compacted,
+            'bytes_sent': self.transport.bytes_sent,
+            'bytes_received': self.transport.bytes_received
+        }
@@ -0,0 +1,181 @@
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+
+# Ventana de contexto (entrada + salida) por modelo; se busca por prefijo, del más largo al más corto
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "llama-3.3-70b": 131072,
+    "llama-3.1-8b": 131072,
+    "llama3-70b": 8192,
+    "llama3-8b": 8192,
+    "mixtral-8x7b": 32768,
+    "gemma2-9b": 8192,
+    "gemini-1.5": 1048576,
+    "gemini-pro": 30720,
+}
+
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# GPT4All carga los modelos con este contexto si la configuración no indica otro
+GPT4ALL_CONTEXT_WINDOW = 2048
+
+DEFAULT_MAX_OUTPUT_TOKENS = 1000
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación sin tokenizador: una unidad por palabra o signo, más una cada
+    cuatro caracteres en las palabras largas, que los tokenizadores BPE parten"""
+    return sum(1 + (len(word) - 1) // 4 for word in _WORD.findall(text))
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(provider_name: str, model: str = "") -> Callable[[str], int]:
+    """Función que cuenta tokens para el modelo dado
+
+    Para OpenAI se usa tiktoken si está instalado; los demás proveedores no
+    publican un tokenizador local y se usa la estimación.
+    """
+    if provider_name == "OpenAI":
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except ImportError:
+            pass
+    return estimate_tokens
+
+
+def count_tokens(text: str, provider_name: str = "", model: str = "") -> int:
+    return get_tokenizer(provider_name, model)(text)
+
+
+def context_window(provider_name: str, config: dict) -> int:
+    if provider_name == "GPT4All":
+        return config.get('n_ctx') or GPT4ALL_CONTEXT_WINDOW
+    if config.get('context_window'):
+        return config['context_window']
+    model = config.get('model', '')
+    for prefix in sorted(CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return CONTEXT_WINDOWS[prefix]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def max_output_tokens(provider_name: str, config: dict) -> int:
+    """Tokens de respuesta a pedir: los configurados, sin pasar de media ventana"""
+    requested = config.get('max_tokens') or DEFAULT_MAX_OUTPUT_TOKENS
+    return min(requested, context_window(provider_name, config) // 2)
+
+
+class PromptBuilder:
+    """Arma prompts que, con la respuesta, entran en la ventana del modelo
+
+    El presupuesto de entrada es la ventana menos los tokens reservados para la
+    respuesta, el prompt de sistema y el formato de los mensajes, y un margen
+    para los errores de la estimación.
+    """
+
+    # Prompt de sistema y formato de los mensajes
+    MESSAGE_OVERHEAD = 32
+
+    # Fracción de la ventana que se deja sin usar
+    SAFETY_MARGIN = 0.05
+
+    TRUNCATION_MARK = "\n[...]\n"
+
+    def __init__(self, window: int, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+                 count: Callable[[str], int] = estimate_tokens):
+        self.window = window
+        # La respuesta nunca puede ocupar más de la mitad de la ventana
+        self.max_output_tokens = min(max_output_tokens, window // 2)
+        self.count = count
+        self.input_budget = max(0, window - self.max_output_tokens - self.MESSAGE_OVERHEAD
+                                - int(window * self.SAFETY_MARGIN))
+
+    @classmethod
+    def for_provider(cls, provider_name: str, config: dict) -> "PromptBuilder":
+        return cls(context_window(provider_name, config),
+                   max_output_tokens(provider_name, config),
+                   get_tokenizer(provider_name, config.get('model', '')))
+
+    def fits(self, text: str) -> bool:
+        return self.count(text) <= self.input_budget
+
+    def truncate(self, text: str, max_tokens: Optional[int] = None) -> Tuple[str, bool]:
+        """Recorta el final del texto hasta que entre; indica si hubo que recortar"""
+        max_tokens = self.input_budget if max_tokens is None else max_tokens
+        if self.count(text) <= max_tokens:
+            return text, False
+        end = self.prefix_length(text, max_tokens - self.count(self.TRUNCATION_MARK))
+        return text[:end] + self.TRUNCATION_MARK, True
+
+    def truncate_middle(self, text: str, max_tokens: Optional[int] = None) -> Tuple[str, bool]:
+        """Recorta el centro del texto, conservando el principio y el final
+
+        Sirve para consultas escritas a mano, donde la instrucción suele estar
+        al principio o al final y las notas en el medio.
+        """
+        max_tokens = self.input_budget if max_tokens is None else max_tokens
+        if self.count(text) <= max_tokens:
+            return text, False
+        half = (max_tokens - self.count(self.TRUNCATION_MARK)) // 2
+        end = self.prefix_length(text, half)
+        reversed_tail = self.prefix_length(text[end:][::-1], half, reverse=True)
+        return text[:end] + self.TRUNCATION_MARK + text[len(text) - reversed_tail:], True
+
+    def prefix_length(self, text: str, max_tokens: int, reverse: bool = False) -> int:
+        """Largo del prefijo más largo que entra en max_tokens
+
+        Búsqueda binaria sobre la cantidad de caracteres, así que el corte es
+        siempre el mismo para el mismo texto. Con reverse, text viene invertido.
+        """
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            piece = text[:middle][::-1] if reverse else text[:middle]
+            if self.count(piece) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def fit_entries(self, instruction: str, header: str, entries: List[str],
+                    numbered: bool = True) -> Tuple[str, int]:
+        """Arma instrucción + encabezado + entradas dejando afuera las más antiguas
+
+        entries va en orden cronológico; se conservan las más recientes que
+        entren y se presentan en su orden original. Devuelve el prompt y cuántas
+        entradas se incluyeron.
+        """
+        prefix = f"{instruction}\n\n{header}"
+        available = self.input_budget - self.count(prefix)
+
+        kept = []
+        for entry in reversed(entries):
+            tokens = self.count(entry) + 4
+            if tokens > available:
+                if not kept:
+                    # Ni la más reciente entra entera: se incluye recortada
+                    entry, _ = self.truncate(entry, max(available - 4, 0))
+                    kept.append(entry)
+                break
+            kept.append(entry)
+            available -= tokens
+        kept.reverse()
+
+        if numbered:
+            body = "".join(f"Sesión {i} - {entry}" for i, entry in enumerate(kept, 1))
+        else:
+            body = "".join(kept)
+        return prefix + body, len(kept)
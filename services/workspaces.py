@@ -0,0 +1,224 @@
+import sqlite3
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from services.ai_cache import ResponseCache
+from services.storage import Storage, COACHEE_COLUMNS, SCHEDULED_COLUMNS, SESSION_COLUMNS, SUMMARY_COLUMNS
+
+
+DEFAULT_WORKSPACE = "Principal"
+
+
+class WorkspaceManager:
+    """Espacios de trabajo: una base de datos por coach o consultorio
+
+    El espacio "Principal" usa la base histórica (onto-ai.db); el resto vive en
+    la carpeta de espacios, cada uno con su propio archivo de datos antiguos y
+    su propia caché de respuestas de IA.
+    Las bases se abren recién cuando se usan y se mantienen abiertas las de los
+    espacios usados más recientemente.
+    """
+
+    # Espacios abiertos que se conservan en memoria
+    MAX_OPEN = 3
+
+    def __init__(self, default_db_path: str = "onto-ai.db", root: Optional[str] = None):
+        self.default_db_path = default_db_path
+        self.root = Path(root) if root else Path(default_db_path).parent / "workspaces"
+        self.registry_path = self.root / "workspaces.json"
+        self.open_workspaces = OrderedDict()
+        self.response_caches = {}
+        self.registry = self._load_registry()
+
+    def _load_registry(self) -> dict:
+        if self.registry_path.exists():
+            with open(self.registry_path, encoding='utf-8') as f:
+                return json.load(f)
+        return {'workspaces': {DEFAULT_WORKSPACE: None}, 'last': DEFAULT_WORKSPACE}
+
+    def _save_registry(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.registry_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry, f, ensure_ascii=False, indent=2)
+
+    def list_workspaces(self) -> List[str]:
+        return list(self.registry['workspaces'])
+
+    def get_last_workspace(self) -> str:
+        last = self.registry.get('last', DEFAULT_WORKSPACE)
+        return last if last in self.registry['workspaces'] else DEFAULT_WORKSPACE
+
+    def get_paths(self, name: str) -> Tuple[str, Optional[str]]:
+        """Devuelve las rutas de la base y del archivo de datos antiguos de un espacio"""
+        file_name = self.registry['workspaces'][name]
+        if file_name is None:
+            return self.default_db_path, None
+        db_path = self.root / file_name
+        return str(db_path), str(db_path.with_name(f"{db_path.stem}-archive.db"))
+
+    def get_cache_path(self, name: str) -> str:
+        """Ruta de la caché de respuestas de IA de un espacio, junto a su base"""
+        db_path = Path(self.get_paths(name)[0])
+        return str(db_path.with_name(f"{db_path.stem}-ai-cache.db"))
+
+    def get_response_cache(self, name: str) -> ResponseCache:
+        """Caché de respuestas de un espacio: lo generado a partir de sus notas no se mezcla con otros"""
+        if name not in self.registry['workspaces']:
+            raise KeyError(name)
+
+        cache = self.response_caches.get(name)
+        if cache is None:
+            cache_path = self.get_cache_path(name)
+            Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+            cache = self.response_caches[name] = ResponseCache(cache_path)
+        return cache
+
+    def create_workspace(self, name: str) -> str:
+        """Registra un espacio nuevo; la base se crea al abrirlo por primera vez"""
+        name = name.strip()
+        if not name:
+            raise ValueError("El nombre del espacio no puede estar vacío")
+        if name in self.registry['workspaces']:
+            raise ValueError(f"Ya existe un espacio llamado {name}")
+
+        slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'espacio'
+        used = set(self.registry['workspaces'].values())
+        file_name = f"{slug}.db"
+        suffix = 2
+        while file_name in used:
+            file_name = f"{slug}-{suffix}.db"
+            suffix += 1
+
+        self.registry['workspaces'][name] = file_name
+        self._save_registry()
+        return name
+
+    def open_workspace(self, name: str) -> Storage:
+        """Abre (o reutiliza) el almacenamiento de un espacio y lo marca como el último usado"""
+        if name not in self.registry['workspaces']:
+            raise KeyError(name)
+
+        storage = self.open_workspaces.get(name)
+        if storage is None:
+            db_path, archive_path = self.get_paths(name)
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            storage = Storage(db_path, archive_path=archive_path)
+            self.open_workspaces[name] = storage
+            while len(self.open_workspaces) > self.MAX_OPEN:
+                _, evicted = self.open_workspaces.popitem(last=False)
+                evicted.close()
+        else:
+            self.open_workspaces.move_to_end(name)
+
+        if self.registry.get('last') != name:
+            self.registry['last'] = name
+            self._save_registry()
+
+        return storage
+
+    def open_aggregate(self, names: Optional[List[str]] = None) -> 'WorkspaceAggregate':
+        """Vista de solo lectura sobre varios espacios, sin copiar datos"""
+        names = names or self.list_workspaces()
+        databases = {}
+        for name in names:
+            db_path, _ = self.get_paths(name)
+            # Los espacios que todavía no se abrieron no tienen base
+            if Path(db_path).exists():
+                databases[name] = db_path
+        return WorkspaceAggregate(databases)
+
+
+class WorkspaceAggregate:
+    """Consulta varios espacios a la vez adjuntando sus bases en solo lectura
+
+    Expone vistas temporales all_coachees, all_sessions, all_summaries y
+    all_scheduled_sessions con una columna workspace adicional. Los datos
+    movidos a la base de archivo de cada espacio no se incluyen.
+    """
+
+    # Columnas explícitas: las bases migradas pueden tener columnas en otro orden
+    TABLES = {
+        'coachees': COACHEE_COLUMNS,
+        'sessions': SESSION_COLUMNS,
+        'summaries': SUMMARY_COLUMNS,
+        'scheduled_sessions': SCHEDULED_COLUMNS
+    }
+    # Límite de bases adjuntas por conexión en SQLite (SQLITE_MAX_ATTACHED por defecto)
+    MAX_ATTACHED = 10
+
+    def __init__(self, databases: Dict[str, str]):
+        if len(databases) > self.MAX_ATTACHED:
+            raise ValueError(f"No se pueden combinar más de {self.MAX_ATTACHED} espacios a la vez")
+        self.databases = databases
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        # Las vistas no admiten parámetros: el nombre del espacio va como literal
+        return "'" + value.replace("'", "''") + "'"
+
+    def _connect(self) -> sqlite3.Connection:
+        # uri=True para que ATTACH acepte URIs con mode=ro
+        conn = sqlite3.connect('file::memory:', uri=True)
+        cursor = conn.cursor()
+
+        aliases = []
+        for index, (name, db_path) in enumerate(self.databases.items()):
+            alias = f"ws{index}"
+            uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+            cursor.execute('ATTACH DATABASE ? AS ' + alias, (uri,))
+            aliases.append((alias, name))
+
+        for table, columns in self.TABLES.items():
+            if not aliases:
+                break
+            selects = ' UNION ALL '.join(
+                f"SELECT {self._quote(name)} AS workspace, {columns} FROM {alias}.{table}"
+                for alias, name in aliases
+            )
+            cursor.execute(f'CREATE TEMP VIEW all_{table} AS {selects}')
+
+        return conn
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Ejecuta una consulta de solo lectura sobre las vistas all_*"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def get_payment_totals(self, date_from: Optional[str] = None,
+                           date_to: Optional[str] = None) -> List[Tuple[str, int, int, float, float]]:
+        """Sesiones, sesiones pagadas, cobrado y pendiente por espacio"""
+        conditions = []
+        params = []
+        if date_from is not None:
+            conditions.append('fecha >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append('fecha <= ?')
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        return self.query(f'''
+            SELECT workspace,
+                   COUNT(*),
+                   COALESCE(SUM(pagado = 1), 0),
+                   COALESCE(SUM(CASE WHEN pagado = 1 THEN monto ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN pagado = 0 THEN monto ELSE 0 END), 0)
+            FROM all_sessions
+            {where}
+            GROUP BY workspace
+            ORDER BY workspace
+        ''', tuple(params))
+
+    def get_coachee_counts(self) -> List[Tuple[str, int]]:
+        """Cantidad de coachees por espacio"""
+        return self.query('''
+            SELECT workspace, COUNT(*) FROM all_coachees
+            GROUP BY workspace
+            ORDER BY workspace
+        ''')
@@ -0,0 +1,133 @@
+"""Mide la latencia de consultas seguidas con clientes reutilizados o nuevos
+
+Levanta un servidor HTTP local que imita la API de chat de OpenAI/Groq y
+compara consultas que reutilizan el cliente del pool con consultas que crean
+un cliente (y una conexión) nuevos cada vez, como antes del pool. Con
+--concurrent mide además cuánto tardan N consultas lanzadas a la vez con la
+interfaz asíncrona desde un único hilo.
+
+Uso:
+    python tools/ai_client_benchmark.py --requests 50 --connect-delay 30
+    python tools/ai_client_benchmark.py --requests 10 --concurrent 50 --response-delay 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ai_providers import ASYNC_CLIENT_POOL, CLIENT_POOL, AIProviderFactory
+
+
+def start_server(connect_delay: float, response_delay: float = 0.0) -> ThreadingHTTPServer:
+    """Servidor de reemplazo; connect_delay simula el costo de abrir una conexión (TCP + TLS)
+    y response_delay el tiempo que tarda el modelo en responder"""
+
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 para que el cliente pueda mantener la conexión abierta
+        protocol_version = 'HTTP/1.1'
+        # Sin Nagle: cabeceras y cuerpo van en escrituras separadas
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            time.sleep(connect_delay)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(response_delay)
+            if not self.path.endswith('/chat/completions'):
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = json.dumps({
+                'id': 'bench', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'bench',
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': 'Respuesta de prueba'}}],
+                'usage': {'prompt_tokens': 10, 'completion_tokens': 3, 'total_tokens': 13}
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # Cola de conexiones amplia para las consultas simultáneas
+        request_queue_size = 256
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(provider_name: str, config: dict, requests: int, reuse: bool):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        provider = AIProviderFactory.create_provider(provider_name, config)
+        response = provider.generate_response("Hola")
+        provider.close()
+        if not reuse:
+            CLIENT_POOL.close_all()
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.startswith("Error"):
+            raise RuntimeError(response)
+    CLIENT_POOL.close_all()
+    return latencies
+
+
+async def measure_concurrent(provider_name: str, config: dict, concurrent: int) -> float:
+    provider = AIProviderFactory.create_provider(provider_name, config)
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(provider.agenerate_response("Hola") for _ in range(concurrent)))
+    elapsed = (time.perf_counter() - started) * 1000
+    provider.close()
+    await ASYNC_CLIENT_POOL.aclose_all()
+    errors = [response for response in responses if response.startswith("Error")]
+    if errors:
+        raise RuntimeError(errors[0])
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia con y sin reutilizar clientes de IA")
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--connect-delay', type=float, default=0.0,
+                        help="Milisegundos que el servidor tarda en aceptar cada conexión nueva")
+    parser.add_argument('--response-delay', type=float, default=0.0,
+                        help="Milisegundos que el servidor tarda en responder cada consulta")
+    parser.add_argument('--concurrent', type=int, default=0,
+                        help="Consultas simultáneas a medir con la interfaz asíncrona")
+    args = parser.parse_args()
+
+    server = start_server(args.connect_delay / 1000, args.response_delay / 1000)
+    host, port = server.server_address[:2]
+
+    for provider_name, base_url in (("OpenAI", f"http://{host}:{port}/v1"),
+                                    ("GroqCloud", f"http://{host}:{port}")):
+        # El servidor de reemplazo no tiene límite de consultas por minuto
+        config = {'api_key': 'bench', 'model': 'bench', 'base_url': base_url, 'rpm': 10 ** 6, 'tpm': 10 ** 9}
+        for label, reuse in (("cliente nuevo", False), ("pool", True)):
+            latencies = measure(provider_name, config, args.requests, reuse)
+            print(f"{provider_name} ({label}): mediana {statistics.median(latencies):.1f} ms, "
+                  f"p95 {sorted(latencies)[int(len(latencies) * 0.95) - 1]:.1f} ms")
+        if args.concurrent:
+            elapsed = asyncio.run(measure_concurrent(provider_name, config, args.concurrent))
+            print(f"{provider_name} (asíncrono): {args.concurrent} consultas simultáneas en {elapsed:.0f} ms")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
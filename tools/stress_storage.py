@@ -0,0 +1,117 @@
+"""Prueba de carga de Storage con varios procesos sobre el mismo archivo
+
+Simula varias instancias de la aplicación (o un script de sincronización)
+que leen y escriben a la vez en una misma base. Cada proceso usa su propio
+Storage y al terminar informa operaciones, errores y esperas por bloqueos.
+
+Uso:
+    python tools/stress_storage.py --db /tmp/stress.db --readers 4 --writers 2 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.coachee import Coachee
+from models.session import Session
+from services.storage import Storage
+
+
+def prepare(db_path, coachees):
+    storage = Storage(db_path)
+    if storage.get_all_coachees():
+        return
+    for i in range(coachees):
+        storage.add_coachee(Coachee(id=None, nombre=f"Coachee{i}", apellido="Prueba",
+                                    email="", telefono="000"))
+
+
+def writer(db_path, seconds, busy_timeout, results):
+    storage = Storage(db_path, busy_timeout=busy_timeout)
+    coachee_ids = [coachee.id for coachee in storage.get_all_coachees()]
+    ops = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            fecha = (datetime.now() - timedelta(days=random.randint(0, 365))).strftime("%Y-%m-%d")
+            session_id = storage.add_session(Session(
+                id=None, coachee_id=random.choice(coachee_ids), fecha=fecha, notas="Prueba de carga"
+            ))
+            storage.update_session_payment(session_id, random.random() < 0.5, 100.0)
+            ops += 2
+        except Exception:
+            errors += 1
+    results.put(('writer', ops, errors, storage.lock_stats.totals()))
+
+
+def reader(db_path, seconds, busy_timeout, results):
+    storage = Storage(db_path, busy_timeout=busy_timeout)
+    coachee_ids = [coachee.id for coachee in storage.get_all_coachees()]
+    today = datetime.now()
+    ops = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            coachee_id = random.choice(coachee_ids)
+            storage.get_sessions_by_coachee(coachee_id)
+            storage.count_sessions(coachee_id=coachee_id, paid=False)
+            storage.get_calendar_month_status(today.year, today.month)
+            ops += 3
+        except Exception:
+            errors += 1
+    results.put(('reader', ops, errors, storage.lock_stats.totals()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente de Storage")
+    parser.add_argument('--db', default='stress-onto-ai.db')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--coachees', type=int, default=20)
+    parser.add_argument('--busy-timeout', type=float, default=5.0)
+    args = parser.parse_args()
+
+    prepare(args.db, args.coachees)
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=writer, args=(args.db, args.seconds, args.busy_timeout, results))
+        for _ in range(args.writers)
+    ] + [
+        multiprocessing.Process(target=reader, args=(args.db, args.seconds, args.busy_timeout, results))
+        for _ in range(args.readers)
+    ]
+    for process in processes:
+        process.start()
+
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    for role in ('writer', 'reader'):
+        role_reports = [report for report in reports if report[0] == role]
+        if not role_reports:
+            continue
+        ops = sum(report[1] for report in role_reports)
+        errors = sum(report[2] for report in role_reports)
+        waited_calls = sum(report[3]['calls'] for report in role_reports)
+        retries = sum(report[3]['retries'] for report in role_reports)
+        failures = sum(report[3]['failures'] for report in role_reports)
+        total_wait = sum(report[3]['total_wait'] for report in role_reports)
+        max_wait = max(report[3]['max_wait'] for report in role_reports)
+        print(f"{role}s x{len(role_reports)}: {ops / args.seconds:.0f} ops/s, {errors} errores")
+        print(f"  llamadas que esperaron: {waited_calls}, reintentos: {retries}, "
+              f"agotadas: {failures}")
+        if waited_calls:
+            print(f"  espera total: {total_wait:.2f} s, media: {total_wait / waited_calls * 1000:.1f} ms, "
+                  f"máxima: {max_wait * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
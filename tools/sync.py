@@ -0,0 +1,56 @@
+"""Sincroniza una base con otras instalaciones intercambiando solo los cambios
+
+Uso:
+    # A través de una carpeta compartida (Dropbox, red local, USB...)
+    python tools/sync.py run --db onto-ai.db --folder /ruta/compartida/onto-sync
+
+    # A través del servidor HTTP local
+    python tools/sync.py serve --folder /ruta/servidor --port 8765
+    python tools/sync.py run --db onto-ai.db --url http://127.0.0.1:8765
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.storage import Storage
+from services.sync import FolderTransport, HttpTransport, SyncEngine, SyncServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincronización por cambios entre instalaciones")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Publica los cambios locales y aplica los remotos")
+    run.add_argument('--db', default='onto-ai.db')
+    target = run.add_mutually_exclusive_group(required=True)
+    target.add_argument('--folder')
+    target.add_argument('--url')
+
+    serve = commands.add_parser('serve', help="Servidor HTTP local de sincronización")
+    serve.add_argument('--folder', required=True)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = SyncServer(args.folder, args.host, args.port)
+        print(f"Sirviendo {args.folder} en {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    transport = FolderTransport(args.folder) if args.folder else HttpTransport(args.url)
+    result = SyncEngine(Storage(args.db), transport).sync()
+    print(f"Enviados: {result['pushed']} cambios ({result['bytes_sent'] / 1024:.1f} KB)")
+    print(f"Recibidos: {result['pulled']} cambios ({result['bytes_received'] / 1024:.1f} KB), "
+          f"{result['applied']} aplicados")
+    print(f"Registro local compactado: {result['compacted']} cambios descartados")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Mide el tiempo de carga de las vistas sobre una base en memoria
+
+Carga datos sintéticos en un InMemoryStorage y construye la ventana principal
+para medir el costo de las vistas sin que influya el disco.
+
+Uso:
+    python tools/ui_load_benchmark.py --coachees 200 --sessions 20000 --summaries 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import QApplication
+
+from models.coachee import Coachee
+from models.session import Session
+from services.storage import InMemoryStorage
+
+
+def seed(storage, coachees, sessions, summaries, scheduled):
+    coachee_ids = [
+        storage.add_coachee(Coachee(id=None, nombre=f"Coachee{i}", apellido="Prueba",
+                                    email="", telefono="000"))
+        for i in range(coachees)
+    ]
+    now = datetime.now()
+    for _ in range(sessions):
+        fecha = (now - timedelta(days=random.randint(0, 730))).strftime("%Y-%m-%d %H:%M:%S")
+        storage.add_session(Session(id=None, coachee_id=random.choice(coachee_ids), fecha=fecha,
+                                    notas="Notas de prueba", pagado=random.random() < 0.7, monto=100.0))
+    for _ in range(summaries):
+        storage.add_summary({
+            'coachee_id': random.choice(coachee_ids),
+            'title': "Resumen de prueba",
+            'summary_type': "Resumen General",
+            'content': "Contenido de prueba",
+            'created_at': (now - timedelta(days=random.randint(0, 730))).strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    for _ in range(scheduled):
+        scheduled_time = now + timedelta(days=random.randint(-60, 60), hours=random.randint(0, 10))
+        storage.add_scheduled_session({
+            'coachee_id': random.choice(coachee_ids),
+            'scheduled_time': scheduled_time.strftime("%Y-%m-%d %H:00:00"),
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de carga de las vistas sin disco")
+    parser.add_argument('--coachees', type=int, default=200)
+    parser.add_argument('--sessions', type=int, default=20000)
+    parser.add_argument('--summaries', type=int, default=2000)
+    parser.add_argument('--scheduled', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+
+    from ui.main_window import MainWindow
+
+    storage = InMemoryStorage()
+    started = time.perf_counter()
+    seed(storage, args.coachees, args.sessions, args.summaries, args.scheduled)
+    print(f"Datos cargados en {time.perf_counter() - started:.2f} s")
+
+    started = time.perf_counter()
+    window = MainWindow(storage)
+    print(f"Ventana principal: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for name, action in (
+        ("Sesiones", lambda: window.sessions_view.set_coachee(storage.get_all_coachees()[0])),
+        ("Resúmenes", window.summaries_view.load_summaries),
+        ("Pagos", window.payments_view.load_payments),
+        ("Calendario", window.calendar_view.load_sessions),
+    ):
+        started = time.perf_counter()
+        action()
+        print(f"{name}: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    window.close()
+    storage.close()
+
+
+if __name__ == '__main__':
+    main()
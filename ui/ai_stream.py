@@ -0,0 +1,135 @@
+from PySide6.QtCore import QObject, QThread, QTimer, Signal
+from PySide6.QtGui import QTextCursor
+import warnings
+
+
+# Hilos de diálogos ya cerrados que todavía no terminaron
+_detached_threads = set()
+
+
+def detach_thread(thread, *signals):
+    """Detiene un hilo en curso sin esperarlo y lo suelta de su diálogo
+
+    Se desconectan las señales indicadas, que apuntan al diálogo, y el hilo
+    queda sin padre para que el diálogo pueda destruirse. Se conserva una
+    referencia hasta que termina; finished lo libera con deleteLater.
+    """
+    if thread is None or not thread.isRunning():
+        return
+    with warnings.catch_warnings():
+        # PySide avisa al desconectar una señal que no tenía conexiones
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for signal in signals:
+            try:
+                signal.disconnect()
+            except (RuntimeError, TypeError):
+                pass
+    thread.stop()
+    thread.setParent(None)
+    _detached_threads.add(thread)
+    thread.finished.connect(lambda: _detached_threads.discard(thread))
+    if thread.isFinished():
+        _detached_threads.discard(thread)
+
+
+class StreamingResponseThread(QThread):
+    """Consume la respuesta de un proveedor por fragmentos en segundo plano"""
+    chunk = Signal(str)
+    response_ready = Signal(str)
+    error = Signal(str)
+
+    def __init__(self, provider, prompt, parent=None):
+        # Con un padre, Qt conserva el hilo aunque se suelte la referencia de Python
+        super().__init__(parent)
+        self.finished.connect(self.deleteLater)
+        self.provider = provider
+        self.prompt = prompt
+        self._stopped = False
+
+    def stop(self):
+        """Deja de leer la respuesta; si el proveedor lo permite, corta la que está en curso"""
+        self._stopped = True
+        self.provider.cancel()
+
+    def run(self):
+        parts = []
+        stream = None
+        try:
+            stream = self.provider.stream_response(self.prompt)
+            for text in stream:
+                if self._stopped:
+                    break
+                parts.append(text)
+                self.chunk.emit(text)
+        except Exception as e:
+            # Cortar la respuesta en curso la termina con un error que no se informa
+            if not self._stopped:
+                self.error.emit(str(e))
+            return
+        finally:
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+            self.provider.close()
+
+        if not self._stopped:
+            self.response_ready.emit("".join(parts))
+
+
+class StreamRenderer(QObject):
+    """Agrega texto a un QTextEdit a medida que llega, agrupando los repintados
+
+    El primer fragmento se muestra en cuanto llega; los siguientes se acumulan y
+    se insertan juntos cada FLUSH_MS, en lugar de repintar por cada token.
+    """
+
+    FLUSH_MS = 50
+
+    def __init__(self, text_edit, parent=None):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.buffer = []
+        self.started = False
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def start(self, placeholder: str = ""):
+        """Muestra el texto de espera hasta que llegue el primer fragmento"""
+        self.buffer.clear()
+        self.started = False
+        self.timer.stop()
+        self.text_edit.setPlainText(placeholder)
+
+    def append(self, text: str):
+        self.buffer.append(text)
+        if not self.started:
+            self.started = True
+            self.text_edit.clear()
+            self.flush()
+        elif not self.timer.isActive():
+            self.timer.start(self.FLUSH_MS)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        text = "".join(self.buffer)
+        self.buffer.clear()
+
+        # Solo se sigue el final si el usuario no subió a leer lo anterior
+        scrollbar = self.text_edit.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def finish(self, full_text: str):
+        """Cierra el flujo dejando exactamente el texto completo"""
+        self.timer.stop()
+        self.buffer.clear()
+        if self.text_edit.toPlainText() != full_text:
+            self.text_edit.setPlainText(full_text)
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from contextlib import aclosing
+from typing import Callable, Optional
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtWidgets import QApplication
+
+from services.ai_providers import ASYNC_CLIENT_POOL
+
+
+class AsyncBridge(QObject):
+    """Bucle asyncio en un hilo propio, conectado al bucle de eventos de Qt
+
+    Las corrutinas (por ejemplo agenerate_response o astream de los
+    proveedores) se ejecutan todas juntas en un único hilo; los resultados y
+    fragmentos vuelven al hilo de la interfaz mediante una señal, así que los
+    callbacks pueden tocar widgets directamente.
+    """
+
+    # Cada emisión lleva una función a ejecutar en el hilo de Qt
+    _deliver = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._deliver.connect(self._run_callback)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="asyncio", daemon=True)
+        self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @staticmethod
+    def _run_callback(callback):
+        callback()
+
+    def call_in_gui(self, callback: Callable, *args):
+        self._deliver.emit(lambda: callback(*args))
+
+    def submit(self, coro, on_done: Optional[Callable] = None,
+               on_error: Optional[Callable] = None) -> Future:
+        """Programa una corrutina; on_done/on_error se llaman en el hilo de Qt"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+        def finished(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    self.call_in_gui(on_error, str(error))
+            elif on_done:
+                self.call_in_gui(on_done, future.result())
+
+        future.add_done_callback(finished)
+        return future
+
+    def stream(self, agen, on_chunk: Callable, on_done: Optional[Callable] = None,
+               on_error: Optional[Callable] = None) -> Future:
+        """Consume un generador asíncrono entregando cada fragmento en el hilo de Qt
+
+        Cancelar el Future devuelto cierra el generador, y con él la respuesta
+        en curso.
+        """
+        async def consume():
+            parts = []
+            async with aclosing(agen):
+                async for text in agen:
+                    parts.append(text)
+                    self.call_in_gui(on_chunk, text)
+            return "".join(parts)
+
+        return self.submit(consume(), on_done, on_error)
+
+    def shutdown(self):
+        """Cierra los clientes asíncronos y detiene el bucle"""
+        if not self.loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(ASYNC_CLIENT_POOL.aclose_all(), self.loop).result(timeout=5)
+        except Exception as e:
+            print(f"Error closing async AI clients: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+_bridge = None
+
+
+def async_bridge() -> AsyncBridge:
+    """Puente compartido por toda la aplicación; se detiene al salir"""
+    global _bridge
+    if _bridge is None:
+        _bridge = AsyncBridge()
+        app = QApplication.instance()
+        if app:
+            app.aboutToQuit.connect(_bridge.shutdown)
+    return _bridge
@@ -3,10 +3,13 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QDialog, QFormLayout, QLineEdit, QTextEdit,
                                QDateTimeEdit, QMessageBox, QListWidgetItem,
                                QGroupBox, QComboBox, QCheckBox)
-from PySide6.QtCore import Qt, QDate, QDateTime, QTimer, Signal
+from PySide6.QtCore import Qt, QDate, QDateTime, QTimer, Signal, QObject
 from PySide6.QtGui import QTextCharFormat, QColor, QFont
 from datetime import datetime, timedelta
+from collections import OrderedDict
 import json
+from services.storage import NOTIFY_OFFSETS, DEFAULT_NOTIFY_OFFSET
+from ui.notification_center import NotificationCenter
 
 
 class SessionScheduleDialog(QDialog):
@@ -77,14 +80,8 @@ class SessionScheduleDialog(QDialog):
         form_layout.addRow("", self.notify_checkbox)
         
         self.notify_time_combo = QComboBox()
-        self.notify_time_combo.addItems([
-            "5 minutos antes",
-            "15 minutos antes",
-            "30 minutos antes",
-            "1 hora antes",
-            "1 día antes"
-        ])
-        self.notify_time_combo.setCurrentIndex(2)
+        self.notify_time_combo.addItems(list(NOTIFY_OFFSETS))
+        self.notify_time_combo.setCurrentIndex(list(NOTIFY_OFFSETS.values()).index(DEFAULT_NOTIFY_OFFSET))
         form_layout.addRow("Recordatorio:", self.notify_time_combo)
         
         layout.addLayout(form_layout)
@@ -151,15 +148,87 @@ class SessionScheduleDialog(QDialog):
             QMessageBox.critical(self, "Error", f"Error al programar la sesión: {str(e)}")
 
 
+class ReminderScheduler(QObject):
+    """Programa un único temporizador para el próximo recordatorio pendiente"""
+    
+    reminders_due = Signal(list)
+    
+    # Espera máxima entre despertares, para corregir desvíos del reloj o suspensiones
+    MAX_WAIT_MS = 60 * 60 * 1000
+    
+    def __init__(self, storage, parent=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.fire)
+    
+    def rearm(self):
+        """Vuelve a calcular el próximo recordatorio y arma el temporizador"""
+        self.timer.stop()
+        try:
+            next_time = self.storage.get_next_reminder_time()
+        except Exception as e:
+            print(f"Error scheduling reminders: {e}")
+            return
+        
+        if next_time is None:
+            return
+        
+        delay = datetime.strptime(next_time, "%Y-%m-%d %H:%M:%S") - datetime.now()
+        delay_ms = max(0, int(delay.total_seconds() * 1000))
+        self.timer.start(min(delay_ms, self.MAX_WAIT_MS))
+    
+    def fire(self):
+        """Entrega los recordatorios vencidos y arma el siguiente"""
+        try:
+            now = datetime.now()
+            sessions = self.storage.get_due_reminders(now.strftime("%Y-%m-%d %H:%M:%S"))
+            self.storage.mark_sessions_notified([session.id for session in sessions])
+            
+            # Los recordatorios perdidos con la aplicación cerrada solo se
+            # muestran si la sesión todavía no terminó
+            due = []
+            for session in sessions:
+                scheduled_time = datetime.strptime(session.scheduled_time, "%Y-%m-%d %H:%M:%S")
+                if scheduled_time + timedelta(minutes=session.duration or 0) > now:
+                    due.append(session)
+            
+            if due:
+                self.reminders_due.emit(due)
+        except Exception as e:
+            # Reintentar más tarde en lugar de despertar en bucle
+            print(f"Error checking notifications: {e}")
+            self.timer.start(self.MAX_WAIT_MS)
+            return
+        
+        self.rearm()
+
+
 class CalendarView(QWidget):
     """Vista principal del calendario con sesiones programadas"""
     
     session_scheduled = Signal()
     
-    def __init__(self, storage, parent=None):
+    # Meses guardados en caché (el visible y sus vecinos)
+    MONTH_CACHE_SIZE = 5
+    
+    # Cantidad máxima de próximas sesiones y horizontes disponibles (en días)
+    UPCOMING_LIMIT = 10
+    UPCOMING_HORIZONS = [
+        ("Próximos 7 días", 7),
+        ("Próximos 30 días", 30),
+        ("Próximos 90 días", 90),
+        ("Sin límite", 0)
+    ]
+    
+    def __init__(self, storage, parent=None, notification_center=None):
         super().__init__(parent)
         self.storage = storage
+        self.notification_center = notification_center
         self.selected_date = QDate.currentDate()
+        self.month_cache = OrderedDict()
+        self.setup_status_formats()
         self.setup_ui()
         self.setup_notification_timer()
         self.load_sessions()
@@ -197,6 +266,7 @@ class CalendarView(QWidget):
         self.calendar = QCalendarWidget()
         self.calendar.setGridVisible(True)
         self.calendar.clicked.connect(self.on_date_selected)
+        self.calendar.currentPageChanged.connect(self.on_page_changed)
         self.calendar.setMinimumWidth(350)
         calendar_layout.addWidget(self.calendar)
         
@@ -244,6 +314,21 @@ class CalendarView(QWidget):
         upcoming_group = QGroupBox("Próximas Sesiones")
         upcoming_layout = QVBoxLayout()
         
+        horizon_layout = QHBoxLayout()
+        horizon_layout.addWidget(QLabel("Mostrar:"))
+        
+        self.horizon_combo = QComboBox()
+        for label, days in self.UPCOMING_HORIZONS:
+            self.horizon_combo.addItem(label, days)
+        index = self.horizon_combo.findData(self.storage.get_setting('upcoming_horizon_days', 30))
+        if index >= 0:
+            self.horizon_combo.setCurrentIndex(index)
+        self.horizon_combo.currentIndexChanged.connect(self.on_horizon_changed)
+        horizon_layout.addWidget(self.horizon_combo)
+        horizon_layout.addStretch()
+        
+        upcoming_layout.addLayout(horizon_layout)
+        
         self.upcoming_list = QListWidget()
         self.upcoming_list.setMaximumHeight(150)
         upcoming_layout.addWidget(self.upcoming_list)
@@ -257,109 +342,114 @@ class CalendarView(QWidget):
         self.sessions_list.itemClicked.connect(self.on_session_selected)
     
     def setup_notification_timer(self):
-        """Configura el timer para verificar notificaciones"""
-        self.notification_timer = QTimer()
-        self.notification_timer.timeout.connect(self.check_notifications)
-        self.notification_timer.start(60000)  # Verificar cada minuto
-        
-    def check_notifications(self):
-        """Verifica si hay sesiones que requieren notificación"""
-        try:
-            now = datetime.now()
-            sessions = self.storage.get_all_scheduled_sessions()
-            
-            for session in sessions:
-                if session.get('status') != 'scheduled':
-                    continue
-                
-                if not session.get('notify_enabled'):
-                    continue
-                
-                scheduled_time = datetime.strptime(session['scheduled_time'], "%Y-%m-%d %H:%M:%S")
-                notify_time_str = session.get('notify_time', '30 minutos antes')
-                
-                # Calcular tiempo de notificación
-                notify_minutes = {
-                    '5 minutos antes': 5,
-                    '15 minutos antes': 15,
-                    '30 minutos antes': 30,
-                    '1 hora antes': 60,
-                    '1 día antes': 1440
-                }.get(notify_time_str, 30)
-                
-                notify_time = scheduled_time - timedelta(minutes=notify_minutes)
-                
-                # Verificar si es momento de notificar (con ventana de 1 minuto)
-                if notify_time <= now <= notify_time + timedelta(minutes=1):
-                    if not session.get('notified', False):
-                        self.show_notification(session)
-                        self.storage.mark_session_notified(session['id'])
-        except Exception as e:
-            print(f"Error checking notifications: {e}")
-    
-    def show_notification(self, session):
-        """Muestra una notificación para una sesión"""
-        coachee = self.storage.get_coachee(session['coachee_id'])
-        if not coachee:
-            return
-        
-        scheduled_time = datetime.strptime(session['scheduled_time'], "%Y-%m-%d %H:%M:%S")
-        time_str = scheduled_time.strftime("%H:%M")
-        
-        msg = QMessageBox(self)
-        msg.setIcon(QMessageBox.Information)
-        msg.setWindowTitle("Recordatorio de Sesión")
-        msg.setText(f"Sesión Próxima con {coachee.nombre_completo}")
-        msg.setInformativeText(
-            f"Título: {session.get('title', 'Sesión de coaching')}\n"
-            f"Hora: {time_str}\n"
-            f"Duración: {session.get('duration', 60)} minutos"
-        )
-        msg.setStandardButtons(QMessageBox.Ok)
-        msg.exec()
+        """Configura el programador de recordatorios y el centro de notificaciones"""
+        # La ventana principal comparte su centro entre espacios de trabajo
+        if self.notification_center is None:
+            self.notification_center = NotificationCenter(self.storage, self)
+        self.reminder_scheduler = ReminderScheduler(self.storage, self)
+        self.reminder_scheduler.reminders_due.connect(self.notification_center.notify)
     
     def load_sessions(self):
         """Carga todas las sesiones programadas"""
         self.update_calendar_highlights()
         self.load_day_sessions()
         self.load_upcoming_sessions()
+        self.reminder_scheduler.rearm()
+    
+    def setup_status_formats(self):
+        """Crea una sola vez los formatos de resaltado por estado"""
+        self.format_scheduled = QTextCharFormat()
+        self.format_scheduled.setBackground(QColor("#14A79B"))
+        self.format_scheduled.setForeground(QColor("white"))
+        
+        self.format_completed = QTextCharFormat()
+        self.format_completed.setBackground(QColor("#4CAF50"))
+        self.format_completed.setForeground(QColor("white"))
+        
+        self.format_cancelled = QTextCharFormat()
+        self.format_cancelled.setBackground(QColor("#F44336"))
+        self.format_cancelled.setForeground(QColor("white"))
+    
+    def format_for_counts(self, counts):
+        """Elige el formato del día: manda lo pendiente, luego lo completado"""
+        scheduled, completed, cancelled = counts
+        if scheduled:
+            return self.format_scheduled
+        if completed:
+            return self.format_completed
+        if cancelled:
+            return self.format_cancelled
+        return QTextCharFormat()
+    
+    def get_month_status(self, year, month):
+        """Devuelve los conteos por día del mes, usando la caché LRU de meses"""
+        key = (year, month)
+        if key in self.month_cache:
+            self.month_cache.move_to_end(key)
+            return self.month_cache[key]
+        
+        status = self.storage.get_calendar_month_status(year, month)
+        self.month_cache[key] = status
+        if len(self.month_cache) > self.MONTH_CACHE_SIZE:
+            self.month_cache.popitem(last=False)
+        return status
+    
+    def prefetch_neighbor_months(self, year, month):
+        """Precarga los meses anterior y siguiente al visible"""
+        for offset in (-1, 1):
+            neighbor = QDate(year, month, 1).addMonths(offset)
+            self.get_month_status(neighbor.year(), neighbor.month())
+        # Mantener el mes visible como el más reciente de la caché
+        if (year, month) in self.month_cache:
+            self.month_cache.move_to_end((year, month))
     
     def update_calendar_highlights(self):
-        """Actualiza los resaltados del calendario"""
+        """Actualiza los resaltados del mes visible del calendario"""
         try:
-            sessions = self.storage.get_all_scheduled_sessions()
-            
-            # Formato para días con sesiones
-            format_scheduled = QTextCharFormat()
-            format_scheduled.setBackground(QColor("#14A79B"))
-            format_scheduled.setForeground(QColor("white"))
-            
-            format_completed = QTextCharFormat()
-            format_completed.setBackground(QColor("#4CAF50"))
-            format_completed.setForeground(QColor("white"))
-            
-            format_cancelled = QTextCharFormat()
-            format_cancelled.setBackground(QColor("#F44336"))
-            format_cancelled.setForeground(QColor("white"))
+            year = self.calendar.yearShown()
+            month = self.calendar.monthShown()
             
             # Limpiar formatos previos
             self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
             
-            # Aplicar formatos
-            for session in sessions:
-                scheduled_time = datetime.strptime(session['scheduled_time'], "%Y-%m-%d %H:%M:%S")
-                date = QDate(scheduled_time.year, scheduled_time.month, scheduled_time.day)
-                
-                status = session.get('status', 'scheduled')
-                if status == 'completed':
-                    self.calendar.setDateTextFormat(date, format_completed)
-                elif status == 'cancelled':
-                    self.calendar.setDateTextFormat(date, format_cancelled)
-                else:
-                    self.calendar.setDateTextFormat(date, format_scheduled)
+            for day, counts in self.get_month_status(year, month).items():
+                self.calendar.setDateTextFormat(QDate(year, month, day), self.format_for_counts(counts))
+            
+            QTimer.singleShot(0, lambda: self.prefetch_neighbor_months(year, month))
         except Exception as e:
             print(f"Error updating calendar: {e}")
     
+    def on_page_changed(self, year, month):
+        """Repinta los resaltados al cambiar de mes en el calendario"""
+        self.update_calendar_highlights()
+    
+    def refresh_day(self, date):
+        """Actualiza solo el resaltado de un día tras un cambio en sus sesiones"""
+        try:
+            date_str = date.toString("yyyy-MM-dd")
+            counts = self.storage.get_scheduled_status_by_day(
+                date_str, date.addDays(1).toString("yyyy-MM-dd")
+            ).get(date_str, (0, 0, 0))
+            
+            # Corregir el mes en caché en lugar de descartarlo
+            key = (date.year(), date.month())
+            if key in self.month_cache:
+                if any(counts):
+                    self.month_cache[key][date.day()] = counts
+                else:
+                    self.month_cache[key].pop(date.day(), None)
+            
+            self.calendar.setDateTextFormat(date, self.format_for_counts(counts))
+        except Exception as e:
+            print(f"Error updating calendar day: {e}")
+    
+    def on_sessions_changed(self, date):
+        """Refresca la vista tras modificar las sesiones de un día concreto"""
+        self.refresh_day(date)
+        self.load_day_sessions()
+        self.load_upcoming_sessions()
+        self.reminder_scheduler.rearm()
+    
     def load_day_sessions(self):
         """Carga las sesiones del día seleccionado"""
         self.sessions_list.clear()
@@ -369,11 +459,11 @@ class CalendarView(QWidget):
             sessions = self.storage.get_sessions_by_date(date_str)
             
             for session in sessions:
-                coachee = self.storage.get_coachee(session['coachee_id'])
+                coachee = self.storage.get_coachee(session.coachee_id)
                 if not coachee:
                     continue
                 
-                scheduled_time = datetime.strptime(session['scheduled_time'], "%Y-%m-%d %H:%M:%S")
+                scheduled_time = datetime.strptime(session.scheduled_time, "%Y-%m-%d %H:%M:%S")
                 time_str = scheduled_time.strftime("%H:%M")
                 
                 status_icons = {
@@ -381,9 +471,9 @@ class CalendarView(QWidget):
                     'completed': '✅',
                     'cancelled': '❌'
                 }
-                status_icon = status_icons.get(session.get('status', 'scheduled'), '📅')
+                status_icon = status_icons.get(session.status, '📅')
                 
-                item_text = f"{status_icon} {time_str} - {coachee.nombre_completo} - {session.get('title', 'Sesión')}"
+                item_text = f"{status_icon} {time_str} - {coachee.nombre_completo} - {session.title or 'Sesión'}"
                 item = QListWidgetItem(item_text)
                 item.setData(Qt.UserRole, session)
                 self.sessions_list.addItem(item)
@@ -392,39 +482,36 @@ class CalendarView(QWidget):
             print(f"Error loading day sessions: {e}")
     
     def load_upcoming_sessions(self):
-        """Carga las próximas sesiones programadas"""
+        """Carga las próximas sesiones programadas dentro del horizonte elegido"""
         self.upcoming_list.clear()
         
         try:
             now = datetime.now()
-            sessions = self.storage.get_all_scheduled_sessions()
-            
-            upcoming = []
-            for session in sessions:
-                if session.get('status') != 'scheduled':
-                    continue
-                
-                scheduled_time = datetime.strptime(session['scheduled_time'], "%Y-%m-%d %H:%M:%S")
-                if scheduled_time > now:
-                    upcoming.append(session)
+            horizon_days = self.horizon_combo.currentData()
+            until = None
+            if horizon_days:
+                until = (now + timedelta(days=horizon_days)).strftime("%Y-%m-%d %H:%M:%S")
             
-            upcoming.sort(key=lambda x: x['scheduled_time'])
+            upcoming = self.storage.get_upcoming_scheduled_sessions(
+                now.strftime("%Y-%m-%d %H:%M:%S"), self.UPCOMING_LIMIT, until
+            )
             
-            for session in upcoming[:10]:  # Mostrar solo las próximas 10
-                coachee = self.storage.get_coachee(session['coachee_id'])
-                if not coachee:
-                    continue
-                
-                scheduled_time = datetime.strptime(session['scheduled_time'], "%Y-%m-%d %H:%M:%S")
+            for session, coachee_name in upcoming:
+                scheduled_time = datetime.strptime(session.scheduled_time, "%Y-%m-%d %H:%M:%S")
                 datetime_str = scheduled_time.strftime("%d/%m/%Y %H:%M")
                 
-                item_text = f"{datetime_str} - {coachee.nombre_completo}"
+                item_text = f"{datetime_str} - {coachee_name}"
                 item = QListWidgetItem(item_text)
                 self.upcoming_list.addItem(item)
                 
         except Exception as e:
             print(f"Error loading upcoming sessions: {e}")
     
+    def on_horizon_changed(self):
+        """Guarda el horizonte elegido y recarga las próximas sesiones"""
+        self.storage.save_setting('upcoming_horizon_days', self.horizon_combo.currentData())
+        self.load_upcoming_sessions()
+    
     def on_date_selected(self, date):
         """Maneja la selección de una fecha en el calendario"""
         self.selected_date = date
@@ -437,7 +524,7 @@ class CalendarView(QWidget):
         has_selection = item is not None
         if has_selection:
             session = item.data(Qt.UserRole)
-            status = session.get('status', 'scheduled')
+            status = session.status
             self.complete_btn.setEnabled(status == 'scheduled')
             self.cancel_btn.setEnabled(status == 'scheduled')
             self.delete_btn.setEnabled(True)
@@ -449,23 +536,23 @@ class CalendarView(QWidget):
     def on_session_double_clicked(self, item):
         """Maneja el doble clic en una sesión"""
         session = item.data(Qt.UserRole)
-        coachee = self.storage.get_coachee(session['coachee_id'])
+        coachee = self.storage.get_coachee(session.coachee_id)
         
         if not coachee:
             return
         
-        scheduled_time = datetime.strptime(session['scheduled_time'], "%Y-%m-%d %H:%M:%S")
+        scheduled_time = datetime.strptime(session.scheduled_time, "%Y-%m-%d %H:%M:%S")
         datetime_str = scheduled_time.strftime("%d/%m/%Y %H:%M")
         
         details = f"""
 Coachee: {coachee.nombre_completo}
 Fecha y Hora: {datetime_str}
-Duración: {session.get('duration', 60)} minutos
-Título: {session.get('title', 'Sesión de coaching')}
-Estado: {session.get('status', 'scheduled')}
+Duración: {session.duration} minutos
+Título: {session.title or 'Sesión de coaching'}
+Estado: {session.status}
 
 Notas:
-{session.get('notes', 'Sin notas')}
+{session.notes or 'Sin notas'}
         """
         
         QMessageBox.information(self, "Detalles de la Sesión", details.strip())
@@ -475,7 +562,7 @@ Notas:
         selected_datetime = QDateTime(self.selected_date, QDateTime.currentDateTime().time())
         dialog = SessionScheduleDialog(self.storage, selected_datetime, parent=self)
         if dialog.exec():
-            self.load_sessions()
+            self.on_sessions_changed(dialog.datetime_edit.date())
             self.session_scheduled.emit()
     
     def mark_as_completed(self):
@@ -495,8 +582,8 @@ Notas:
         
         if reply == QMessageBox.Yes:
             try:
-                self.storage.update_session_status(session['id'], 'completed')
-                self.load_sessions()
+                self.storage.update_session_status(session.id, 'completed')
+                self.on_sessions_changed(self.selected_date)
                 QMessageBox.information(self, "Éxito", "Sesión marcada como completada.")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al actualizar la sesión: {str(e)}")
@@ -518,8 +605,8 @@ Notas:
         
         if reply == QMessageBox.Yes:
             try:
-                self.storage.update_session_status(session['id'], 'cancelled')
-                self.load_sessions()
+                self.storage.update_session_status(session.id, 'cancelled')
+                self.on_sessions_changed(self.selected_date)
                 QMessageBox.information(self, "Éxito", "Sesión cancelada.")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al cancelar la sesión: {str(e)}")
@@ -541,8 +628,8 @@ Notas:
         
         if reply == QMessageBox.Yes:
             try:
-                self.storage.delete_scheduled_session(session['id'])
-                self.load_sessions()
+                self.storage.delete_scheduled_session(session.id)
+                self.on_sessions_changed(self.selected_date)
                 QMessageBox.information(self, "Éxito", "Sesión eliminada del calendario.")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al eliminar la sesión: {str(e)}")
\ No newline at end of file
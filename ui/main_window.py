@@ -1,27 +1,37 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                                QLabel, QLineEdit, QPushButton, QListWidget,
-                               QTabWidget, QListWidgetItem, QMessageBox, QSplitter)
+                               QTabWidget, QListWidgetItem, QMessageBox, QSplitter,
+                               QComboBox, QInputDialog)
 from PySide6.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve
 from PySide6.QtGui import QIcon
+from services.ai_cache import get_response_cache
 from ui.calendar_view import CalendarView
 from ui.coachee_form import CoacheeForm
 from ui.sessions_view import SessionsView
 from ui.summaries_view import SummariesView
 from ui.payments_view import PaymentsView
 from ui.settings import SettingsView
+from ui.maintenance_scheduler import MaintenanceScheduler
+from ui.notification_center import NotificationCenter
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, storage):
+    def __init__(self, storage, workspaces=None):
         super().__init__()
         self.storage = storage
+        self.workspaces = workspaces
         self.setWindowTitle("Onto AI - Preview")
         self.setMinimumSize(1000, 700)
 
+        # Un solo centro de avisos: sobrevive a los cambios de espacio de trabajo
+        self.notification_center = NotificationCenter(self.storage, self)
+
         self.setup_ui()
         self.load_coachees()
         self.apply_theme()
 
+        self.maintenance_scheduler = MaintenanceScheduler(self.storage, self)
+
     def setup_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -39,6 +49,22 @@ class MainWindow(QMainWindow):
         left_layout.setSpacing(15)
         left_layout.setContentsMargins(20, 20, 20, 20)
 
+        # Selector de espacio de trabajo (una base por coach o consultorio)
+        if self.workspaces is not None:
+            workspace_layout = QHBoxLayout()
+
+            self.workspace_combo = QComboBox()
+            self.workspace_combo.addItems(self.workspaces.list_workspaces())
+            self.workspace_combo.setCurrentText(self.workspaces.get_last_workspace())
+            self.workspace_combo.currentTextChanged.connect(self.on_workspace_changed)
+            workspace_layout.addWidget(self.workspace_combo, stretch=1)
+
+            new_workspace_btn = QPushButton("Nuevo")
+            new_workspace_btn.clicked.connect(self.create_workspace)
+            workspace_layout.addWidget(new_workspace_btn)
+
+            left_layout.addLayout(workspace_layout)
+
         header = QLabel("Coachees")
         header.setStyleSheet("font-size: 20px; font-weight: bold;")
         left_layout.addWidget(header)
@@ -69,35 +95,49 @@ class MainWindow(QMainWindow):
 
         self.tabs = QTabWidget()
         self.tabs.setDocumentMode(True)
+        self.create_views()
 
-        self.sessions_view = SessionsView(self.storage)
+        right_layout.addWidget(self.tabs)
+        right_panel.setLayout(right_layout)
+
+        splitter.addWidget(left_panel)
+        splitter.addWidget(right_panel)
+        splitter.setStretchFactor(0, 1)
+        splitter.setStretchFactor(1, 2)
+
+        main_layout.addWidget(splitter)
+        central_widget.setLayout(main_layout)
+
+    def create_views(self):
+        """Crea las pestañas sobre el almacenamiento actual, reemplazando las anteriores"""
+        while self.tabs.count():
+            widget = self.tabs.widget(0)
+            self.tabs.removeTab(0)
+            widget.deleteLater()
+
+        # Las respuestas de IA salen de las notas: cada espacio guarda las suyas
+        if self.workspaces is not None:
+            response_cache = self.workspaces.get_response_cache(self.workspaces.get_last_workspace())
+        else:
+            response_cache = get_response_cache()
+
+        self.sessions_view = SessionsView(self.storage, response_cache=response_cache)
         self.tabs.addTab(self.sessions_view, "Sesiones")
 
-        self.summaries_view = SummariesView(self.storage)
+        self.summaries_view = SummariesView(self.storage, response_cache=response_cache)
         self.tabs.addTab(self.summaries_view, "Resúmenes")
 
         self.payments_view = PaymentsView(self.storage)
         self.tabs.addTab(self.payments_view, "Pagos")
 
-        self.calendar_view = CalendarView(self.storage)
+        self.calendar_view = CalendarView(self.storage, notification_center=self.notification_center)
         self.calendar_view.session_scheduled.connect(self.on_session_scheduled)
         self.tabs.addTab(self.calendar_view, "Calendario")
 
-        self.settings_view = SettingsView(self.storage)
+        self.settings_view = SettingsView(self.storage, response_cache=response_cache)
         self.settings_view.theme_changed.connect(self.on_theme_changed)
         self.tabs.addTab(self.settings_view, "Configuración")
 
-        right_layout.addWidget(self.tabs)
-        right_panel.setLayout(right_layout)
-
-        splitter.addWidget(left_panel)
-        splitter.addWidget(right_panel)
-        splitter.setStretchFactor(0, 1)
-        splitter.setStretchFactor(1, 2)
-
-        main_layout.addWidget(splitter)
-        central_widget.setLayout(main_layout)
-
     def load_coachees(self):
         self.coachees_list.clear()
         coachees = self.storage.get_all_coachees()
@@ -131,6 +171,36 @@ class MainWindow(QMainWindow):
         form.coachee_added.connect(self.load_coachees)
         form.exec()
 
+    def on_workspace_changed(self, name):
+        """Abre el espacio elegido y recarga todas las vistas"""
+        try:
+            self.storage = self.workspaces.open_workspace(name)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al abrir el espacio {name}: {str(e)}")
+            return
+
+        self.maintenance_scheduler.storage = self.storage
+        self.notification_center.set_storage(self.storage)
+        self.search_input.clear()
+        self.create_views()
+        self.load_coachees()
+        self.apply_theme()
+
+    def create_workspace(self):
+        """Crea un espacio de trabajo nuevo y cambia a él"""
+        name, ok = QInputDialog.getText(self, "Nuevo Espacio", "Nombre del coach o consultorio:")
+        if not ok or not name.strip():
+            return
+
+        try:
+            name = self.workspaces.create_workspace(name)
+        except ValueError as e:
+            QMessageBox.warning(self, "Validación", str(e))
+            return
+
+        self.workspace_combo.addItem(name)
+        self.workspace_combo.setCurrentText(name)
+
     def on_session_scheduled(self):
         """Maneja cuando una nueva sesión es programada"""
         pass
@@ -0,0 +1,77 @@
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QObject, QTimer, QEvent
+from datetime import datetime
+import time
+
+
+class MaintenanceScheduler(QObject):
+    """Ejecuta el mantenimiento de la base cuando la aplicación está inactiva o al cerrarse"""
+
+    # Inactividad necesaria antes de ejecutar el mantenimiento
+    IDLE_MS = 5 * 60 * 1000
+    # Separación mínima entre dos ejecuciones por inactividad, en segundos
+    MIN_INTERVAL = 60 * 60
+    # Presupuesto de tiempo por ejecución, en segundos
+    IDLE_BUDGET = 0.5
+    CLOSING_BUDGET = 2.0
+
+    INPUT_EVENTS = (QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.Wheel)
+
+    def __init__(self, storage, parent=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.last_run = None
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self.on_idle)
+        self.idle_timer.start(self.IDLE_MS)
+
+        app = QApplication.instance()
+        if app:
+            app.installEventFilter(self)
+            app.aboutToQuit.connect(self.on_closing)
+
+    def eventFilter(self, watched, event):
+        # Cualquier interacción del usuario reinicia la cuenta de inactividad
+        if event.type() in self.INPUT_EVENTS:
+            self.idle_timer.start(self.IDLE_MS)
+        return False
+
+    def on_idle(self):
+        if self.last_run is not None:
+            remaining = self.MIN_INTERVAL - (time.monotonic() - self.last_run)
+            if remaining > 0:
+                # Sigue inactivo: vuelve a intentarlo cuando se cumpla el intervalo
+                self.idle_timer.start(int(remaining * 1000))
+                return
+        self.run(self.IDLE_BUDGET, allow_vacuum=False)
+        self.idle_timer.start(int(self.MIN_INTERVAL * 1000))
+
+    def on_closing(self):
+        self.run(self.CLOSING_BUDGET, allow_vacuum=True)
+
+    def run(self, budget, allow_vacuum):
+        """Ejecuta una pasada de mantenimiento y guarda su informe"""
+        self.last_run = time.monotonic()
+        try:
+            report = self.storage.run_maintenance(budget=budget, allow_vacuum=allow_vacuum)
+        except Exception as e:
+            print(f"Error running database maintenance: {e}")
+            return None
+
+        report['finished_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.storage.save_setting('last_maintenance', report)
+        return report
+
+    @staticmethod
+    def format_report(report):
+        before = report['before']
+        after = report['after']
+        return (
+            f"Mantenimiento ({', '.join(report['steps']) or 'sin cambios'}) "
+            f"en {report['elapsed'] * 1000:.0f} ms: "
+            f"{before['file_size'] / 1024:.0f} KB -> {after['file_size'] / 1024:.0f} KB, "
+            f"páginas libres {before['freelist_count']} -> {after['freelist_count']}, "
+            f"fragmentación {before['fragmentation']:.1%} -> {after['fragmentation']:.1%}"
+        )
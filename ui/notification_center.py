@@ -0,0 +1,223 @@
+from PySide6.QtWidgets import (QApplication, QFrame, QVBoxLayout, QHBoxLayout,
+                               QLabel, QPushButton, QSystemTrayIcon)
+from PySide6.QtCore import Qt, QTimer, QObject, Signal
+from collections import deque
+from datetime import datetime
+
+
+class ReminderToast(QFrame):
+    """Aviso flotante que no bloquea la aplicación"""
+
+    acknowledged = Signal()
+    closed = Signal()
+
+    def __init__(self, title, text, timeout_ms, parent=None):
+        super().__init__(parent, Qt.Tool | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setFrameShape(QFrame.StyledPanel)
+        self.setMinimumWidth(320)
+
+        layout = QVBoxLayout()
+
+        title_label = QLabel(title)
+        title_label.setStyleSheet("font-size: 14px; font-weight: bold;")
+        layout.addWidget(title_label)
+
+        text_label = QLabel(text)
+        text_label.setWordWrap(True)
+        layout.addWidget(text_label)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        ok_btn = QPushButton("Entendido")
+        ok_btn.clicked.connect(self.on_acknowledged)
+        buttons_layout.addWidget(ok_btn)
+        layout.addLayout(buttons_layout)
+
+        self.setLayout(layout)
+
+        # Se oculta solo si nadie lo confirma
+        QTimer.singleShot(timeout_ms, self.close)
+
+    def on_acknowledged(self):
+        self.acknowledged.emit()
+        self.close()
+
+    def closeEvent(self, event):
+        self.closed.emit()
+        super().closeEvent(event)
+
+    def show_at_corner(self):
+        self.adjustSize()
+        screen = QApplication.primaryScreen()
+        if screen:
+            area = screen.availableGeometry()
+            self.move(area.right() - self.width() - 20, area.bottom() - self.height() - 20)
+        self.show()
+
+
+class NotificationCenter(QObject):
+    """Encola y entrega recordatorios sin abrir bucles de eventos anidados
+
+    Los recordatorios que llegan casi a la vez se agrupan en un único aviso.
+    Se usa la bandeja del sistema cuando está disponible y, si no, un aviso
+    flotante. La entrega y la confirmación se guardan en lote, en la base de
+    la que salió cada recordatorio.
+    """
+
+    # Ventana para agrupar recordatorios simultáneos
+    COALESCE_MS = 500
+    # Tiempo que permanece visible un aviso sin confirmar
+    TOAST_TIMEOUT_MS = 30000
+    # Intervalo de escritura de los eventos pendientes
+    FLUSH_MS = 5000
+
+    def __init__(self, storage, parent=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.incoming = []
+        self.queue = deque()
+        self.current_toast = None
+        # (storage, ids) del mensaje visible en la bandeja, o None si no hay ninguno
+        self.tray_batch = None
+        self.delivered = []
+        self.acknowledged = []
+
+        self.coalesce_timer = QTimer(self)
+        self.coalesce_timer.setSingleShot(True)
+        self.coalesce_timer.timeout.connect(self.enqueue_incoming)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush)
+
+        # showMessage reemplaza el mensaje visible: el siguiente espera a que este venza
+        self.tray_timer = QTimer(self)
+        self.tray_timer.setSingleShot(True)
+        self.tray_timer.timeout.connect(self.on_tray_message_done)
+
+        self.tray = None
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray = QSystemTrayIcon(QApplication.windowIcon(), self)
+            self.tray.messageClicked.connect(self.on_tray_message_clicked)
+            self.tray.show()
+
+        app = QApplication.instance()
+        if app:
+            app.aboutToQuit.connect(self.close)
+
+    def set_storage(self, storage):
+        """Cambia de espacio de trabajo sin perder lo ya recibido
+
+        Los recordatorios pendientes se muestran con los datos de su espacio y
+        sus eventos se escriben en la base anterior.
+        """
+        if storage is self.storage:
+            return
+        self.coalesce_timer.stop()
+        self.enqueue_incoming()
+        self.flush()
+        self.storage = storage
+
+    def close(self):
+        """Escribe los eventos pendientes y retira el icono de la bandeja"""
+        self.coalesce_timer.stop()
+        self.tray_timer.stop()
+        self.flush()
+        if self.tray is not None:
+            self.tray.hide()
+
+    def notify(self, sessions):
+        """Recibe recordatorios; vuelve de inmediato"""
+        self.incoming.extend(sessions)
+        if not self.coalesce_timer.isActive():
+            self.coalesce_timer.start(self.COALESCE_MS)
+
+    def enqueue_incoming(self):
+        batch, self.incoming = self.incoming, []
+        if batch:
+            self.queue.append((self.storage, batch))
+        self.show_next()
+
+    def show_next(self):
+        """Muestra el siguiente grupo si no hay otro aviso en pantalla"""
+        if self.current_toast is not None or self.tray_batch is not None or not self.queue:
+            return
+
+        storage, batch = self.queue.popleft()
+        title, text = self.format_batch(batch, storage)
+        ids = [session.id for session in batch]
+
+        if self.tray is not None:
+            self.tray_batch = (storage, ids)
+            self.tray.showMessage(title, text, QSystemTrayIcon.Information, self.TOAST_TIMEOUT_MS)
+            self.tray_timer.start(self.TOAST_TIMEOUT_MS)
+            self.record(self.delivered, storage, ids)
+            return
+
+        toast = ReminderToast(title, text, self.TOAST_TIMEOUT_MS)
+        toast.acknowledged.connect(lambda: self.record(self.acknowledged, storage, ids))
+        toast.closed.connect(self.on_toast_closed)
+        self.current_toast = toast
+        toast.show_at_corner()
+        self.record(self.delivered, storage, ids)
+
+    def on_toast_closed(self):
+        self.current_toast = None
+        self.show_next()
+
+    def on_tray_message_clicked(self):
+        if self.tray_batch is not None:
+            self.record(self.acknowledged, *self.tray_batch)
+        self.on_tray_message_done()
+
+    def on_tray_message_done(self):
+        self.tray_timer.stop()
+        self.tray_batch = None
+        self.show_next()
+
+    def format_batch(self, batch, storage=None):
+        """Arma el título y el texto de un grupo de recordatorios"""
+        storage = storage or self.storage
+        lines = []
+        for session in batch:
+            coachee = storage.get_coachee(session.coachee_id)
+            name = coachee.nombre_completo if coachee else "Coachee"
+            time_str = datetime.strptime(session.scheduled_time, "%Y-%m-%d %H:%M:%S").strftime("%H:%M")
+            lines.append(
+                f"{time_str} - {name}: {session.title or 'Sesión de coaching'} "
+                f"({session.duration} minutos)"
+            )
+
+        if len(batch) == 1:
+            title = "Recordatorio de Sesión"
+        else:
+            title = f"{len(batch)} sesiones próximas"
+
+        return title, "\n".join(lines)
+
+    def record(self, events, storage, ids):
+        """Acumula eventos y programa su escritura en lote"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        events.extend((storage, session_id, now) for session_id in ids)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start(self.FLUSH_MS)
+
+    def flush(self):
+        """Escribe los eventos pendientes, una transacción por base"""
+        self.flush_timer.stop()
+        delivered, self.delivered = self.delivered, []
+        acknowledged, self.acknowledged = self.acknowledged, []
+        storages = []
+        for storage, _, _ in delivered + acknowledged:
+            if not any(storage is seen for seen in storages):
+                storages.append(storage)
+        for storage in storages:
+            try:
+                storage.record_reminder_events(
+                    [(session_id, at) for owner, session_id, at in delivered if owner is storage],
+                    [(session_id, at) for owner, session_id, at in acknowledged if owner is storage]
+                )
+            except Exception as e:
+                print(f"Error saving notification events: {e}")
@@ -137,11 +137,11 @@ class PaymentsView(QWidget):
         
         for coachee in coachees:
             summary = self.storage.get_payment_summary_by_coachee(coachee.id)
-            total_sessions += summary['total_sessions']
-            total_paid += summary['paid_sessions']
-            total_unpaid += summary['unpaid_sessions']
-            amount_paid += summary['total_paid']
-            amount_pending += summary['total_pending']
+            total_sessions += summary.total_sessions
+            total_paid += summary.paid_sessions
+            total_unpaid += summary.unpaid_sessions
+            amount_paid += summary.total_paid
+            amount_pending += summary.total_pending
         
         summary_text = f"""
         <b>Sesiones Totales:</b> {total_sessions}<br>
@@ -163,7 +163,7 @@ class PaymentsView(QWidget):
             summary = self.storage.get_payment_summary_by_coachee(coachee.id)
             
             # Filtrar si es necesario
-            if filter_data == "unpaid" and summary['unpaid_sessions'] == 0:
+            if filter_data == "unpaid" and summary.unpaid_sessions == 0:
                 continue
             elif filter_data and filter_data != "unpaid" and coachee.id != filter_data:
                 continue
@@ -175,30 +175,30 @@ class PaymentsView(QWidget):
             self.coachees_table.setItem(row, 0, name_item)
             
             # Total sesiones
-            total_item = QTableWidgetItem(str(summary['total_sessions']))
+            total_item = QTableWidgetItem(str(summary.total_sessions))
             total_item.setTextAlignment(Qt.AlignCenter)
             self.coachees_table.setItem(row, 1, total_item)
             
             # Pagadas
-            paid_item = QTableWidgetItem(str(summary['paid_sessions']))
+            paid_item = QTableWidgetItem(str(summary.paid_sessions))
             paid_item.setTextAlignment(Qt.AlignCenter)
             paid_item.setForeground(QColor("#4CAF50"))
             self.coachees_table.setItem(row, 2, paid_item)
             
             # Pendientes
-            unpaid_item = QTableWidgetItem(str(summary['unpaid_sessions']))
+            unpaid_item = QTableWidgetItem(str(summary.unpaid_sessions))
             unpaid_item.setTextAlignment(Qt.AlignCenter)
-            if summary['unpaid_sessions'] > 0:
+            if summary.unpaid_sessions > 0:
                 unpaid_item.setForeground(QColor("#F44336"))
             self.coachees_table.setItem(row, 3, unpaid_item)
             
             # Total cobrado
-            paid_amount_item = QTableWidgetItem(f"${summary['total_paid']:.2f}")
+            paid_amount_item = QTableWidgetItem(f"${summary.total_paid:.2f}")
             paid_amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.coachees_table.setItem(row, 4, paid_amount_item)
             
             # Total pendiente
-            pending_amount_item = QTableWidgetItem(f"${summary['total_pending']:.2f}")
+            pending_amount_item = QTableWidgetItem(f"${summary.total_pending:.2f}")
             pending_amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.coachees_table.setItem(row, 5, pending_amount_item)
             
@@ -3,8 +3,13 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QDialog, QComboBox, QListWidgetItem, QGroupBox,
                                QCheckBox, QDoubleSpinBox, QFormLayout)
 from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve
+from contextlib import aclosing
 from datetime import datetime
-from services.ai_providers import AIProviderFactory
+from services.ai_providers import AIProviderFactory, provider_chain
+from services.ai_cache import CachedProvider, get_response_cache
+from services.tokens import PromptBuilder
+from ui.ai_stream import StreamRenderer
+from ui.async_bridge import async_bridge
 
 
 class PaymentDialog(QDialog):
@@ -104,13 +109,17 @@ class PaymentDialog(QDialog):
 
 
 class AIConsultDialog(QDialog):
-    def __init__(self, storage, notas_text, parent=None):
+    def __init__(self, storage, notas_text, parent=None, response_cache=None):
         super().__init__(parent)
         self.storage = storage
+        self.response_cache = response_cache or get_response_cache()
         self.notas_text = notas_text
         self.setWindowTitle("Consultar IA")
         self.setModal(True)
         self.setMinimumSize(600, 500)
+        self.consult_future = None
+        self.consult_provider = None
+        self.consult_token = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -135,6 +144,9 @@ class AIConsultDialog(QDialog):
 
         layout.addWidget(self.provider_combo)
 
+        self.force_refresh_checkbox = QCheckBox("Forzar nueva respuesta (ignorar caché)")
+        layout.addWidget(self.force_refresh_checkbox)
+
         prompt_label = QLabel("Pregunta o instrucción:")
         layout.addWidget(prompt_label)
 
@@ -154,6 +166,7 @@ class AIConsultDialog(QDialog):
         self.response_output.setReadOnly(True)
         self.response_output.setPlaceholderText("La respuesta de la IA aparecerá aquí...")
         layout.addWidget(self.response_output)
+        self.renderer = StreamRenderer(self.response_output, self)
 
         buttons_layout = QHBoxLayout()
         buttons_layout.addStretch()
@@ -191,29 +204,90 @@ class AIConsultDialog(QDialog):
             )
             return
 
+        try:
+            # Si el proveedor elegido falla o tarda, responde el de respaldo
+            provider = AIProviderFactory.create_with_fallbacks(provider_chain(self.storage, provider_name))
+        except Exception as e:
+            self.response_output.setPlainText(f"Error al consultar IA: {str(e)}")
+            return
+
+        if not provider:
+            self.response_output.setPlainText("Error: No se pudo crear el proveedor de IA.")
+            return
+
+        # Las consultas repetidas sobre las mismas notas salen de la caché
+        provider = CachedProvider(provider, self.response_cache,
+                                  force_refresh=self.force_refresh_checkbox.isChecked())
+
+        # La consulta y la respuesta deben entrar en la ventana del modelo
+        prompt, truncated = PromptBuilder.for_provider(provider_name, provider_config).truncate_middle(prompt)
+
         self.consult_btn.setEnabled(False)
         self.consult_btn.setText("Consultando...")
-        self.response_output.setPlainText("Generando respuesta...")
+        if truncated:
+            self.renderer.start("Generando respuesta (la consulta se recortó para entrar en el contexto del modelo)...")
+        else:
+            self.renderer.start("Generando respuesta...")
+
+        # La respuesta se muestra a medida que llega; la consulta corre en el
+        # bucle asyncio compartido, sin un hilo propio por ventana
+        self.consult_provider = provider
+        self.consult_token = object()
+        self.consult_future = async_bridge().stream(
+            self._consult_stream(provider, prompt),
+            self._if_current(self.renderer.append),
+            self._if_current(self.on_consult_finished),
+            self._if_current(self.on_consult_error),
+        )
 
+    @staticmethod
+    async def _consult_stream(provider, prompt):
         try:
-            provider = AIProviderFactory.create_provider(provider_name, provider_config)
-
-            if provider:
-                response = provider.generate_response(prompt)
-                self.response_output.setPlainText(response)
-            else:
-                self.response_output.setPlainText("Error: No se pudo crear el proveedor de IA.")
-        except Exception as e:
-            self.response_output.setPlainText(f"Error al consultar IA: {str(e)}")
+            async with aclosing(provider.astream(prompt)) as stream:
+                async for text in stream:
+                    yield text
         finally:
-            self.consult_btn.setEnabled(True)
-            self.consult_btn.setText("Consultar")
+            provider.close()
+
+    def _if_current(self, callback):
+        # Los fragmentos ya encolados de una consulta abandonada se descartan
+        token = self.consult_token
+
+        def deliver(*args):
+            if self.consult_token is token:
+                callback(*args)
+        return deliver
+
+    def on_consult_finished(self, response):
+        self.renderer.finish(response)
+        self.reset_consult_button()
+
+    def on_consult_error(self, error_msg):
+        self.renderer.finish(f"Error al consultar IA: {error_msg}")
+        self.reset_consult_button()
+
+    def reset_consult_button(self):
+        self.consult_btn.setEnabled(True)
+        self.consult_btn.setText("Consultar")
+        self.consult_future = None
+        self.consult_provider = None
+
+    def done(self, result):
+        # La consulta en curso se corta sin bloquear la ventana y termina por su cuenta
+        if self.consult_future is not None:
+            self.consult_future.cancel()
+            self.consult_provider.cancel()
+        self.consult_future = None
+        self.consult_provider = None
+        self.consult_token = None
+        super().done(result)
 
 
 class SessionsView(QWidget):
-    def __init__(self, storage, parent=None):
+    def __init__(self, storage, parent=None, response_cache=None):
         super().__init__(parent)
         self.storage = storage
+        self.response_cache = response_cache
         self.current_coachee = None
         self.setup_ui()
 
@@ -240,6 +314,10 @@ class SessionsView(QWidget):
         sessions_group = QGroupBox("Historial de Sesiones")
         sessions_layout = QVBoxLayout()
 
+        self.include_archive_checkbox = QCheckBox("Incluir sesiones archivadas")
+        self.include_archive_checkbox.toggled.connect(self.load_sessions)
+        sessions_layout.addWidget(self.include_archive_checkbox)
+
         self.sessions_list = QListWidget()
         self.sessions_list.itemClicked.connect(self.on_session_selected)
         self.sessions_list.itemDoubleClicked.connect(self.on_session_double_clicked)
@@ -335,9 +413,9 @@ class SessionsView(QWidget):
         
         summary = self.storage.get_payment_summary_by_coachee(self.current_coachee.id)
         
-        summary_text = f"Total sesiones: {summary['total_sessions']} | "
-        summary_text += f"Pagadas: {summary['paid_sessions']} (${summary['total_paid']:.2f}) | "
-        summary_text += f"Pendientes: {summary['unpaid_sessions']} (${summary['total_pending']:.2f})"
+        summary_text = f"Total sesiones: {summary.total_sessions} | "
+        summary_text += f"Pagadas: {summary.paid_sessions} (${summary.total_paid:.2f}) | "
+        summary_text += f"Pendientes: {summary.unpaid_sessions} (${summary.total_pending:.2f})"
         
         self.payment_summary_label.setText(summary_text)
         self.payment_summary_label.setVisible(True)
@@ -346,7 +424,10 @@ class SessionsView(QWidget):
         self.sessions_list.clear()
 
         if self.current_coachee:
-            sessions = self.storage.get_sessions_by_coachee(self.current_coachee.id)
+            sessions = self.storage.get_sessions_by_coachee(
+                self.current_coachee.id,
+                include_archive=self.include_archive_checkbox.isChecked()
+            )
 
             for session in sessions:
                 # Formatear fecha
@@ -405,7 +486,10 @@ class SessionsView(QWidget):
             if current_item:
                 updated_session = current_item.data(Qt.UserRole)
                 # Recargar datos de la sesión
-                sessions = self.storage.get_sessions_by_coachee(self.current_coachee.id)
+                sessions = self.storage.get_sessions_by_coachee(
+                    self.current_coachee.id,
+                    include_archive=self.include_archive_checkbox.isChecked()
+                )
                 for s in sessions:
                     if s.id == session.id:
                         self.payment_checkbox.setChecked(s.pagado)
@@ -451,5 +535,5 @@ class SessionsView(QWidget):
             QMessageBox.warning(self, "Validación", "Por favor escribe algunas notas antes de consultar a la IA.")
             return
 
-        dialog = AIConsultDialog(self.storage, notas, self)
+        dialog = AIConsultDialog(self.storage, notas, self, response_cache=self.response_cache)
         dialog.exec()
\ No newline at end of file
@@ -1,17 +1,21 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QComboBox, QLineEdit, QPushButton, QMessageBox,
                                QGroupBox, QFormLayout, QFileDialog, QRadioButton,
-                               QButtonGroup, QDoubleSpinBox)
-from PySide6.QtCore import Signal
-from services.ai_providers import AIProviderFactory
+                               QButtonGroup, QDoubleSpinBox, QDateEdit)
+from PySide6.QtCore import Signal, QDate
+from datetime import datetime
+from services.ai_providers import AIProviderFactory, CLIENT_POOL, warm_up_provider
+from services.ai_cache import get_response_cache
+from ui.maintenance_scheduler import MaintenanceScheduler
 
 
 class SettingsView(QWidget):
     theme_changed = Signal(str)
 
-    def __init__(self, storage, parent=None):
+    def __init__(self, storage, parent=None, response_cache=None):
         super().__init__(parent)
         self.storage = storage
+        self.response_cache = response_cache or get_response_cache()
         self.setup_ui()
         self.load_settings()
 
@@ -87,6 +91,16 @@ class SettingsView(QWidget):
 
         ai_layout.addLayout(self.config_form)
 
+        # Si el proveedor elegido falla o tarda más de lo habitual, se consulta también a este
+        fallback_form = QFormLayout()
+        fallback_form.setSpacing(10)
+        self.fallback_combo = QComboBox()
+        self.fallback_combo.addItem("Ninguno", None)
+        for name in ["OpenAI", "GroqCloud", "GPT4All", "Mixtral", "Gemini"]:
+            self.fallback_combo.addItem(name, name)
+        fallback_form.addRow("Proveedor de Respaldo:", self.fallback_combo)
+        ai_layout.addLayout(fallback_form)
+
         buttons_layout = QHBoxLayout()
         buttons_layout.addStretch()
 
@@ -138,6 +152,63 @@ class SettingsView(QWidget):
         payments_group.setLayout(payments_layout)
         layout.addWidget(payments_group)
 
+        # Grupo de archivo de datos antiguos
+        archive_group = QGroupBox("Archivo de Datos")
+        archive_layout = QVBoxLayout()
+
+        archive_form = QFormLayout()
+        archive_form.setSpacing(10)
+
+        self.archive_cutoff_input = QDateEdit()
+        self.archive_cutoff_input.setDate(QDate.currentDate().addYears(-2))
+        self.archive_cutoff_input.setCalendarPopup(True)
+        self.archive_cutoff_input.setDisplayFormat("dd/MM/yyyy")
+        archive_form.addRow("Archivar anteriores a:", self.archive_cutoff_input)
+
+        archive_layout.addLayout(archive_form)
+
+        self.archive_info_label = QLabel()
+        self.archive_info_label.setStyleSheet("color: gray; font-size: 11px;")
+        archive_layout.addWidget(self.archive_info_label)
+
+        archive_buttons_layout = QHBoxLayout()
+        archive_buttons_layout.addStretch()
+
+        maintenance_btn = QPushButton("Optimizar Base")
+        maintenance_btn.clicked.connect(self.run_maintenance)
+        maintenance_btn.setMinimumWidth(130)
+        archive_buttons_layout.addWidget(maintenance_btn)
+
+        archive_btn = QPushButton("Archivar")
+        archive_btn.clicked.connect(self.archive_old_data)
+        archive_btn.setMinimumWidth(130)
+        archive_buttons_layout.addWidget(archive_btn)
+
+        archive_layout.addLayout(archive_buttons_layout)
+
+        archive_group.setLayout(archive_layout)
+        layout.addWidget(archive_group)
+
+        cache_group = QGroupBox("Caché de Respuestas de IA")
+        cache_layout = QVBoxLayout()
+
+        self.cache_info_label = QLabel()
+        self.cache_info_label.setStyleSheet("color: gray; font-size: 11px;")
+        cache_layout.addWidget(self.cache_info_label)
+
+        cache_buttons_layout = QHBoxLayout()
+        cache_buttons_layout.addStretch()
+
+        clear_cache_btn = QPushButton("Vaciar Caché")
+        clear_cache_btn.clicked.connect(self.clear_response_cache)
+        clear_cache_btn.setMinimumWidth(130)
+        cache_buttons_layout.addWidget(clear_cache_btn)
+
+        cache_layout.addLayout(cache_buttons_layout)
+
+        cache_group.setLayout(cache_layout)
+        layout.addWidget(cache_group)
+
         layout.addStretch()
 
         self.setLayout(layout)
@@ -157,10 +228,31 @@ class SettingsView(QWidget):
 
         self.load_provider_config(provider)
 
+        index = self.fallback_combo.findData(self.storage.get_setting('ai_fallback_provider'))
+        self.fallback_combo.setCurrentIndex(max(index, 0))
+
         # Cargar precio por sesión
         session_price = self.storage.get_setting('session_price', 0.0)
         self.session_price_input.setValue(session_price)
 
+        self.update_archive_info()
+        self.update_cache_info()
+
+    def update_archive_info(self):
+        """Muestra hasta qué fecha hay datos archivados"""
+        cutoff = self.storage.get_archive_cutoff()
+        if cutoff:
+            self.archive_info_label.setText(f"Datos archivados hasta: {cutoff}")
+        else:
+            self.archive_info_label.setText("No hay datos archivados.")
+
+        report = self.storage.get_setting('last_maintenance')
+        if report:
+            self.archive_info_label.setText(
+                f"{self.archive_info_label.text()}\n"
+                f"Último mantenimiento: {report['finished_at']}"
+            )
+
     def load_provider_config(self, provider_name):
         config = self.storage.get_setting(f'ai_config_{provider_name}', {})
 
@@ -247,8 +339,21 @@ class SettingsView(QWidget):
                 'model': model
             }
 
+        fallback = self.fallback_combo.currentData()
+        if fallback and fallback != provider_name and not self.storage.get_setting(f'ai_config_{fallback}'):
+            QMessageBox.warning(
+                self,
+                "Validación",
+                f"Por favor configura primero el proveedor {fallback} para usarlo como respaldo."
+            )
+            return
+
         self.storage.save_setting('ai_provider', provider_name)
         self.storage.save_setting(f'ai_config_{provider_name}', config)
+        self.storage.save_setting('ai_fallback_provider', fallback)
+        # Los clientes abiertos con la clave anterior ya no se van a usar
+        CLIENT_POOL.close_idle()
+        warm_up_provider(provider_name, config)
 
         QMessageBox.information(self, "Éxito", "Configuración guardada correctamente.")
 
@@ -284,6 +389,7 @@ class SettingsView(QWidget):
 
             if provider:
                 success, message = provider.test_connection()
+                provider.close()
 
                 if success:
                     QMessageBox.information(self, "Test de Conexión", message)
@@ -301,4 +407,62 @@ class SettingsView(QWidget):
             self.storage.save_setting('session_price', session_price)
             QMessageBox.information(self, "Éxito", "Configuración de pagos guardada correctamente.")
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error al guardar la configuración: {str(e)}")
\ No newline at end of file
+            QMessageBox.critical(self, "Error", f"Error al guardar la configuración: {str(e)}")
+
+    def showEvent(self, event):
+        # Las consultas hechas desde otras vistas cambian las estadísticas
+        super().showEvent(event)
+        self.update_cache_info()
+
+    def update_cache_info(self):
+        """Muestra el tamaño de la caché de respuestas y su tasa de aciertos"""
+        stats = self.response_cache.stats()
+        self.cache_info_label.setText(
+            f"{stats['entries']} respuestas guardadas ({stats['size'] / 1024:.0f} KB)\n"
+            f"Aciertos: {stats['hits']} - Fallos: {stats['misses']} "
+            f"({stats['hit_rate'] * 100:.0f}% de aciertos)"
+        )
+
+    def clear_response_cache(self):
+        """Descarta todas las respuestas guardadas"""
+        try:
+            self.response_cache.clear()
+            self.update_cache_info()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al vaciar la caché: {str(e)}")
+
+    def archive_old_data(self):
+        """Mueve las sesiones pagadas y resúmenes antiguos a la base de archivo"""
+        cutoff = self.archive_cutoff_input.date().toString("yyyy-MM-dd")
+
+        reply = QMessageBox.question(
+            self,
+            "Confirmar Archivo",
+            f"¿Mover las sesiones pagadas y los resúmenes anteriores al {cutoff} a la base de archivo?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+
+        if reply == QMessageBox.Yes:
+            try:
+                result = self.storage.archive_before(cutoff)
+                self.update_archive_info()
+                QMessageBox.information(
+                    self,
+                    "Éxito",
+                    f"Se archivaron {result['sessions']} sesiones y {result['summaries']} resúmenes."
+                )
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Error al archivar los datos: {str(e)}")
+
+    def run_maintenance(self):
+        """Optimiza la base de datos y muestra el resultado"""
+        try:
+            report = self.storage.run_maintenance(
+                budget=MaintenanceScheduler.CLOSING_BUDGET, allow_vacuum=True
+            )
+            report['finished_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.storage.save_setting('last_maintenance', report)
+            self.update_archive_info()
+            QMessageBox.information(self, "Éxito", MaintenanceScheduler.format_report(report))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al optimizar la base de datos: {str(e)}")
@@ -1,40 +1,72 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QListWidget, QTextEdit, QPushButton, QMessageBox,
                                QDialog, QComboBox, QListWidgetItem, QGroupBox,
-                               QDateEdit, QFormLayout, QProgressDialog)
+                               QDateEdit, QFormLayout, QProgressDialog, QCheckBox,
+                               QProgressBar, QSpinBox)
 from PySide6.QtCore import Qt, QDate, QThread, Signal
 from datetime import datetime, timedelta
-from services.ai_providers import AIProviderFactory
+from services.ai_providers import AIProviderFactory, provider_chain
+from services.ai_cache import CachedProvider, get_response_cache
+from services.summarizer import (MapReduceSummarizer, SummaryCancelled, SUMMARY_INSTRUCTIONS,
+                                 coachee_session_entries, summary_title)
+from services.tokens import PromptBuilder
+from services.batch_summaries import BatchSummaryJob, PROVIDER_CONCURRENCY
+from ui.ai_stream import StreamingResponseThread, StreamRenderer, detach_thread
 
 
-class SummaryGeneratorThread(QThread):
-    """Thread para generar resúmenes en segundo plano"""
-    finished = Signal(str)
+class SummaryGeneratorThread(StreamingResponseThread):
+    """Thread para generar resúmenes en segundo plano, entregando el texto a medida que llega"""
+
+
+class SummaryPipelineThread(QThread):
+    """Resume por bloques las sesiones que no entran en una consulta y entrega el prompt final"""
+    progress = Signal(str, int, int)
+    prompt_ready = Signal(str)
     error = Signal(str)
-    
-    def __init__(self, provider, prompt):
-        super().__init__()
-        self.provider = provider
-        self.prompt = prompt
-        
+
+    def __init__(self, summarizer, summary_type, header, entries, parent=None):
+        super().__init__(parent)
+        self.finished.connect(self.deleteLater)
+        self.summarizer = summarizer
+        self.summarizer.progress = self.progress.emit
+        self.summary_type = summary_type
+        self.header = header
+        self.entries = entries
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+        self.summarizer.cancel()
+
     def run(self):
         try:
-            response = self.provider.generate_response(self.prompt)
-            self.finished.emit(response)
+            prompt = self.summarizer.build_prompt(self.summary_type, self.header, self.entries)
+        except SummaryCancelled:
+            return
         except Exception as e:
             self.error.emit(str(e))
+            return
+        finally:
+            # Un iterador de sesiones a medio leer libera su conexión
+            if hasattr(self.entries, 'close'):
+                self.entries.close()
+
+        if not self._stopped:
+            self.prompt_ready.emit(prompt)
 
 
 class GenerateSummaryDialog(QDialog):
     """Diálogo para generar un nuevo resumen"""
     
-    def __init__(self, storage, parent=None):
+    def __init__(self, storage, parent=None, response_cache=None):
         super().__init__(parent)
         self.storage = storage
+        self.response_cache = response_cache or get_response_cache()
         self.setWindowTitle("Generar Resumen con IA")
         self.setModal(True)
         self.setMinimumSize(700, 600)
         self.generator_thread = None
+        self.pipeline_thread = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -61,14 +93,7 @@ class GenerateSummaryDialog(QDialog):
         
         # Tipo de resumen
         self.summary_type_combo = QComboBox()
-        self.summary_type_combo.addItems([
-            "Resumen General",
-            "Análisis de Progreso",
-            "Patrones y Tendencias",
-            "Objetivos y Logros",
-            "Áreas de Mejora",
-            "Recomendaciones"
-        ])
+        self.summary_type_combo.addItems(list(SUMMARY_INSTRUCTIONS))
         form_layout.addRow("Tipo de Resumen:", self.summary_type_combo)
         
         # Rango de fechas
@@ -88,6 +113,9 @@ class GenerateSummaryDialog(QDialog):
         date_layout.addWidget(QLabel("Hasta:"))
         date_layout.addWidget(self.date_to)
         
+        self.date_from.dateChanged.connect(self.on_coachee_changed)
+        self.date_to.dateChanged.connect(self.on_coachee_changed)
+        
         form_layout.addRow("Período:", date_layout)
         
         # Proveedor de IA
@@ -99,6 +127,9 @@ class GenerateSummaryDialog(QDialog):
             self.provider_combo.setCurrentIndex(index)
         form_layout.addRow("Proveedor IA:", self.provider_combo)
         
+        self.force_refresh_checkbox = QCheckBox("Forzar nueva respuesta (ignorar caché)")
+        form_layout.addRow("", self.force_refresh_checkbox)
+        
         layout.addLayout(form_layout)
         
         # Info de sesiones
@@ -106,6 +137,16 @@ class GenerateSummaryDialog(QDialog):
         self.sessions_info.setStyleSheet("color: gray; font-style: italic;")
         layout.addWidget(self.sessions_info)
         
+        # Avance de las etapas cuando las sesiones se resumen por bloques
+        self.progress_label = QLabel()
+        self.progress_label.setVisible(False)
+        layout.addWidget(self.progress_label)
+        
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat("%v de %m")
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        
         # Área de vista previa/resultado
         preview_label = QLabel("Resumen generado:")
         layout.addWidget(preview_label)
@@ -114,6 +155,7 @@ class GenerateSummaryDialog(QDialog):
         self.result_text.setReadOnly(True)
         self.result_text.setPlaceholderText("El resumen generado aparecerá aquí...")
         layout.addWidget(self.result_text)
+        self.renderer = StreamRenderer(self.result_text, self)
         
         # Botones
         buttons_layout = QHBoxLayout()
@@ -148,17 +190,15 @@ class GenerateSummaryDialog(QDialog):
         date_from_str = self.date_from.date().toString("yyyy-MM-dd")
         date_to_str = self.date_to.date().toString("yyyy-MM-dd") + " 23:59:59"
         
+        # Solo se necesita el número: un COUNT sobre el índice en lugar de traer las notas
         if coachee_id:
-            sessions = self.storage.get_sessions_by_date_range(coachee_id, date_from_str, date_to_str)
+            sessions_count = self.storage.count_sessions(coachee_id, date_from_str, date_to_str)
             coachee = self.storage.get_coachee(coachee_id)
             self.sessions_info.setText(
-                f"Se encontraron {len(sessions)} sesiones para {coachee.nombre_completo} en el período seleccionado."
+                f"Se encontraron {sessions_count} sesiones para {coachee.nombre_completo} en el período seleccionado."
             )
         else:
-            total_sessions = 0
-            for coachee in self.storage.get_all_coachees():
-                sessions = self.storage.get_sessions_by_date_range(coachee.id, date_from_str, date_to_str)
-                total_sessions += len(sessions)
+            total_sessions = self.storage.count_sessions(date_from=date_from_str, date_to=date_to_str)
             self.sessions_info.setText(
                 f"Se encontraron {total_sessions} sesiones en total para el período seleccionado."
             )
@@ -182,9 +222,6 @@ class GenerateSummaryDialog(QDialog):
             return
         
         # Recopilar sesiones
-        sessions_text = ""
-        sessions_count = 0
-        
         if coachee_id:
             sessions = self.storage.get_sessions_by_date_range(coachee_id, date_from_str, date_to_str)
             coachee = self.storage.get_coachee(coachee_id)
@@ -193,69 +230,104 @@ class GenerateSummaryDialog(QDialog):
                 QMessageBox.warning(self, "Sin datos", "No hay sesiones en el período seleccionado.")
                 return
             
-            sessions_text = f"Sesiones de coaching de {coachee.nombre_completo}:\n\n"
-            for i, session in enumerate(sessions, 1):
-                sessions_text += f"Sesión {i} - {session.fecha}:\n{session.notas}\n\n"
-            sessions_count = len(sessions)
+            header, entries = coachee_session_entries(coachee, sessions)
         else:
-            all_sessions = []
-            for coachee in self.storage.get_all_coachees():
-                sessions = self.storage.get_sessions_by_date_range(coachee.id, date_from_str, date_to_str)
-                for session in sessions:
-                    all_sessions.append((coachee, session))
-            
-            if not all_sessions:
+            if not self.storage.has_sessions(None, date_from_str, date_to_str):
                 QMessageBox.warning(self, "Sin datos", "No hay sesiones en el período seleccionado.")
                 return
             
-            sessions_text = "Sesiones de coaching de todos los coachees:\n\n"
-            for i, (coachee, session) in enumerate(all_sessions, 1):
-                sessions_text += f"Sesión {i} - {coachee.nombre_completo} - {session.fecha}:\n{session.notas}\n\n"
-            sessions_count = len(all_sessions)
-        
-        # Crear prompt según el tipo de resumen
-        prompts = {
-            "Resumen General": f"Por favor, genera un resumen ejecutivo completo de las siguientes {sessions_count} sesiones de coaching. Incluye los temas principales discutidos, conclusiones importantes y el contexto general del trabajo de coaching.\n\n{sessions_text}",
-            
-            "Análisis de Progreso": f"Analiza el progreso observado a través de estas {sessions_count} sesiones de coaching. Identifica mejoras, cambios positivos, hitos alcanzados y la evolución del coachee a lo largo del tiempo.\n\n{sessions_text}",
-            
-            "Patrones y Tendencias": f"Identifica patrones recurrentes, tendencias y temas comunes en estas {sessions_count} sesiones de coaching. Analiza qué aspectos aparecen con frecuencia y qué pueden indicar.\n\n{sessions_text}",
-            
-            "Objetivos y Logros": f"Resume los objetivos establecidos y los logros alcanzados según estas {sessions_count} sesiones de coaching. Evalúa el cumplimiento de metas y destaca los éxitos principales.\n\n{sessions_text}",
-            
-            "Áreas de Mejora": f"Identifica las áreas de mejora, desafíos pendientes y oportunidades de desarrollo observadas en estas {sessions_count} sesiones de coaching. Proporciona un análisis constructivo.\n\n{sessions_text}",
-            
-            "Recomendaciones": f"Basándote en estas {sessions_count} sesiones de coaching, proporciona recomendaciones específicas y accionables para las próximas sesiones. Incluye sugerencias de enfoques, temas a abordar y estrategias.\n\n{sessions_text}"
-        }
-        
-        prompt = prompts.get(summary_type, prompts["Resumen General"])
-        
-        # Crear proveedor y generar en segundo plano
+            # Las sesiones se leen por lotes a medida que se arman los bloques del resumen
+            header = "Sesiones de coaching de todos los coachees:\n\n"
+            pairs = self.storage.iter_sessions_with_coachee_by_date_range(date_from_str, date_to_str)
+            entries = (f"{coachee.nombre_completo} - {session.fecha}:\n{session.notas}\n\n"
+                       for coachee, session in pairs)
+        
+        # Comprobar que el proveedor se puede crear antes de empezar
+        chain = provider_chain(self.storage, provider_name)
         try:
-            provider = AIProviderFactory.create_provider(provider_name, provider_config)
+            provider = AIProviderFactory.create_with_fallbacks(chain)
             if not provider:
                 QMessageBox.critical(self, "Error", "No se pudo crear el proveedor de IA.")
                 return
-            
-            # Deshabilitar botón y mostrar progreso
-            self.generate_btn.setEnabled(False)
-            self.generate_btn.setText("Generando...")
-            self.result_text.setPlainText("Generando resumen con IA, por favor espera...")
-            
-            # Crear y ejecutar thread
-            self.generator_thread = SummaryGeneratorThread(provider, prompt)
-            self.generator_thread.finished.connect(self.on_generation_finished)
-            self.generator_thread.error.connect(self.on_generation_error)
-            self.generator_thread.start()
-            
+            provider.close()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al generar resumen: {str(e)}")
-            self.generate_btn.setEnabled(True)
-            self.generate_btn.setText("Generar Resumen")
+            return
+        
+        # Deshabilitar botón y mostrar progreso
+        self.generate_btn.setEnabled(False)
+        self.generate_btn.setText("Generando...")
+        self.save_btn.setEnabled(False)
+        self.renderer.start("Generando resumen con IA, por favor espera...")
+        
+        # Si las sesiones no entran en una consulta se resumen primero por bloques
+        summarizer = MapReduceSummarizer(
+            lambda: AIProviderFactory.create_with_fallbacks(chain),
+            cache=self.response_cache,
+            builder=PromptBuilder.for_provider(provider_name, provider_config)
+        )
+        self.pipeline_thread = SummaryPipelineThread(summarizer, summary_type, header, entries, self)
+        self.pipeline_thread.progress.connect(self.on_pipeline_progress)
+        self.pipeline_thread.prompt_ready.connect(
+            lambda prompt: self.start_generation(chain, prompt)
+        )
+        self.pipeline_thread.error.connect(self.on_generation_error)
+        self.pipeline_thread.start()
+    
+    def on_pipeline_progress(self, stage, done, total):
+        self.progress_label.setText(stage)
+        self.progress_label.setVisible(True)
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.progress_bar.setVisible(True)
+    
+    def hide_progress(self):
+        self.progress_label.setVisible(False)
+        self.progress_bar.setVisible(False)
+    
+    def start_generation(self, chain, prompt):
+        """Genera la etapa final, mostrando el texto a medida que llega"""
+        self.pipeline_thread = None
+        if not self.isVisible():
+            # El diálogo se cerró mientras se resumían los bloques
+            return
+        if self.progress_bar.isVisible():
+            self.progress_label.setText("Generando resumen final")
+            self.progress_bar.setRange(0, 0)
+        
+        try:
+            provider = AIProviderFactory.create_with_fallbacks(chain)
+        except Exception as e:
+            self.on_generation_error(str(e))
+            return
+        
+        # El mismo resumen sobre las mismas sesiones sale de la caché
+        provider = CachedProvider(provider, self.response_cache,
+                                  force_refresh=self.force_refresh_checkbox.isChecked())
+        
+        # Crear y ejecutar thread
+        self.generator_thread = SummaryGeneratorThread(provider, prompt, self)
+        self.generator_thread.chunk.connect(self.renderer.append)
+        self.generator_thread.response_ready.connect(self.on_generation_finished)
+        self.generator_thread.error.connect(self.on_generation_error)
+        self.generator_thread.start()
+    
+    def done(self, result):
+        # La generación en curso se corta sin bloquear la ventana y termina por su cuenta
+        thread = self.pipeline_thread
+        if thread is not None:
+            detach_thread(thread, thread.progress, thread.prompt_ready, thread.error)
+        self.pipeline_thread = None
+        thread = self.generator_thread
+        if thread is not None:
+            detach_thread(thread, thread.chunk, thread.response_ready, thread.error)
+        self.generator_thread = None
+        super().done(result)
     
     def on_generation_finished(self, response):
         """Maneja la respuesta exitosa de la generación"""
-        self.result_text.setPlainText(response)
+        self.renderer.finish(response)
+        self.hide_progress()
         self.generate_btn.setEnabled(True)
         self.generate_btn.setText("Generar Resumen")
         self.save_btn.setEnabled(True)
@@ -263,10 +335,12 @@ class GenerateSummaryDialog(QDialog):
     
     def on_generation_error(self, error_msg):
         """Maneja errores en la generación"""
-        self.result_text.setPlainText(f"Error al generar resumen: {error_msg}")
+        self.renderer.finish(f"Error al generar resumen: {error_msg}")
+        self.hide_progress()
         self.generate_btn.setEnabled(True)
         self.generate_btn.setText("Generar Resumen")
         self.generator_thread = None
+        self.pipeline_thread = None
         QMessageBox.critical(self, "Error", f"Error al generar resumen: {error_msg}")
     
     def save_summary(self):
@@ -291,7 +365,7 @@ class GenerateSummaryDialog(QDialog):
         provider_name = self.provider_combo.currentText()
         
         coachee = self.storage.get_coachee(coachee_id)
-        title = f"{summary_type} - {coachee.nombre_completo} ({date_from_str} a {date_to_str})"
+        title = summary_title(summary_type, coachee, date_from_str, date_to_str)
         
         summary_data = {
             'coachee_id': coachee_id,
@@ -312,13 +386,302 @@ class GenerateSummaryDialog(QDialog):
             QMessageBox.critical(self, "Error", f"Error al guardar el resumen: {str(e)}")
 
 
+class BatchSummaryThread(QThread):
+    """Ejecuta un lote de resúmenes en segundo plano"""
+    progress = Signal(dict)
+    job_done = Signal(dict)
+    error = Signal(str)
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.finished.connect(self.deleteLater)
+        self.job = job
+        self.job.progress = self.progress.emit
+
+    def stop(self):
+        self.job.cancel()
+
+    def run(self):
+        try:
+            result = self.job.run()
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        self.job_done.emit(result)
+
+
+class BatchSummaryDialog(QDialog):
+    """Genera y guarda un resumen por cada coachee elegido para un mismo período"""
+    
+    def __init__(self, storage, parent=None, response_cache=None):
+        super().__init__(parent)
+        self.storage = storage
+        self.response_cache = response_cache or get_response_cache()
+        self.setWindowTitle("Resúmenes en Lote")
+        self.setModal(True)
+        self.setMinimumSize(600, 600)
+        self.batch_thread = None
+        self.setup_ui()
+    
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        layout.setSpacing(15)
+        layout.setContentsMargins(30, 30, 30, 30)
+        
+        title = QLabel("Resúmenes en Lote")
+        title.setStyleSheet("font-size: 18px; font-weight: bold;")
+        layout.addWidget(title)
+        
+        form_layout = QFormLayout()
+        form_layout.setSpacing(10)
+        
+        self.summary_type_combo = QComboBox()
+        self.summary_type_combo.addItems(list(SUMMARY_INSTRUCTIONS))
+        form_layout.addRow("Tipo de Resumen:", self.summary_type_combo)
+        
+        date_layout = QHBoxLayout()
+        
+        self.date_from = QDateEdit()
+        self.date_from.setDate(QDate.currentDate().addMonths(-1))
+        self.date_from.setCalendarPopup(True)
+        self.date_from.setDisplayFormat("dd/MM/yyyy")
+        date_layout.addWidget(QLabel("Desde:"))
+        date_layout.addWidget(self.date_from)
+        
+        self.date_to = QDateEdit()
+        self.date_to.setDate(QDate.currentDate())
+        self.date_to.setCalendarPopup(True)
+        self.date_to.setDisplayFormat("dd/MM/yyyy")
+        date_layout.addWidget(QLabel("Hasta:"))
+        date_layout.addWidget(self.date_to)
+        
+        self.date_from.dateChanged.connect(self.select_active_coachees)
+        self.date_to.dateChanged.connect(self.select_active_coachees)
+        
+        form_layout.addRow("Período:", date_layout)
+        
+        self.provider_combo = QComboBox()
+        self.provider_combo.addItems(["OpenAI", "GroqCloud", "GPT4All", "Mixtral", "Gemini"])
+        saved_provider = self.storage.get_setting('ai_provider', 'OpenAI')
+        index = self.provider_combo.findText(saved_provider)
+        if index >= 0:
+            self.provider_combo.setCurrentIndex(index)
+        self.provider_combo.currentTextChanged.connect(self.on_provider_changed)
+        form_layout.addRow("Proveedor IA:", self.provider_combo)
+        
+        self.concurrency_input = QSpinBox()
+        form_layout.addRow("Consultas simultáneas:", self.concurrency_input)
+        self.on_provider_changed(self.provider_combo.currentText())
+        
+        layout.addLayout(form_layout)
+        
+        # Coachees: se marcan los que tienen sesiones en el período
+        coachees_label = QLabel("Coachees:")
+        layout.addWidget(coachees_label)
+        
+        self.coachees_list = QListWidget()
+        for coachee in self.storage.get_all_coachees():
+            item = QListWidgetItem(coachee.nombre_completo)
+            item.setData(Qt.UserRole, coachee.id)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.coachees_list.addItem(item)
+        layout.addWidget(self.coachees_list)
+        
+        selection_layout = QHBoxLayout()
+        
+        active_btn = QPushButton("Con sesiones en el período")
+        active_btn.clicked.connect(self.select_active_coachees)
+        selection_layout.addWidget(active_btn)
+        
+        all_btn = QPushButton("Todos")
+        all_btn.clicked.connect(lambda: self.set_all_checked(True))
+        selection_layout.addWidget(all_btn)
+        
+        none_btn = QPushButton("Ninguno")
+        none_btn.clicked.connect(lambda: self.set_all_checked(False))
+        selection_layout.addWidget(none_btn)
+        
+        selection_layout.addStretch()
+        layout.addLayout(selection_layout)
+        
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat("%v de %m")
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: gray; font-style: italic;")
+        layout.addWidget(self.status_label)
+        
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        
+        self.start_btn = QPushButton("Generar y Guardar")
+        self.start_btn.clicked.connect(self.start_batch)
+        self.start_btn.setMinimumWidth(150)
+        self.start_btn.setProperty("class", "primary")
+        buttons_layout.addWidget(self.start_btn)
+        
+        self.stop_btn = QPushButton("Detener")
+        self.stop_btn.clicked.connect(self.stop_batch)
+        self.stop_btn.setMinimumWidth(100)
+        self.stop_btn.setEnabled(False)
+        buttons_layout.addWidget(self.stop_btn)
+        
+        self.close_btn = QPushButton("Cerrar")
+        self.close_btn.clicked.connect(self.accept)
+        self.close_btn.setMinimumWidth(100)
+        buttons_layout.addWidget(self.close_btn)
+        
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+        
+        self.select_active_coachees()
+    
+    def period(self):
+        return (self.date_from.date().toString("yyyy-MM-dd"),
+                self.date_to.date().toString("yyyy-MM-dd"))
+    
+    def on_provider_changed(self, provider_name):
+        limit = PROVIDER_CONCURRENCY.get(provider_name, 4)
+        self.concurrency_input.setRange(1, limit)
+        self.concurrency_input.setValue(limit)
+    
+    def select_active_coachees(self):
+        """Marca los coachees con al menos una sesión en el período"""
+        date_from, date_to = self.period()
+        for row in range(self.coachees_list.count()):
+            item = self.coachees_list.item(row)
+            active = self.storage.has_sessions(item.data(Qt.UserRole), date_from, date_to + " 23:59:59")
+            item.setCheckState(Qt.Checked if active else Qt.Unchecked)
+    
+    def set_all_checked(self, checked):
+        for row in range(self.coachees_list.count()):
+            self.coachees_list.item(row).setCheckState(Qt.Checked if checked else Qt.Unchecked)
+    
+    def checked_coachee_ids(self):
+        return [self.coachees_list.item(row).data(Qt.UserRole)
+                for row in range(self.coachees_list.count())
+                if self.coachees_list.item(row).checkState() == Qt.Checked]
+    
+    def start_batch(self):
+        coachee_ids = self.checked_coachee_ids()
+        if not coachee_ids:
+            QMessageBox.warning(self, "Validación", "Por favor selecciona al menos un coachee.")
+            return
+        
+        provider_name = self.provider_combo.currentText()
+        provider_config = self.storage.get_setting(f'ai_config_{provider_name}', {})
+        if not provider_config:
+            QMessageBox.warning(
+                self,
+                "Configuración requerida",
+                f"Por favor configura el proveedor {provider_name} en la pestaña de Configuración."
+            )
+            return
+        
+        date_from, date_to = self.period()
+        job = BatchSummaryJob(
+            self.storage, provider_name, provider_config, coachee_ids,
+            self.summary_type_combo.currentText(), date_from, date_to,
+            concurrency=self.concurrency_input.value(),
+            cache=self.response_cache,
+            fallbacks=provider_chain(self.storage, provider_name)[1:]
+        )
+        
+        self.start_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.close_btn.setEnabled(False)
+        self.progress_bar.setRange(0, len(coachee_ids))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.status_label.setText("Preparando...")
+        
+        self.batch_thread = BatchSummaryThread(job, self)
+        self.batch_thread.progress.connect(self.on_batch_progress)
+        self.batch_thread.job_done.connect(self.on_batch_finished)
+        self.batch_thread.error.connect(self.on_batch_error)
+        self.batch_thread.start()
+    
+    def stop_batch(self):
+        if self.batch_thread is not None:
+            self.batch_thread.stop()
+            self.stop_btn.setEnabled(False)
+            self.status_label.setText("Deteniendo: se terminan las consultas en curso...")
+    
+    @staticmethod
+    def format_duration(seconds):
+        minutes, seconds = divmod(int(seconds), 60)
+        return f"{minutes} min {seconds:02d} s" if minutes else f"{seconds} s"
+    
+    def on_batch_progress(self, progress):
+        self.progress_bar.setValue(progress['done'])
+        parts = [f"{progress['saved']} guardados"]
+        if progress['skipped']:
+            parts.append(f"{progress['skipped']} sin sesiones")
+        if progress['failed']:
+            parts.append(f"{progress['failed']} con error")
+        if progress['eta'] is not None and progress['done'] < progress['total']:
+            parts.append(f"tiempo restante estimado: {self.format_duration(progress['eta'])}")
+        if progress['queue_wait'] >= 1:
+            parts.append(f"espera por límite del proveedor: {self.format_duration(progress['queue_wait'])}")
+        self.status_label.setText(" - ".join(parts))
+    
+    def on_batch_finished(self, result):
+        self.batch_thread = None
+        self.reset_buttons()
+        
+        message = (f"Se guardaron {result['saved']} resúmenes en "
+                   f"{self.format_duration(result['elapsed'])}.")
+        if result['skipped']:
+            message += f"\n{result['skipped']} coachees no tienen sesiones en el período."
+        if result['cancelled']:
+            message += "\nEl lote se detuvo antes de terminar."
+        self.status_label.setText(message.replace("\n", " "))
+        
+        if result['failed']:
+            names = {self.coachees_list.item(row).data(Qt.UserRole): self.coachees_list.item(row).text()
+                     for row in range(self.coachees_list.count())}
+            errors = "\n".join(f"- {names.get(coachee_id, coachee_id)}: {error}"
+                               for coachee_id, error in result['failed'][:10])
+            QMessageBox.warning(self, "Resúmenes en Lote",
+                                f"{message}\n\nNo se pudieron generar {len(result['failed'])}:\n{errors}")
+        else:
+            QMessageBox.information(self, "Resúmenes en Lote", message)
+    
+    def on_batch_error(self, error_msg):
+        self.batch_thread = None
+        self.reset_buttons()
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Error", f"Error al generar los resúmenes: {error_msg}")
+    
+    def reset_buttons(self):
+        self.start_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+        self.close_btn.setEnabled(True)
+    
+    def done(self, result):
+        # Con el lote en curso se detiene y se guarda lo ya generado
+        if self.batch_thread is not None and self.batch_thread.isRunning():
+            self.batch_thread.stop()
+            self.batch_thread.wait()
+        self.batch_thread = None
+        super().done(result)
+
+
 class SummariesView(QWidget):
     """Vista principal de resúmenes"""
     
-    def __init__(self, storage, parent=None):
+    # Resúmenes cargados por página
+    PAGE_SIZE = 50
+    
+    def __init__(self, storage, parent=None, response_cache=None):
         super().__init__(parent)
         self.storage = storage
+        self.response_cache = response_cache
         self.current_coachee = None
+        self.loaded_summaries = 0
         self.setup_ui()
         self.load_summaries()
         
@@ -336,6 +699,11 @@ class SummariesView(QWidget):
         
         header_layout.addStretch()
         
+        batch_btn = QPushButton("Resúmenes en Lote")
+        batch_btn.clicked.connect(self.open_batch_dialog)
+        batch_btn.setMinimumWidth(160)
+        header_layout.addWidget(batch_btn)
+        
         # Botón para generar nuevo resumen
         generate_btn = QPushButton("Generar Nuevo Resumen")
         generate_btn.clicked.connect(self.open_generate_dialog)
@@ -370,6 +738,10 @@ class SummariesView(QWidget):
         self.type_filter_combo.currentIndexChanged.connect(self.load_summaries)
         filters_layout.addWidget(self.type_filter_combo)
         
+        self.include_archive_checkbox = QCheckBox("Incluir resúmenes archivados")
+        self.include_archive_checkbox.toggled.connect(self.load_summaries)
+        filters_layout.addWidget(self.include_archive_checkbox)
+        
         filters_layout.addStretch()
         
         layout.addLayout(filters_layout)
@@ -385,6 +757,11 @@ class SummariesView(QWidget):
         self.summaries_list.itemClicked.connect(self.on_summary_selected)
         list_layout.addWidget(self.summaries_list)
         
+        self.load_more_btn = QPushButton("Cargar más")
+        self.load_more_btn.clicked.connect(self.load_more_summaries)
+        self.load_more_btn.setVisible(False)
+        list_layout.addWidget(self.load_more_btn)
+        
         list_group.setLayout(list_layout)
         main_layout.addWidget(list_group, stretch=1)
         
@@ -438,46 +815,46 @@ class SummariesView(QWidget):
             self.filter_combo.addItem(coachee.nombre_completo, coachee.id)
     
     def load_summaries(self):
-        """Carga los resúmenes según los filtros"""
+        """Carga la primera página de resúmenes según los filtros"""
         self.summaries_list.clear()
         self.detail_title.clear()
         self.detail_info.clear()
         self.detail_content.clear()
         self.delete_btn.setEnabled(False)
         
+        self.loaded_summaries = 0
+        self.load_more_summaries()
+        
+        if self.loaded_summaries == 0:
+            item = QListWidgetItem("No hay resúmenes guardados")
+            item.setFlags(Qt.NoItemFlags)
+            self.summaries_list.addItem(item)
+    
+    def load_more_summaries(self):
+        """Agrega la siguiente página de resúmenes a la lista"""
         coachee_id = self.filter_combo.currentData()
         summary_type = self.type_filter_combo.currentText()
         if summary_type == "Todos los tipos":
             summary_type = None
         
-        # Obtener resúmenes
-        if coachee_id:
-            summaries = self.storage.get_summaries_by_coachee(coachee_id)
-        else:
-            summaries = self.storage.get_all_summaries()
-        
-        # Filtrar por tipo si es necesario
-        if summary_type:
-            summaries = [s for s in summaries if s['summary_type'] == summary_type]
+        # Se pide un resumen de más para saber si quedan páginas
+        page = self.storage.get_summaries_page(
+            coachee_id, summary_type, limit=self.PAGE_SIZE + 1, offset=self.loaded_summaries,
+            include_archive=self.include_archive_checkbox.isChecked()
+        )
+        has_more = len(page) > self.PAGE_SIZE
         
-        # Agregar a la lista
-        for summary in summaries:
-            coachee = self.storage.get_coachee(summary['coachee_id'])
-            if not coachee:
-                continue
-            
-            created_date = datetime.strptime(summary['created_at'], "%Y-%m-%d %H:%M:%S")
+        for summary, coachee_name in page[:self.PAGE_SIZE]:
+            created_date = datetime.strptime(summary.created_at, "%Y-%m-%d %H:%M:%S")
             date_str = created_date.strftime("%d/%m/%Y")
             
-            item_text = f"{summary['summary_type']} - {coachee.nombre_completo}\n{date_str}"
+            item_text = f"{summary.summary_type} - {coachee_name}\n{date_str}"
             item = QListWidgetItem(item_text)
             item.setData(Qt.UserRole, summary)
             self.summaries_list.addItem(item)
         
-        if not summaries:
-            item = QListWidgetItem("No hay resúmenes guardados")
-            item.setFlags(Qt.NoItemFlags)
-            self.summaries_list.addItem(item)
+        self.loaded_summaries += len(page[:self.PAGE_SIZE])
+        self.load_more_btn.setVisible(has_more)
     
     def on_summary_selected(self, item):
         """Maneja la selección de un resumen"""
@@ -485,43 +862,46 @@ class SummariesView(QWidget):
         if not summary:
             return
         
-        coachee = self.storage.get_coachee(summary['coachee_id'])
-        if not coachee:
-            return
-        
         # Mostrar título
-        self.detail_title.setText(summary['title'])
+        self.detail_title.setText(summary.title)
         
         # Mostrar información
-        created_date = datetime.strptime(summary['created_at'], "%Y-%m-%d %H:%M:%S")
+        created_date = datetime.strptime(summary.created_at, "%Y-%m-%d %H:%M:%S")
         date_str = created_date.strftime("%d/%m/%Y %H:%M")
         
         period_str = ""
-        if summary.get('date_from') and summary.get('date_to'):
-            date_from = datetime.strptime(summary['date_from'], "%Y-%m-%d").strftime("%d/%m/%Y")
-            date_to = datetime.strptime(summary['date_to'], "%Y-%m-%d").strftime("%d/%m/%Y")
+        if summary.date_from and summary.date_to:
+            date_from = datetime.strptime(summary.date_from, "%Y-%m-%d").strftime("%d/%m/%Y")
+            date_to = datetime.strptime(summary.date_to, "%Y-%m-%d").strftime("%d/%m/%Y")
             period_str = f"Período analizado: {date_from} - {date_to}"
         
-        info_text = f"Tipo: {summary['summary_type']}\n"
+        info_text = f"Tipo: {summary.summary_type}\n"
         info_text += f"Creado: {date_str}\n"
         if period_str:
             info_text += f"{period_str}\n"
-        info_text += f"Generado con: {summary.get('ai_provider', 'N/A')}"
+        info_text += f"Generado con: {summary.ai_provider or 'N/A'}"
         
         self.detail_info.setText(info_text)
         
         # Mostrar contenido
-        self.detail_content.setPlainText(summary['content'])
+        self.detail_content.setPlainText(summary.content)
         
         self.delete_btn.setEnabled(True)
     
     def open_generate_dialog(self):
         """Abre el diálogo para generar un nuevo resumen"""
-        dialog = GenerateSummaryDialog(self.storage, self)
+        dialog = GenerateSummaryDialog(self.storage, self, response_cache=self.response_cache)
         if dialog.exec():
             self.load_coachees_filter()
             self.load_summaries()
     
+    def open_batch_dialog(self):
+        """Abre el diálogo para generar resúmenes de varios coachees"""
+        dialog = BatchSummaryDialog(self.storage, self, response_cache=self.response_cache)
+        dialog.exec()
+        self.load_coachees_filter()
+        self.load_summaries()
+    
     def delete_summary(self):
         """Elimina el resumen seleccionado"""
         current_item = self.summaries_list.currentItem()
@@ -541,7 +921,7 @@ class SummariesView(QWidget):
         
         if reply == QMessageBox.Yes:
             try:
-                self.storage.delete_summary(summary['id'])
+                self.storage.delete_summary(summary.id)
                 self.load_summaries()
                 QMessageBox.information(self, "Éxito", "Resumen eliminado correctamente.")
             except Exception as e: